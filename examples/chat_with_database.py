@@ -12,11 +12,25 @@ import json
 import os
 import sqlite3
 import sys
+import time
+from functools import lru_cache
+
 import llm
 
+from llm_lab.database import ConnectionPool
+from llm_lab.database.shaping import shape_query
+from llm_lab.database.sql_cache import SQLCache
+from llm_lab.utils import count_tokens
+
 # Use a sample database or create one if it doesn't exist
 DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_database.db")
 
+# Tokens of query results returned to the model per tool call
+RESULT_TOKENS = 2000
+
+# SQL statements the model ran successfully during the current question
+executed_sql = []
+
 def setup_sample_database():
     """Create a sample database with some tables and data if it doesn't exist"""
     if os.path.exists(DB_PATH):
@@ -74,53 +88,41 @@ def setup_sample_database():
     conn.close()
     print("Sample database created!")
 
+@lru_cache(maxsize=None)
+def get_pool():
+    """Shared read-only connection pool for the sample database"""
+    # The example owns its database, so it can switch it to WAL
+    return ConnectionPool(DB_PATH, wal=True)
+
 def get_schema():
     """Get the schema of all tables in the database"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Get list of tables
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-    tables = cursor.fetchall()
-    
-    schema = []
-    for table in tables:
-        table_name = table[0]
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = cursor.fetchall()
-        
-        schema.append(f"Table: {table_name}")
-        for col in columns:
-            schema.append(f"  - {col[1]} ({col[2]})")
-    
-    conn.close()
-    return "\n".join(schema)
+    return get_pool().describe()
 
 def execute_sql(sql: str):
     """
-    Tool for the LLM: run arbitrary SQL against the SQLite DB
-    and return the rows as a list of dicts.
+    Tool for the LLM: run read-only SQL against the SQLite DB and return
+    per-column stats plus as many rows as fit RESULT_TOKENS, stored
+    column-wise under "values".
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        
-        # Convert rows to list of dicts
-        result = [dict(row) for row in rows]
-        
-        conn.close()
-        return result
+        result = shape_query(get_pool(), sql, budget=RESULT_TOKENS)
     except Exception as e:
         return {"error": str(e)}
+    executed_sql.append(sql)
+    return result
 
 def pretty_print_json(data):
     """Print JSON data in a readable format"""
     print(json.dumps(data, indent=2, default=str))
 
+def get_embedder():
+    """Embed questions with the default embedding model, if one is configured"""
+    try:
+        model = llm.get_embedding_model(llm.get_default_embedding_model())
+    except Exception:
+        return None
+    return model.embed
+
 def main():
     setup_sample_database()
     
@@ -150,6 +152,9 @@ def main():
         print("Model o4-mini not available, using default model")
         model = llm.get_model()
     
+    # Repeated (or near-identical) questions reuse the SQL generated before
+    cache = SQLCache(embed=get_embedder())
+    
     print("\nWelcome to the database chat interface!")
     print("Ask questions about the customers and orders in the database.")
     print("Type 'exit' or 'quit' to end the session.\n")
@@ -169,8 +174,20 @@ def main():
         if not user_input:
             continue
         
+        version = get_pool().schema_version()
+        cached = cache.get(user_input, version, db=DB_PATH)
+        if cached:
+            result = execute_sql(cached["sql"])
+            if "error" not in result:
+                print(f"\n(cached {cached['match']} match) {cached['sql']}")
+                pretty_print_json(result)
+                continue
+            cache.discard(cached["question"], version, db=DB_PATH)
+        
         try:
             print("\nThinking...")
+            executed_sql.clear()
+            start = time.perf_counter()
             
             # Send the question to the LLM with the execute_sql tool
             response = model.chain(
@@ -183,8 +200,25 @@ def main():
             result = response.text().strip()
             print(f"\n{result}")
             
+            if executed_sql:
+                cache.set(
+                    user_input,
+                    version,
+                    executed_sql[-1],
+                    db=DB_PATH,
+                    latency=time.perf_counter() - start,
+                    tokens=count_tokens(system_prompt + user_input + result),
+                )
+            
         except Exception as e:
             print(f"Error: {e}")
+    
+    stats = cache.stats()
+    print(
+        f"SQL cache: {stats['hits']} hits, {stats['misses']} misses "
+        f"({stats['hit_rate']:.0%}), saved {stats['saved_seconds']:.1f}s "
+        f"and ~{stats['saved_tokens']} tokens"
+    )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark IVF approximate search: recall@k vs. latency against exact search.
+
+Usage:
+    uv run python scripts/bench_ann.py [vectors] [dimensions] [nlist]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from llm_lab.embeddings import VectorIndex
+from llm_lab.embeddings.ivf import IVFIndex
+
+K = 10
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    dims = int(sys.argv[2]) if len(sys.argv) > 2 else 128
+    nlist = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    rng = np.random.default_rng(0)
+    centres = rng.normal(size=(max(n // 500, 1), dims))
+    vectors = centres[rng.integers(len(centres), size=n)] + 0.3 * rng.normal(
+        size=(n, dims)
+    )
+    vectors = vectors.astype(np.float32)
+    queries = vectors[rng.choice(n, 100, replace=False)] + 0.05
+    ids = list(range(n))
+
+    exact = VectorIndex(ids, vectors)
+    start = time.perf_counter()
+    ivf = IVFIndex.build(ids, vectors, nlist=nlist)
+    print(
+        f"{n:,} x {dims}: built {len(ivf.centroids)} lists in "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+
+    start = time.perf_counter()
+    truth = [{id for id, _ in exact.search(q, K)} for q in queries]
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"exact          {exact_ms:8.2f} ms/query  recall@{K} 1.000")
+
+    for nprobe in (1, 2, 4, 8, 16, 32, 64):
+        start = time.perf_counter()
+        found = [{id for id, _ in ivf.search(q, K, nprobe=nprobe)} for q in queries]
+        ms = (time.perf_counter() - start) / len(queries) * 1000
+        recall = sum(len(t & f) for t, f in zip(truth, found)) / (K * len(queries))
+        print(f"ivf nprobe={nprobe:<3} {ms:8.2f} ms/query  recall@{K} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Benchmark packing large context entry sets into a token budget.
+
+Usage:
+    uv run python scripts/bench_context_pack.py [entries] [budget]
+"""
+import random
+import sys
+import time
+
+from llm_lab.context import ContextEntry, pack_context
+
+WORDS = "model context token prompt budget cache latency agent query index".split()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    rng = random.Random(0)
+    contents = [
+        " ".join(rng.choices(WORDS, k=rng.randint(5, 200))) for _ in range(n)
+    ]
+    dicts = [{"content": c, "relevance": rng.random()} for c in contents]
+    entries = [ContextEntry(d["content"], d["relevance"]) for d in dicts]
+    total = sum(e.tokens for e in entries)
+    print(f"Packing {n:,} entries ({total:,} tokens) into {budget:,} tokens")
+
+    for label, data in (("dict entries", dicts), ("ContextEntry (cached)", entries)):
+        for run in ("cold", "warm"):
+            start = time.perf_counter()
+            packed = pack_context(data, budget)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(
+                f"{label:<22} {run}: {elapsed:8.1f} ms, "
+                f"{len(packed['entries'])} entries, {packed['tokens']} tokens, "
+                f"relevance {packed['relevance']:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
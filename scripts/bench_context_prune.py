@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Benchmark pruning context entries: list scans vs. the sorted ContextStore.
+
+Usage:
+    uv run python scripts/bench_context_prune.py [entries]
+"""
+import random
+import sys
+import time
+
+from llm_lab.context import ContextEntry, ContextStore, prune_context
+
+
+def legacy_prune_context(entries, min_relevance):
+    """The original two-pass implementation, for comparison."""
+    kept = [e for e in entries if e["relevance"] >= min_relevance]
+    pruned = [e for e in entries if e["relevance"] < min_relevance]
+    return {"kept": kept, "pruned": pruned}
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<32} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(0)
+    scores = [rng.random() for _ in range(n)]
+    dicts = [{"content": f"entry {i}", "relevance": s} for i, s in enumerate(scores)]
+    print(f"Pruning {n:,} entries below relevance 0.7")
+
+    timed("legacy prune_context", lambda: legacy_prune_context(dicts, 0.7))
+    timed("prune_context (single pass)", lambda: prune_context(dicts, 0.7))
+
+    entries = [
+        ContextEntry(f"entry {i}", s, id=str(i), created_at=1.0, tokens=3)
+        for i, s in enumerate(scores)
+    ]
+    store = timed("ContextStore build (one-off)", lambda: ContextStore(entries))
+    timed("ContextStore.prune", lambda: store.prune(0.7))
+    timed("ContextStore.top_k_tokens(4000)", lambda: store.top_k_tokens(4000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark exact top-k cosine search: llm's Python scan vs. VectorIndex.
+
+Usage:
+    uv run python scripts/bench_embeddings.py [vectors] [dimensions]
+"""
+
+import sys
+import time
+
+import numpy as np
+from llm import cosine_similarity
+
+from llm_lab.embeddings import VectorIndex
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    dims = int(sys.argv[2]) if len(sys.argv) > 2 else 384
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(n, dims)).astype(np.float32)
+    index = VectorIndex([str(i) for i in range(n)], vectors)
+    queries = rng.normal(size=(32, dims)).astype(np.float32)
+    print(f"{n:,} vectors x {dims} dimensions")
+
+    sample = min(n, 10_000)
+    as_lists = vectors[:sample].tolist()
+    query = queries[0].tolist()
+    start = time.perf_counter()
+    sorted(((cosine_similarity(query, v), i) for i, v in enumerate(as_lists)))[-10:]
+    per_row = (time.perf_counter() - start) / sample
+    print(
+        f"llm similar (Python scan):  ~{per_row * n * 1000:9.1f} ms/query (extrapolated)"
+    )
+
+    index.search(queries[0], k=10)
+    start = time.perf_counter()
+    for q in queries:
+        index.search(q, k=10)
+    print(
+        f"VectorIndex.search:          {(time.perf_counter() - start) / len(queries) * 1000:9.1f} ms/query"
+    )
+
+    start = time.perf_counter()
+    index.search_many(queries, k=10)
+    print(
+        f"VectorIndex.search_many:     {(time.perf_counter() - start) / len(queries) * 1000:9.1f} ms/query"
+    )
+
+
+if __name__ == "__main__":
+    main()
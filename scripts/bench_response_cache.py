@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Benchmark the response cache hit path.
+
+Usage:
+    uv run python scripts/bench_response_cache.py [iterations]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from llm_lab.utils import ResponseCache, get_model_response, percentile
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(Path(tmp) / "responses.db")
+        prompt = "Explain recursion"
+        cache.set(
+            cache.key("gpt-4", prompt),
+            {"text": "Recursion is..." * 50, "tokens": 120, "latency": 2.5},
+        )
+
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            response = get_model_response(prompt, "gpt-4", cache=cache)
+            timings.append((time.perf_counter() - start) * 1e6)
+        assert response["cached"]
+
+        print(f"Hit path over {iterations} lookups:")
+        for q in (50, 90, 99):
+            print(f"  p{q}: {percentile(timings, q):8.1f} µs")
+        print(f"Cache stats: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark shaping a large query result against returning row dicts.
+
+Generates a SQLite table with the given number of rows (default one
+million) and compares the old fetchall()/dict tool output with
+shape_query on time, peak memory and tokens sent back to the model.
+
+Usage:
+    uv run python scripts/bench_result_shaping.py [rows] [budget]
+"""
+
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from llm_lab.database import ConnectionPool
+from llm_lab.database.shaping import dumps, shape_query
+from llm_lab.utils import count_tokens
+
+PRODUCTS = "Laptop Mouse Keyboard Monitor Headphones Phone Tablet Camera".split()
+
+
+def create_table(path, n):
+    rng = random.Random(0)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY, customer_id INTEGER, product TEXT,
+            amount REAL, order_date TEXT
+        )
+        """)
+    conn.executemany(
+        "INSERT INTO orders (customer_id, product, amount, order_date) "
+        "VALUES (?, ?, ?, ?)",
+        (
+            (
+                rng.randint(1, 10_000),
+                rng.choice(PRODUCTS),
+                round(rng.uniform(5, 2000), 2),
+                f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            )
+            for _ in range(n)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def row_dicts(path, sql):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    rows = [dict(row) for row in conn.execute(sql).fetchall()]
+    conn.close()
+    return json.dumps(rows, default=str)
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    payload = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tokens = count_tokens(payload)
+    print(
+        f"{label:<16} {elapsed:7.2f} s, peak {peak / 2**20:8.1f} MiB, "
+        f"{len(payload):>12,} chars, {tokens:>12,} tokens"
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    sql = "SELECT * FROM orders"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        start = time.perf_counter()
+        create_table(path, n)
+        print(f"Generated {n:,} rows in {time.perf_counter() - start:.1f} s")
+
+        pool = ConnectionPool(path)
+        measure("row dicts", lambda: row_dicts(path, sql))
+        measure("shape_query", lambda: dumps(shape_query(pool, sql, budget=budget)))
+        measure(
+            "shape + LIMIT",
+            lambda: dumps(shape_query(pool, sql + f" LIMIT {budget}", budget=budget)),
+        )
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
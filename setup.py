@@ -13,6 +13,7 @@ setup(
         "llm-gemini",
         "llm-bedrock",
         "llm-claude",
+        "numpy>=1.24",
     ],
     extras_require={
         "dev": [
@@ -22,5 +23,6 @@ setup(
             "pytest-cov>=4.1.0",
         ],
     },
+    entry_points={"llm": ["llm_lab_fake = llm_lab.fake.plugin"]},
     python_requires=">=3.8",
 )
\ No newline at end of file
@@ -1,5 +1,6 @@
 """LLM Lab - Testing environment for exploring LLM CLI tools."""
 
+import importlib
 from pathlib import Path
 
 __version__ = "0.1.0"
@@ -12,6 +13,35 @@ DATA_DIR = ROOT_DIR / "data"
 SIN_DIR = DATA_DIR / "sin"
 IMAGES_DIR = DATA_DIR / "images"
 
-# Ensure core data directories exist
-for dir_path in [DATA_DIR, SIN_DIR, IMAGES_DIR]:
-    dir_path.mkdir(exist_ok=True, parents=True)
+# Subpackages are imported on first attribute access (PEP 562), so
+# ``import llm_lab`` stays cheap and touches nothing on disk
+SUBMODULES = [
+    "agents",
+    "analytics",
+    "auto_model",
+    "bench",
+    "context",
+    "database",
+    "embeddings",
+    "fake",
+    "templates",
+    "throttle",
+    "utils",
+    "workflow",
+]
+
+
+def ensure_data_dirs():
+    """Create the core data directories; call before writing under DATA_DIR."""
+    for dir_path in [DATA_DIR, SIN_DIR, IMAGES_DIR]:
+        dir_path.mkdir(exist_ok=True, parents=True)
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted([*globals(), *SUBMODULES])
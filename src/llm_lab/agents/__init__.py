@@ -1,20 +1,59 @@
 """Collaborative agent system functionality."""
 
+from functools import lru_cache
 
-def create_agent(config):
-    """Create an agent with specified configuration."""
+from llm_lab import ROOT_DIR
+
+AGENT_PROMPTS_DIR = ROOT_DIR / "prompts" / "agents"
+
+
+class Agent:
+    """An agent role with its capabilities, constraints and system prompt."""
+
+    __slots__ = ("role", "capabilities", "constraints", "system", "model")
+
+    def __init__(self, role, capabilities=(), constraints=(), system=None, model=None):
+        self.role = role
+        self.capabilities = frozenset(capabilities)
+        self.constraints = frozenset(constraints)
+        self.system = system
+        self.model = model
 
-    class Agent:
-        def __init__(self, role, capabilities, constraints):
-            self.role = role
-            self.capabilities = capabilities
-            self._constraints = constraints
+    def __repr__(self):
+        return f"Agent({self.role!r})"
 
-        def is_constrained(self, constraint):
-            return constraint in self._constraints
+    def is_constrained(self, constraint):
+        return constraint in self.constraints
 
-    return Agent(
-        role=config["role"],
-        capabilities=config["capabilities"],
-        constraints=config["constraints"],
-    )
+    def can(self, capability):
+        return capability in self.capabilities
+
+    @classmethod
+    def from_config(cls, config):
+        """Build an agent, loading its system prompt from prompts/agents if unset."""
+        role = config["role"]
+        system = config.get("system")
+        if system is None:
+            system = load_agent_prompt(role)
+        return cls(
+            role=role,
+            capabilities=config.get("capabilities", ()),
+            constraints=config.get("constraints", ()),
+            system=system,
+            model=config.get("model"),
+        )
+
+
+@lru_cache(maxsize=None)
+def load_agent_prompt(role, directory=AGENT_PROMPTS_DIR):
+    """Return ``<role>.md`` or ``<role>-agent.md`` from the prompts directory."""
+    for name in (f"{role}.md", f"{role}-agent.md"):
+        path = directory / name
+        if path.exists():
+            return path.read_text()
+    return None
+
+
+def create_agent(config):
+    """Create an agent with specified configuration."""
+    return Agent.from_config(config)
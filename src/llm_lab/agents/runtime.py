@@ -0,0 +1,163 @@
+"""Long-lived agent workers fed from bounded queues."""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from llm_lab.agents import Agent
+
+_STOP = object()
+
+
+def _default_model(model_id):
+    import llm
+
+    return llm.get_model(model_id)
+
+
+def prompt_agent(agent, model, task):
+    """Send a task to the agent's model with its system prompt."""
+    return {"text": model.prompt(task, system=agent.system).text()}
+
+
+class AgentPool:
+    """Runs tasks on warm agents with per-role worker threads.
+
+    Each agent role gets a bounded queue drained by ``workers`` threads that
+    live as long as the pool, so system prompts are loaded and model handles
+    resolved once, not per task. ``submit`` blocks while a role's queue is
+    full, pushing backpressure onto producers.
+    """
+
+    def __init__(
+        self,
+        agents,
+        handler=prompt_agent,
+        model=None,
+        workers=2,
+        queue_size=32,
+        model_factory=_default_model,
+    ):
+        self.handler = handler
+        self.default_model = model
+        self.model_factory = model_factory
+        self.agents = {}
+        self._queues = {}
+        self._workers = {}
+        self._models = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._closed = False
+        for agent in agents:
+            if not isinstance(agent, Agent):
+                agent = Agent.from_config(agent)
+            self.agents[agent.role] = agent
+            self._queues[agent.role] = queue.Queue(maxsize=queue_size)
+            self._stats[agent.role] = {"completed": 0, "failed": 0, "busy": 0.0}
+            self._workers[agent.role] = [
+                threading.Thread(
+                    target=self._work,
+                    args=(agent,),
+                    name=f"agent-{agent.role}-{i}",
+                    daemon=True,
+                )
+                for i in range(workers)
+            ]
+            for thread in self._workers[agent.role]:
+                thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def model_for(self, agent):
+        """Return the shared model handle for an agent, resolving it once."""
+        model_id = agent.model or self.default_model
+        model = self._models.get(model_id)
+        if model is None:
+            with self._lock:
+                model = self._models.get(model_id)
+                if model is None:
+                    model = self._models[model_id] = self.model_factory(model_id)
+        return model
+
+    def _work(self, agent):
+        tasks = self._queues[agent.role]
+        while True:
+            item = tasks.get()
+            if item is _STOP:
+                return
+            future, task = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            start = time.perf_counter()
+            try:
+                result = self.handler(agent, self.model_for(agent), task)
+            except Exception as exc:
+                outcome = "failed"
+                future.set_exception(exc)
+            else:
+                outcome = "completed"
+                future.set_result({"role": agent.role, **result})
+            with self._lock:
+                stats = self._stats[agent.role]
+                stats[outcome] += 1
+                stats["busy"] += time.perf_counter() - start
+
+    def submit(self, role, task, block=True, timeout=None):
+        """Queue a task for an agent role and return a Future.
+
+        Blocks while the role's queue is full; with ``block=False`` or once
+        ``timeout`` expires, raises ``queue.Full`` instead.
+        """
+        if self._closed:
+            raise RuntimeError("cannot submit tasks after shutdown")
+        future = Future()
+        self._queues[role].put((future, task), block=block, timeout=timeout)
+        return future
+
+    def map(self, role, tasks):
+        """Run tasks on one role, yielding results in order.
+
+        At most the queue size plus the workers are in flight at once, so an
+        unbounded iterable of tasks is consumed lazily.
+        """
+        pending = deque()
+        limit = self._queues[role].maxsize + len(self._workers[role])
+        for task in tasks:
+            pending.append(self.submit(role, task))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        for future in pending:
+            yield future.result()
+
+    def stats(self):
+        """Return per-role queue depth, completions, failures and busy time."""
+        with self._lock:
+            return {
+                role: {"queued": self._queues[role].qsize(), **stats}
+                for role, stats in self._stats.items()
+            }
+
+    def shutdown(self, wait=True):
+        """Stop the workers once queued tasks are done."""
+        with self._lock:
+            closed, self._closed = self._closed, True
+        if not closed:
+            for role, threads in self._workers.items():
+                for _ in threads:
+                    self._queues[role].put(_STOP)
+        if wait:
+            for threads in self._workers.values():
+                for thread in threads:
+                    thread.join()
+            # Tasks that raced past the check in submit have no worker left
+            for tasks in self._queues.values():
+                while not tasks.empty():
+                    item = tasks.get_nowait()
+                    if item is not _STOP:
+                        item[0].cancel()
@@ -0,0 +1,283 @@
+"""Incremental rollups over the llm logs database for the src/sql reports."""
+
+import sqlite3
+from collections import defaultdict
+from pathlib import Path
+
+from llm_lab.analytics.sketch import LogSketch
+
+CHUNK_SIZE = 10_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name TEXT PRIMARY KEY,
+    last_rowid INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollup_model_day (
+    model TEXT NOT NULL,
+    day TEXT NOT NULL,
+    responses INTEGER NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    input_count INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    output_count INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    duration_count INTEGER NOT NULL,
+    duration_min INTEGER,
+    duration_max INTEGER,
+    total_tokens INTEGER NOT NULL,
+    total_count INTEGER NOT NULL,
+    PRIMARY KEY (model, day)
+);
+CREATE TABLE IF NOT EXISTS rollup_duration_histogram (
+    model TEXT NOT NULL,
+    day TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    responses INTEGER NOT NULL,
+    PRIMARY KEY (model, day, bucket)
+);
+CREATE TABLE IF NOT EXISTS rollup_conversation_day (
+    day TEXT NOT NULL,
+    model TEXT NOT NULL,
+    conversation_id TEXT NOT NULL,
+    responses INTEGER NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    input_count INTEGER NOT NULL,
+    output_count INTEGER NOT NULL,
+    duration_count INTEGER NOT NULL,
+    PRIMARY KEY (day, model, conversation_id)
+);
+CREATE TABLE IF NOT EXISTS rollup_duration_sketch (
+    model TEXT NOT NULL,
+    day TEXT NOT NULL,
+    sketch TEXT NOT NULL,
+    PRIMARY KEY (model, day)
+);
+CREATE INDEX IF NOT EXISTS rollup_conversation_day_model
+    ON rollup_conversation_day (model, conversation_id);
+CREATE INDEX IF NOT EXISTS rollup_conversation_day_conversation
+    ON rollup_conversation_day (conversation_id);
+CREATE INDEX IF NOT EXISTS idx_responses_conversation_id
+    ON responses (conversation_id);
+CREATE INDEX IF NOT EXISTS idx_responses_datetime_utc
+    ON responses (datetime_utc);
+"""
+
+UPSERT_MODEL_DAY = """
+INSERT INTO rollup_model_day VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (model, day) DO UPDATE SET
+    responses = responses + excluded.responses,
+    input_tokens = input_tokens + excluded.input_tokens,
+    input_count = input_count + excluded.input_count,
+    output_tokens = output_tokens + excluded.output_tokens,
+    output_count = output_count + excluded.output_count,
+    duration_ms = duration_ms + excluded.duration_ms,
+    duration_count = duration_count + excluded.duration_count,
+    duration_min = coalesce(
+        min(duration_min, excluded.duration_min), duration_min, excluded.duration_min
+    ),
+    duration_max = coalesce(
+        max(duration_max, excluded.duration_max), duration_max, excluded.duration_max
+    ),
+    total_tokens = total_tokens + excluded.total_tokens,
+    total_count = total_count + excluded.total_count
+"""
+
+UPSERT_HISTOGRAM = """
+INSERT INTO rollup_duration_histogram VALUES (?, ?, ?, ?)
+ON CONFLICT (model, day, bucket) DO UPDATE SET
+    responses = responses + excluded.responses
+"""
+
+UPSERT_CONVERSATION_DAY = """
+INSERT INTO rollup_conversation_day VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, model, conversation_id) DO UPDATE SET
+    responses = responses + excluded.responses,
+    input_tokens = input_tokens + excluded.input_tokens,
+    output_tokens = output_tokens + excluded.output_tokens,
+    duration_ms = duration_ms + excluded.duration_ms,
+    input_count = input_count + excluded.input_count,
+    output_count = output_count + excluded.output_count,
+    duration_count = duration_count + excluded.duration_count
+"""
+
+
+def logs_db_path():
+    """Return the path of the llm logs database."""
+    import llm
+
+    return llm.user_dir() / "logs.db"
+
+
+def connect(path=None, wal=False):
+    """Open the logs database (llm's by default) in autocommit mode.
+
+    ``wal=True`` switches the database to WAL journaling so refreshes do not
+    block llm's writes; the setting persists in the file, so it is opt-in.
+    """
+    conn = sqlite3.connect(
+        Path(path) if path else logs_db_path(), timeout=30, isolation_level=None
+    )
+    if wal:
+        conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def duration_bucket(duration_ms):
+    """Return the power-of-two bucket: ``b`` covers ``[2**(b-1), 2**b)`` ms."""
+    return max(0, int(duration_ms)).bit_length()
+
+
+def get_watermark(conn, name):
+    """Return the last responses rowid folded into a rollup."""
+    row = conn.execute(
+        "SELECT last_rowid FROM rollup_state WHERE name = ?", (name,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def iter_chunks(conn, columns, after_rowid=0, chunk_size=CHUNK_SIZE):
+    """Yield lists of ``(rowid, *columns)`` responses rows past a rowid."""
+    sql = (
+        f"SELECT rowid, {', '.join(columns)} FROM responses "
+        "WHERE rowid > ? ORDER BY rowid LIMIT ?"
+    )
+    while True:
+        rows = conn.execute(sql, (after_rowid, chunk_size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        after_rowid = rows[-1][0]
+
+
+def _fold(rows):
+    # Sums skip NULLs and keep a count of the values they add, so reports can
+    # divide by those counts and match SQL's AVG/SUM over the raw rows
+    model_day = defaultdict(lambda: [0, 0, 0, 0, 0, 0, 0, None, None, 0, 0])
+    histogram = defaultdict(int)
+    conversation_day = defaultdict(lambda: [0, 0, 0, 0, 0, 0, 0])
+    for _, model, conversation_id, day, duration, input_tokens, output_tokens in rows:
+        model, day = model or "", day or ""
+        totals = model_day[model, day]
+        totals[0] += 1
+        if input_tokens is not None:
+            totals[1] += input_tokens
+            totals[2] += 1
+        if output_tokens is not None:
+            totals[3] += output_tokens
+            totals[4] += 1
+        if duration is not None:
+            totals[5] += duration
+            totals[6] += 1
+            totals[7] = duration if totals[7] is None else min(totals[7], duration)
+            totals[8] = duration if totals[8] is None else max(totals[8], duration)
+            histogram[model, day, duration_bucket(duration)] += 1
+        if input_tokens is not None and output_tokens is not None:
+            totals[9] += input_tokens + output_tokens
+            totals[10] += 1
+        conversation = conversation_day[day, model, conversation_id or ""]
+        conversation[0] += 1
+        for i, value in enumerate((input_tokens, output_tokens, duration)):
+            if value is not None:
+                conversation[1 + i] += value
+                conversation[4 + i] += 1
+    return (
+        [(*key, *values) for key, values in model_day.items()],
+        [(*key, count) for key, count in histogram.items()],
+        [(*key, *values) for key, values in conversation_day.items()],
+    )
+
+
+def refresh_rollups(conn, chunk_size=CHUNK_SIZE):
+    """Fold responses added since the last refresh into the rollup tables.
+
+    Work is proportional to the new rows: each chunk is aggregated in memory,
+    upserted, and the rowid watermark advanced in the same transaction.
+    """
+    conn.executescript(SCHEMA)
+    after = get_watermark(conn, "rollups")
+    processed = 0
+    columns = (
+        "model",
+        "conversation_id",
+        "substr(datetime_utc, 1, 10)",
+        "duration_ms",
+        "input_tokens",
+        "output_tokens",
+    )
+    for rows in iter_chunks(conn, columns, after, chunk_size):
+        model_day, histogram, conversation_day = _fold(rows)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(UPSERT_MODEL_DAY, model_day)
+            conn.executemany(UPSERT_HISTOGRAM, histogram)
+            conn.executemany(UPSERT_CONVERSATION_DAY, conversation_day)
+            conn.execute(
+                "INSERT OR REPLACE INTO rollup_state VALUES ('rollups', ?)",
+                (rows[-1][0],),
+            )
+        processed += len(rows)
+    return {"processed": processed, "last_rowid": get_watermark(conn, "rollups")}
+
+
+def refresh_sketches(conn, chunk_size=CHUNK_SIZE, accuracy=0.01):
+    """Merge ``duration_ms`` of new responses into per-model/day sketches."""
+    conn.executescript(SCHEMA)
+    after = get_watermark(conn, "sketches")
+    processed = 0
+    columns = ("model", "substr(datetime_utc, 1, 10)", "duration_ms")
+    for rows in iter_chunks(conn, columns, after, chunk_size):
+        durations = defaultdict(list)
+        for _, model, day, duration in rows:
+            if duration is not None:
+                durations[model or "", day or ""].append(duration)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for (model, day), values in durations.items():
+                row = conn.execute(
+                    "SELECT sketch FROM rollup_duration_sketch "
+                    "WHERE model = ? AND day = ?",
+                    (model, day),
+                ).fetchone()
+                sketch = LogSketch.from_json(row[0]) if row else LogSketch(accuracy)
+                sketch.add(values)
+                conn.execute(
+                    "INSERT OR REPLACE INTO rollup_duration_sketch VALUES (?, ?, ?)",
+                    (model, day, sketch.to_json()),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO rollup_state VALUES ('sketches', ?)",
+                (rows[-1][0],),
+            )
+        processed += len(rows)
+    return {"processed": processed, "last_rowid": get_watermark(conn, "sketches")}
+
+
+def latency_quantiles(conn, by="model", quantiles=(0.5, 0.95, 0.99), since=None):
+    """Return duration quantiles grouped ``by`` model, day or both.
+
+    Reads the persisted sketches only; call ``refresh_sketches`` first.
+    """
+    groups = {"model": (0,), "day": (1,), "model_day": (0, 1)}[by]
+    merged = {}
+    rows = conn.execute(
+        "SELECT model, day, sketch FROM rollup_duration_sketch WHERE day >= ?",
+        (since or "",),
+    )
+    for row in rows:
+        key = tuple(row[i] for i in groups)
+        sketch = LogSketch.from_json(row[2])
+        if key in merged:
+            merged[key].merge(sketch)
+        else:
+            merged[key] = sketch
+    return [
+        {
+            **dict(zip(by.split("_"), key)),
+            "responses": sketch.count,
+            **{f"p{round(q * 100)}": sketch.quantile(q) for q in quantiles},
+        }
+        for key, sketch in sorted(merged.items())
+    ]
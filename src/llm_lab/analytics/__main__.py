@@ -0,0 +1,87 @@
+"""Log analytics: python -m llm_lab.analytics {refresh,latency,search} [--db PATH]."""
+
+import argparse
+import time
+
+from llm_lab.analytics import (
+    connect,
+    latency_quantiles,
+    refresh_rollups,
+    refresh_sketches,
+)
+from llm_lab.analytics.search import hybrid_search
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m llm_lab.analytics")
+    parser.add_argument("command", choices=["refresh", "latency", "search"])
+    parser.add_argument("query", nargs="?", help="Search text")
+    parser.add_argument("--db", help="Logs database (default: llm's logs.db)")
+    parser.add_argument(
+        "--wal", action="store_true", help="Switch the database to WAL journaling"
+    )
+    parser.add_argument("--by", choices=["model", "day", "model_day"], default="model")
+    parser.add_argument("--since", metavar="YYYY-MM-DD", help="First day to report")
+    parser.add_argument("--until", metavar="YYYY-MM-DD", help="Search before this day")
+    parser.add_argument("--model", action="append", help="Only search these models")
+    parser.add_argument(
+        "--collection", help="Embedding collection of responses to fuse with BM25"
+    )
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db, wal=args.wal)
+    start = time.perf_counter()
+    if args.command == "refresh":
+        result = refresh_rollups(conn)
+        refresh_sketches(conn)
+        print(
+            f"Folded {result['processed']:,} new responses into rollups "
+            f"(through rowid {result['last_rowid']}) "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+        return 0
+
+    if args.command == "search":
+        if not args.query:
+            parser.error("search needs a query")
+        index = None
+        if args.collection:
+            from llm_lab.embeddings import VectorIndex
+
+            index = VectorIndex.from_collection(args.collection)
+        page = hybrid_search(
+            conn,
+            args.query,
+            index=index,
+            model=args.model,
+            since=args.since,
+            until=args.until,
+            limit=args.limit,
+        )
+        for result in page["results"]:
+            snippet = " ".join((result["snippet"] or "").split())
+            print(
+                f"{result['score']:.4f}  {result['datetime_utc']}  "
+                f"{result['model']}  {result['id']}\n    {snippet}"
+            )
+        return 0
+
+    refresh_sketches(conn)
+    rows = latency_quantiles(conn, by=args.by, since=args.since)
+    keys = args.by.split("_")
+    print(
+        "  ".join(f"{key:<24}" for key in keys)
+        + f"{'responses':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    for row in rows:
+        print(
+            "  ".join(f"{row[key]:<24}" for key in keys)
+            + f"{row['responses']:>10}{row['p50']:>10.0f}"
+            f"{row['p95']:>10.0f}{row['p99']:>10.0f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+"""Hybrid BM25 and embedding search over logged responses."""
+
+import re
+
+RRF_K = 60
+WORD = re.compile(r"\w+")
+
+
+def quote_terms(text):
+    """Turn free text into an FTS5 query matching any of its words."""
+    return " OR ".join(f'"{word}"' for word in WORD.findall(text))
+
+
+def _filters(model=None, since=None, until=None):
+    clauses, params = [], []
+    if model is not None:
+        models = [model] if isinstance(model, str) else list(model)
+        clauses.append(f"r.model IN ({', '.join('?' * len(models))})")
+        params.extend(models)
+    if since is not None:
+        clauses.append("r.datetime_utc >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("r.datetime_utc < ?")
+        params.append(until)
+    return clauses, params
+
+
+def fts_search(conn, match, model=None, since=None, until=None, limit=20, after=None):
+    """Rank responses matching an FTS5 expression by BM25.
+
+    Model and date filters are applied in the query. ``after`` is the
+    ``next`` cursor of the previous page, a ``(bm25, rowid)`` keyset, so each
+    page costs the same however deep it is.
+    """
+    clauses, params = _filters(model, since, until)
+    if after is not None:
+        clauses.append("(bm25(responses_fts), r.rowid) > (?, ?)")
+        params.extend(after)
+    where = "".join(f" AND {clause}" for clause in clauses)
+    rows = conn.execute(
+        f"""
+        SELECT r.rowid, r.id, r.model, r.datetime_utc,
+               snippet(responses_fts, -1, '[', ']', '...', 12),
+               bm25(responses_fts) AS score
+        FROM responses_fts
+        JOIN responses r ON r.rowid = responses_fts.rowid
+        WHERE responses_fts MATCH ?{where}
+        ORDER BY score, r.rowid
+        LIMIT ?
+        """,
+        [match, *params, limit],
+    ).fetchall()
+    results = [
+        {
+            "id": id_,
+            "model": model_,
+            "datetime_utc": datetime_utc,
+            "snippet": snippet,
+            "bm25": score,
+        }
+        for _, id_, model_, datetime_utc, snippet, score in rows
+    ]
+    cursor = (rows[-1][5], rows[-1][0]) if len(rows) == limit else None
+    return {"results": results, "next": cursor}
+
+
+def _filter_ids(conn, ids, model=None, since=None, until=None):
+    clauses, params = _filters(model, since, until)
+    found = set()
+    # Stay under SQLite's bound-parameter limit
+    for start in range(0, len(ids), 500):
+        chunk = ids[start : start + 500]
+        where = "".join(f" AND {clause}" for clause in clauses)
+        found.update(
+            id_
+            for (id_,) in conn.execute(
+                f"SELECT r.id FROM responses r "
+                f"WHERE r.id IN ({', '.join('?' * len(chunk))}){where}",
+                [*chunk, *params],
+            )
+        )
+    return found
+
+
+def hybrid_search(
+    conn,
+    query,
+    index=None,
+    model=None,
+    since=None,
+    until=None,
+    limit=20,
+    after=None,
+    candidates=200,
+    k=RRF_K,
+):
+    """Fuse BM25 and embedding rankings with reciprocal rank fusion.
+
+    ``index`` is anything with a ``search(text, k)`` method returning
+    ``(response_id, similarity)`` pairs, such as a
+    :class:`llm_lab.embeddings.VectorIndex` over a collection of responses.
+    The top ``candidates`` of each ranking are fused; ``after`` is a
+    ``(score, id)`` keyset cursor into that fused list.
+    """
+    fused = {}
+    match = quote_terms(query)
+    if match:
+        page = fts_search(conn, match, model, since, until, limit=candidates)
+        for rank, result in enumerate(page["results"]):
+            fused[result["id"]] = {**result, "similarity": None, "score": 0.0}
+            fused[result["id"]]["score"] += 1 / (k + rank + 1)
+
+    if index is not None:
+        # Over-fetch, since the SQL filters may drop some neighbours
+        neighbours = index.search(query, candidates * 4)
+        allowed = _filter_ids(conn, [id_ for id_, _ in neighbours], model, since, until)
+        rank = 0
+        for id_, similarity in neighbours:
+            if id_ not in allowed:
+                continue
+            entry = fused.setdefault(id_, {"id": id_, "bm25": None, "score": 0.0})
+            entry["similarity"] = similarity
+            entry["score"] += 1 / (k + rank + 1)
+            rank += 1
+            if rank == candidates:
+                break
+
+    ranked = sorted(fused.values(), key=lambda entry: (-entry["score"], entry["id"]))
+    if after is not None:
+        score, id_ = after
+        ranked = [
+            entry
+            for entry in ranked
+            if entry["score"] < score or (entry["score"] == score and entry["id"] > id_)
+        ]
+    results = ranked[:limit]
+    _fill_details(conn, [entry for entry in results if "model" not in entry])
+    cursor = None
+    if len(ranked) > limit:
+        cursor = (results[-1]["score"], results[-1]["id"])
+    return {"results": results, "next": cursor}
+
+
+def _fill_details(conn, entries):
+    if not entries:
+        return
+    rows = conn.execute(
+        "SELECT id, model, datetime_utc, substr(response, 1, 200) FROM responses "
+        f"WHERE id IN ({', '.join('?' * len(entries))})",
+        [entry["id"] for entry in entries],
+    )
+    details = {row[0]: row[1:] for row in rows}
+    for entry in entries:
+        entry["model"], entry["datetime_utc"], entry["snippet"] = details.get(
+            entry["id"], (None, None, None)
+        )
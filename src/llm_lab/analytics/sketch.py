@@ -0,0 +1,108 @@
+"""Mergeable log-bucket quantile sketches for response durations."""
+
+import json
+import math
+
+import numpy as np
+
+
+class LogSketch:
+    """Quantiles with bounded relative error from logarithmic buckets.
+
+    Values are counted in buckets ``(gamma**(i-1), gamma**i]`` with
+    ``gamma = (1 + accuracy) / (1 - accuracy)``, so any quantile is within
+    ``accuracy`` of a true value. Sketches with the same accuracy merge by
+    adding bucket counts, and never hold the raw values.
+    """
+
+    __slots__ = ("accuracy", "bins", "zeros", "count", "min", "max", "_log_gamma")
+
+    def __init__(self, accuracy=0.01):
+        self.accuracy = accuracy
+        self.bins = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._log_gamma = math.log((1 + accuracy) / (1 - accuracy))
+
+    def add(self, values):
+        """Add a value or an array of values."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return self
+        positive = values[values > 0]
+        self.zeros += int(values.size - positive.size)
+        if positive.size:
+            indexes, counts = np.unique(
+                np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                return_counts=True,
+            )
+            for index, count in zip(indexes.tolist(), counts.tolist()):
+                self.bins[index] = self.bins.get(index, 0) + count
+        self.count += int(values.size)
+        low, high = float(values.min()), float(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        return self
+
+    def merge(self, other):
+        """Fold another sketch with the same accuracy into this one."""
+        if other.accuracy != self.accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """Return the estimated q-quantile (0 <= q <= 1), or None when empty."""
+        if not self.count:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        value = self.max
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                gamma = math.exp(self._log_gamma)
+                value = 2 * gamma**index / (gamma + 1)
+                break
+        return min(max(value, self.min), self.max)
+
+    def to_json(self):
+        """Serialize for storage; bucket counts only, never raw values."""
+        return json.dumps(
+            {
+                "accuracy": self.accuracy,
+                "zeros": self.zeros,
+                "count": self.count,
+                "min": self.min,
+                "max": self.max,
+                "bins": self.bins,
+            },
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, text):
+        """Restore a sketch written by ``to_json``."""
+        data = json.loads(text)
+        sketch = cls(data["accuracy"])
+        sketch.zeros = data["zeros"]
+        sketch.count = data["count"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        sketch.bins = {int(index): count for index, count in data["bins"].items()}
+        return sketch
@@ -1,23 +1,216 @@
 """Automated model selection functionality."""
 
+import bisect
+import random
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+from llm_lab import DATA_DIR, ensure_data_dirs
+from llm_lab.auto_model.classifier import classify
+from llm_lab.utils import load_config, percentile
+
+# Weight of the configured accuracy, in pseudo-observations, against observed outcomes
+PRIOR_WEIGHT = 10
+
 
 def analyze_task(task):
-    """Analyze a task to determine its characteristics."""
-    return {"complexity": 0.8, "domain": "code", "tokens_estimate": 1000}
+    """Analyze a task to determine its characteristics.
 
+    Runs locally in microseconds and never calls an LLM; see
+    :mod:`llm_lab.auto_model.classifier`.
+    """
+    domain, complexity, tokens = classify(task)
+    return {"complexity": complexity, "domain": domain, "tokens_estimate": tokens}
+
+
+class RoutedModel:
+    """A model chosen by the router, with the estimates behind the choice."""
+
+    __slots__ = ("name", "cost_per_1k", "accuracy", "latency_p95", "explored")
+
+    def __init__(self, name, cost_per_1k, accuracy, latency_p95, explored=False):
+        self.name = name
+        self.cost_per_1k = cost_per_1k
+        self.accuracy = accuracy
+        self.latency_p95 = latency_p95
+        self.explored = explored
+
+    def __repr__(self):
+        return f"RoutedModel({self.name!r}, cost_per_1k={self.cost_per_1k})"
+
+
+class PerformanceWindow:
+    """Rolling success rate and latency percentiles over recent observations.
+
+    Latencies are also kept in a sorted list updated by bisection on each
+    add and eviction, so a percentile never re-sorts the window from scratch.
+    """
+
+    __slots__ = ("outcomes", "successes", "_sorted")
+
+    def __init__(self, size):
+        self.outcomes = deque(maxlen=size)
+        self.successes = 0
+        self._sorted = []
+
+    def add(self, success, latency):
+        if len(self.outcomes) == self.outcomes.maxlen:
+            old_success, old_latency = self.outcomes[0]
+            self.successes -= old_success
+            if old_latency is not None:
+                del self._sorted[bisect.bisect_left(self._sorted, old_latency)]
+        self.outcomes.append((bool(success), latency))
+        self.successes += bool(success)
+        if latency is not None:
+            bisect.insort(self._sorted, latency)
+
+    def latency(self, q):
+        """Return the q-th percentile (0-100) of the window's latencies."""
+        # Sorting an already sorted list is a linear pass
+        return percentile(self._sorted, q)
 
-def select_model(requirements):
-    """Select the most appropriate model based on requirements."""
 
-    class Model:
-        def __init__(self):
-            self.cost_per_1k = 0.01
+class ModelRouter:
+    """Pick the cheapest model expected to meet accuracy, cost and latency goals.
 
-    return Model()
+    Every observation is stored in SQLite and folded into in-memory rolling
+    windows per model and per (model, domain). Accuracy estimates blend the
+    configured prior with observed success rates. With ``explore`` > 0, that
+    fraction of requests goes to a random affordable model to keep the
+    estimates fresh.
+    """
+
+    def __init__(
+        self,
+        catalog=None,
+        path=DATA_DIR / "routing" / "performance.db",
+        window=None,
+        explore=None,
+        seed=None,
+    ):
+        config = load_config().get("routing", {})
+        catalog = catalog if catalog is not None else config.get("models", {})
+        self.models = dict(catalog)
+        self.catalog = sorted(catalog.items(), key=lambda item: item[1]["cost_per_1k"])
+        self.window = window or config.get("window", 200)
+        self.explore = explore if explore is not None else config.get("explore", 0.0)
+        self.path = Path(path)
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        ensure_data_dirs()
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS performance (
+                id INTEGER PRIMARY KEY,
+                model TEXT NOT NULL,
+                domain TEXT,
+                task TEXT,
+                success INTEGER NOT NULL,
+                latency REAL,
+                tokens INTEGER,
+                timestamp TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS performance_model_domain
+                ON performance (model, domain, id);
+            """)
+        self._warm()
+
+    def _warm(self):
+        """Load each (model, domain)'s most recent observations into memory."""
+        rows = self._conn.execute(
+            """
+            SELECT model, domain, success, latency FROM (
+                SELECT *, row_number() OVER (
+                    PARTITION BY model, domain ORDER BY id DESC
+                ) AS rank
+                FROM performance
+            )
+            WHERE rank <= ? ORDER BY id
+            """,
+            (self.window,),
+        )
+        for model, domain, success, latency in rows:
+            self._observe(model, domain, success, latency)
+
+    def _observe(self, model, domain, success, latency):
+        for key in ((model, None), (model, domain)):
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = PerformanceWindow(self.window)
+            window.add(success, latency)
+
+    def record(self, model, task, success, latency, tokens, domain=None):
+        """Persist one observation and update the rolling statistics."""
+        timestamp = datetime.now().isoformat()
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO performance "
+                    "(model, domain, task, success, latency, tokens, timestamp) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (model, domain, task, int(success), latency, tokens, timestamp),
+                )
+            self._observe(model, domain, success, latency)
+        return {"recorded": True, "timestamp": timestamp}
+
+    def estimate(self, model, domain=None):
+        """Return ``(accuracy, latency_p95)`` estimates for a model."""
+        prior = self.models.get(model, {}).get("accuracy", 0.5)
+        window = self._windows.get((model, domain)) or self._windows.get((model, None))
+        if window is None or not window.outcomes:
+            return prior, None
+        n = len(window.outcomes)
+        accuracy = (prior * PRIOR_WEIGHT + window.successes) / (PRIOR_WEIGHT + n)
+        return accuracy, window.latency(95)
+
+    def select(self, requirements):
+        """Return the cheapest model meeting ``requirements``, or None.
+
+        Understands ``min_accuracy``, ``max_cost`` (per 1k tokens),
+        ``max_latency`` (p95 seconds) and ``domain`` or ``task_type``.
+        """
+        domain = requirements.get("domain")
+        if domain is None and requirements.get("task_type"):
+            domain = requirements["task_type"].split("-")[0]
+        max_cost = requirements.get("max_cost", float("inf"))
+        affordable = [(n, m) for n, m in self.catalog if m["cost_per_1k"] <= max_cost]
+        if not affordable:
+            return None
+
+        if self.explore and self._rng.random() < self.explore:
+            name, meta = self._rng.choice(affordable)
+            accuracy, p95 = self.estimate(name, domain)
+            return RoutedModel(name, meta["cost_per_1k"], accuracy, p95, explored=True)
+
+        for name, meta in affordable:
+            accuracy, p95 = self.estimate(name, domain)
+            if accuracy < requirements.get("min_accuracy", 0):
+                continue
+            max_latency = requirements.get("max_latency")
+            if max_latency is not None and p95 is not None and p95 > max_latency:
+                continue
+            return RoutedModel(name, meta["cost_per_1k"], accuracy, p95)
+        return None
+
+
+@lru_cache(maxsize=None)
+def default_router():
+    """Return the process-wide router backed by DATA_DIR."""
+    return ModelRouter()
+
+
+def select_model(requirements):
+    """Select the most appropriate model based on requirements."""
+    return default_router().select(requirements)
 
 
 def track_performance(model, task, success, latency, tokens):
     """Track model performance for a given task."""
-    from datetime import datetime
-
-    return {"recorded": True, "timestamp": datetime.now().isoformat()}
+    domain = analyze_task(task)["domain"]
+    return default_router().record(model, task, success, latency, tokens, domain)
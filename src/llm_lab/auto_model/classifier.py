@@ -0,0 +1,216 @@
+"""Local task classifier: regex features and small linear models, no LLM calls."""
+
+import math
+import re
+from functools import lru_cache
+
+import numpy as np
+
+DOMAINS = ("code", "math", "writing", "analysis", "chat")
+MAX_OUTPUT_TOKENS = 8000
+
+# Each feature is matched on its own, so one word can count towards several
+# (e.g. "report" is both analysis and long output). Patterns match whole
+# words, so inflections are spelled out.
+KEYWORDS = {
+    "code": r"code|coding|functions?|class(?:es)?|methods?|bugs?|debug(?:ging)?"
+    r"|refactor(?:ing)?|unit tests?|test suites?|python|javascript|typescript"
+    r"|rust|sql|databases?|apis?|endpoints?|modules?|compil(?:e|es|ed|ing|er)"
+    r"|stack ?traces?|implement(?:s|ed|ing|ation)?|scripts?|regex(?:es)?"
+    r"|librar(?:y|ies)|repos?|repositor(?:y|ies)|pull requests?"
+    r"|deploy(?:s|ed|ing|ment)?|dockerfiles?",
+    "math": r"calculat(?:e|es|ed|ion)|compute|equations?|integrals?|derivatives?"
+    r"|prove|proofs?|theorems?|probabilit(?:y|ies)|matri(?:x|ces)|solve|sum of"
+    r"|percent(?:age)?s?|\d+\s*[-+*/^]\s*\d+",
+    "writing": r"write|writing|essays?|emails?|blogs?|posts?|stor(?:y|ies)|poems?"
+    r"|letters?|rewrite|tone|drafts?|proofread|paragraphs?|headlines?|copy|tweets?",
+    "analysis": r"analy[sz]e|analysis|compare|evaluate|assess|summari[sz]e"
+    r"|reports?|trends?|datasets?|data|metrics|insights?|reviews?|pros and cons"
+    r"|trade-?offs?",
+    "chat": r"what is|what's|who|when|where|why|define|meaning of|tell me|hello|hi",
+    "complex": r"architectures?|design(?:s|ed|ing)?|distributed"
+    r"|optimi[sz](?:e|es|ed|ing|ation)|scal(?:e|able|ing|ability)|security"
+    r"|concurren\w*|migrat\w*|end-to-end|production|multi-?step|systems?",
+    "long_output": r"detailed|comprehensive|full|complete|step[- ]by[- ]step"
+    r"|guides?|tutorials?|document(?:s|ation)?|reports?|essays?|plans?",
+    "short_output": r"brief(?:ly)?|short|one (?:line|word|sentence)|quick(?:ly)?"
+    r"|tl;?dr|yes or no",
+}
+FEATURE_PATTERNS = {
+    name: re.compile(rf"\b(?:{pattern})\b", re.IGNORECASE)
+    for name, pattern in KEYWORDS.items()
+}
+LIST_ITEM = re.compile(r"^\s*(?:[-*]|\d+[.)])\s", re.MULTILINE)
+FEATURES = list(KEYWORDS) + [
+    "list_items",
+    "code_blocks",
+    "log_words",
+    "questions",
+    "conjunctions",
+    "bias",
+]
+
+# (task, domain, complexity, expected output tokens)
+SEED_TASKS = [
+    ("Generate unit tests for authentication module", "code", 0.6, 900),
+    ("Fix the bug in this Python function", "code", 0.4, 400),
+    ("Refactor the payment service into smaller modules", "code", 0.7, 1500),
+    ("Write a SQL query that lists customers by total order amount", "code", 0.4, 200),
+    ("Implement a rate limiter class in Python with tests", "code", 0.7, 1200),
+    ("Design a distributed job queue architecture with retries", "code", 0.9, 2500),
+    ("Explain this stack trace", "code", 0.3, 300),
+    ("Write a regex that matches email addresses", "code", 0.3, 100),
+    (
+        "Migrate the API endpoints to async and optimize database access",
+        "code",
+        0.9,
+        2000,
+    ),
+    ("Add a Dockerfile for the web app", "code", 0.3, 250),
+    ("What is 17 * 23?", "math", 0.1, 20),
+    ("Calculate 40 - -7 - 6 + 1", "math", 0.1, 30),
+    ("Solve the equation 3x + 5 = 20", "math", 0.2, 80),
+    ("Prove that the square root of 2 is irrational", "math", 0.6, 500),
+    ("Compute the derivative of x^3 sin(x)", "math", 0.3, 150),
+    ("What is the probability of rolling two sixes?", "math", 0.2, 80),
+    ("Write a blog post about our new release", "writing", 0.5, 1000),
+    ("Draft a short email declining the meeting", "writing", 0.2, 120),
+    ("Rewrite this paragraph in a friendlier tone", "writing", 0.2, 150),
+    ("Write a poem about autumn", "writing", 0.3, 200),
+    ("Write a detailed essay on the history of computing", "writing", 0.6, 2000),
+    ("Proofread this letter", "writing", 0.2, 300),
+    ("Write a tweet announcing the launch", "writing", 0.1, 60),
+    ("Analyze the sales dataset and report the main trends", "analysis", 0.6, 900),
+    ("Compare PostgreSQL and SQLite for our use case", "analysis", 0.5, 700),
+    ("Summarize this article", "analysis", 0.3, 250),
+    ("Evaluate the pros and cons of microservices", "analysis", 0.5, 700),
+    ("Review these metrics and give insights on latency", "analysis", 0.5, 600),
+    (
+        "Assess the security trade-offs of the proposed system design",
+        "analysis",
+        0.8,
+        1200,
+    ),
+    ("Give a brief summary of the meeting notes", "analysis", 0.2, 120),
+    ("What is dependency injection?", "chat", 0.2, 250),
+    ("Explain recursion", "chat", 0.2, 300),
+    ("Who wrote Dune?", "chat", 0.1, 20),
+    ("When was Python first released?", "chat", 0.1, 30),
+    ("Hello, how are you?", "chat", 0.0, 20),
+    ("Define eventual consistency", "chat", 0.3, 150),
+    ("Why is the sky blue? Answer in one sentence", "chat", 0.1, 40),
+    ("How do generators work?", "chat", 0.3, 350),
+    ("Tell me a fun fact", "chat", 0.0, 40),
+    (
+        "Give a comprehensive step-by-step guide to setting up a production cluster",
+        "code",
+        0.8,
+        3000,
+    ),
+    # Pasted code and itemised requests
+    ("Why does this fail?\n```python\nprint(items[len(items)])\n```", "code", 0.3, 200),
+    (
+        "Speed up this query\n```sql\nSELECT * FROM orders WHERE total > 100\n```",
+        "code",
+        0.5,
+        400,
+    ),
+    (
+        "Convert this to TypeScript\n```js\nconst add = (a, b) => a + b\n```\n"
+        "and this\n```js\nconst neg = (a) => -a\n```",
+        "code",
+        0.3,
+        250,
+    ),
+    (
+        "Cover each of these in the release notes:\n- new login page\n"
+        "- faster search\n- bug fixes\n- pricing changes",
+        "writing",
+        0.4,
+        700,
+    ),
+    (
+        "Rank these options for our cache:\n1. Redis\n2. Memcached\n3. SQLite",
+        "analysis",
+        0.5,
+        600,
+    ),
+    (
+        "Answer each:\n1. What is DNS?\n2. What is TCP?\n3. What is TLS?",
+        "chat",
+        0.3,
+        400,
+    ),
+]
+
+
+def features(task):
+    """Return the feature vector for a task description."""
+    counts = {name: len(p.findall(task)) for name, p in FEATURE_PATTERNS.items()}
+    words = task.split()
+    counts["list_items"] = len(LIST_ITEM.findall(task))
+    counts["code_blocks"] = task.count("```") // 2
+    counts["log_words"] = math.log1p(len(words))
+    counts["questions"] = task.count("?")
+    counts["conjunctions"] = sum(
+        w.lower() in ("and", "then", "with", "also") for w in words
+    )
+    counts["bias"] = 1.0
+    return np.fromiter(
+        (
+            min(counts[name], 3.0) if name in KEYWORDS else counts[name]
+            for name in FEATURES
+        ),
+        dtype=np.float64,
+        count=len(FEATURES),
+    )
+
+
+# Output of fit_weights(): a row per feature in FEATURES, a column per domain
+# in DOMAINS, then complexity and log output tokens
+WEIGHTS = np.array(
+    [
+        [0.27344, -0.03565, 0.01019, -0.11473, -0.14063, 0.06682, 0.26139],
+        [-0.19763, 0.53431, 0.05384, -0.13703, -0.26693, -0.05110, -0.59940],
+        [-0.08880, -0.02743, 0.37883, -0.11100, -0.15604, -0.01344, 0.00186],
+        [-0.15098, -0.02728, 0.00555, 0.32750, -0.15848, 0.02767, 0.12969],
+        [-0.06283, -0.00700, -0.01918, -0.13709, 0.22606, -0.05474, -0.66243],
+        [0.07988, -0.02046, 0.01706, -0.02264, -0.05991, 0.13635, 0.45670],
+        [0.07725, -0.03561, 0.07925, -0.08528, -0.04828, 0.09952, 0.68579],
+        [-0.27634, -0.09635, 0.19044, 0.18756, -0.02989, -0.14262, -0.89611],
+        [-0.16806, -0.05853, 0.19916, 0.05985, -0.05211, 0.00031, 0.24210],
+        [0.17384, -0.09289, 0.12958, -0.07417, -0.17190, -0.10938, -0.36864],
+        [0.27070, 0.12042, -0.18943, 0.06200, -0.20038, 0.15215, 0.66317],
+        [-0.02590, 0.04355, -0.06688, -0.05787, 0.11094, -0.02627, 0.03805],
+        [-0.09257, -0.02391, 0.05140, -0.01379, 0.06581, 0.07525, 0.46365],
+        [-0.21935, -0.15842, 0.32811, 0.14254, 0.79536, 0.01634, 4.09977],
+    ]
+)
+
+
+def fit_weights(ridge=0.1):
+    """Fit ridge-regression weights on the seed tasks.
+
+    Returns a ``(features, domains + 2)`` array: one-vs-rest domain scores,
+    then complexity, then log output tokens. :data:`WEIGHTS` holds the
+    result; refit and paste it there after changing the features or seeds.
+    """
+    X = np.stack([features(task) for task, *_ in SEED_TASKS])
+    Y = np.array(
+        [
+            [float(domain == d) for d in DOMAINS] + [complexity, math.log(tokens)]
+            for _, domain, complexity, tokens in SEED_TASKS
+        ]
+    )
+    return np.linalg.solve(X.T @ X + ridge * np.eye(X.shape[1]), X.T @ Y)
+
+
+@lru_cache(maxsize=4096)
+def classify(task):
+    """Return ``(domain, complexity, tokens_estimate)`` for a task."""
+    scores = features(task) @ WEIGHTS
+    domain = DOMAINS[int(np.argmax(scores[: len(DOMAINS)]))]
+    complexity = float(min(max(scores[len(DOMAINS)], 0.0), 1.0))
+    log_tokens = min(scores[len(DOMAINS) + 1], math.log(MAX_OUTPUT_TOKENS))
+    tokens = max(1, int(round(math.exp(log_tokens))))
+    return domain, complexity, tokens
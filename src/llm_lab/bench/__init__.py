@@ -0,0 +1,155 @@
+"""Statistical benchmark harness for model latency and token usage."""
+
+import math
+import random
+from datetime import datetime
+
+from llm_lab import DATA_DIR
+from llm_lab.utils import get_model_responses, load_json, percentile, save_baseline
+
+HISTORY_LIMIT = 20
+
+
+def run_benchmark(
+    prompts, models=None, runs=5, warmup=1, backend=None, max_concurrency=1
+):
+    """Run every prompt against every model ``runs`` times after ``warmup`` runs.
+
+    Returns per-model latency percentiles, tokens/sec, error rate and the raw
+    latency and token samples used for regression testing.
+    """
+    models = list(models or [None])
+    for _ in range(warmup):
+        get_model_responses(prompts, models, max_concurrency, backend)
+
+    samples = {model: [] for model in models}
+    for _ in range(runs):
+        for response in get_model_responses(prompts, models, max_concurrency, backend):
+            samples[response["model"]].append(response)
+
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "runs": runs,
+        "warmup": warmup,
+        "models": {
+            model or "default": summarize_samples(responses)
+            for model, responses in samples.items()
+        },
+    }
+
+
+def summarize_samples(responses):
+    """Summarize a list of responses into benchmark metrics."""
+    ok = [r for r in responses if "error" not in r]
+    latencies = [r["latency"] for r in ok]
+    tokens = [r.get("tokens") or 0 for r in ok]
+    total_latency = sum(latencies)
+    return {
+        "requests": len(responses),
+        "error_rate": (len(responses) - len(ok)) / len(responses) if responses else 0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p90": percentile(latencies, 90),
+        "latency_p99": percentile(latencies, 99),
+        "tokens_per_sec": sum(tokens) / total_latency if total_latency else 0.0,
+        "latency": latencies,
+        "tokens": tokens,
+    }
+
+
+def load_history(name):
+    """Load the stored benchmark runs for a baseline name."""
+    path = DATA_DIR / "baselines" / f"{name}.json"
+    if not path.exists():
+        return []
+    return load_json(path).get("history", [])
+
+
+def save_run(name, run, limit=HISTORY_LIMIT):
+    """Append a benchmark run to the baseline history, keeping the last ``limit``."""
+    history = (load_history(name) + [run])[-limit:]
+    save_baseline(name, {"history": history})
+    return history
+
+
+def pool_runs(runs):
+    """Merge the samples of several runs into one baseline run."""
+    models = {}
+    for run in runs:
+        for model, summary in run["models"].items():
+            pooled = models.setdefault(model, {"latency": [], "tokens": []})
+            pooled["latency"].extend(summary["latency"])
+            pooled["tokens"].extend(summary["tokens"])
+    return {"models": models}
+
+
+def mann_whitney_u(baseline, current):
+    """One-sided Mann-Whitney U test that ``current`` tends to exceed ``baseline``.
+
+    Uses the normal approximation with tie and continuity corrections and
+    returns ``(u, p_value)``.
+    """
+    n1, n2 = len(baseline), len(current)
+    if not n1 or not n2:
+        return 0.0, 1.0
+    combined = sorted([(v, 0) for v in baseline] + [(v, 1) for v in current])
+    n = n1 + n2
+    rank_sum, ties, i = 0.0, 0, 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        tied = j - i + 1
+        average_rank = (i + j) / 2 + 1
+        rank_sum += average_rank * sum(1 for k in range(i, j + 1) if combined[k][1])
+        ties += tied**3 - tied
+        i = j + 1
+
+    u = rank_sum - n2 * (n2 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return u, 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def bootstrap_median_diff(baseline, current, iterations=1000, confidence=0.95, seed=0):
+    """Bootstrap a confidence interval for median(current) - median(baseline)."""
+    if not baseline or not current:
+        return 0.0, 0.0
+    rng = random.Random(seed)
+    diffs = sorted(
+        percentile(rng.choices(current, k=len(current)), 50)
+        - percentile(rng.choices(baseline, k=len(baseline)), 50)
+        for _ in range(iterations)
+    )
+    tail = (1 - confidence) / 2 * 100
+    return percentile(diffs, tail), percentile(diffs, 100 - tail)
+
+
+def compare_samples(baseline, current, alpha=0.05):
+    """Compare two samples and flag a statistically significant increase."""
+    u, p_value = mann_whitney_u(baseline, current)
+    low, high = bootstrap_median_diff(baseline, current)
+    return {
+        "u": u,
+        "p_value": p_value,
+        "median_delta": percentile(current, 50) - percentile(baseline, 50),
+        "ci": [low, high],
+        "regressed": p_value < alpha and low > 0,
+    }
+
+
+def detect_regressions(
+    baseline_run, current_run, metrics=("latency", "tokens"), alpha=0.05
+):
+    """Return the model/metric comparisons where ``current_run`` regressed."""
+    regressions = []
+    for model, current in current_run["models"].items():
+        baseline = baseline_run["models"].get(model)
+        if baseline is None:
+            continue
+        for metric in metrics:
+            comparison = compare_samples(baseline[metric], current[metric], alpha)
+            if comparison["regressed"]:
+                regressions.append({"model": model, "metric": metric, **comparison})
+    return regressions
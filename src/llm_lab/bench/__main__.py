@@ -0,0 +1,58 @@
+"""Run the benchmark suite: python -m llm_lab.bench [--offline] [--save NAME]."""
+
+import argparse
+import json
+
+from llm_lab.bench import (
+    detect_regressions,
+    load_history,
+    pool_runs,
+    run_benchmark,
+    save_run,
+)
+from llm_lab.fake import fake_backend
+from llm_lab.utils import load_config
+
+
+def main(argv=None):
+    config = load_config().get("bench", {})
+    parser = argparse.ArgumentParser(prog="python -m llm_lab.bench")
+    parser.add_argument("models", nargs="*", help="Models to benchmark")
+    parser.add_argument("--runs", type=int, default=config.get("runs", 5))
+    parser.add_argument("--warmup", type=int, default=config.get("warmup", 1))
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--offline", action="store_true", help="Use a stub model")
+    parser.add_argument("--save", metavar="NAME", help="Append run to baseline NAME")
+    parser.add_argument("--alpha", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    backend = fake_backend(latency=0.02, jitter=0.01) if args.offline else None
+    run = run_benchmark(
+        config.get("prompts", ["Explain recursion"]),
+        args.models,
+        runs=args.runs,
+        warmup=args.warmup,
+        backend=backend,
+        max_concurrency=args.concurrency,
+    )
+    for model, summary in run["models"].items():
+        print(
+            f"{model}: p50={summary['latency_p50']:.3f}s "
+            f"p90={summary['latency_p90']:.3f}s p99={summary['latency_p99']:.3f}s "
+            f"tokens/s={summary['tokens_per_sec']:.1f} "
+            f"errors={summary['error_rate']:.1%}"
+        )
+
+    regressions = []
+    if args.save:
+        history = load_history(args.save)
+        if history:
+            regressions = detect_regressions(pool_runs(history), run, alpha=args.alpha)
+        for regression in regressions:
+            print("REGRESSION", json.dumps(regression))
+        save_run(args.save, run)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
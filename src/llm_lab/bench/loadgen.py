@@ -0,0 +1,186 @@
+"""Closed-loop load generator: N virtual users calling a target concurrently.
+
+Usage::
+
+    python -m llm_lab.bench.loadgen --users 20 --duration 30 --model fake
+    python -m llm_lab.bench.loadgen --users 50 --url http://127.0.0.1:11434
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+from llm_lab.utils import percentile
+
+
+def model_target(model_id, prompt="Explain recursion", options=None):
+    """Return a target prompting an ``llm`` model (e.g. the ``fake`` plugin)."""
+    import llm
+
+    model = llm.get_model(model_id)
+
+    def target(user, iteration):
+        start = time.perf_counter()
+        response = model.prompt(prompt, **(options or {}))
+        ttft = None
+        tokens = 0
+        for _ in response:
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            tokens += 1
+        return {"ttft": ttft, "tokens": tokens}
+
+    return target
+
+
+def ollama_target(base_url, model="llama3.2:latest", prompt="Explain recursion"):
+    """Return a target streaming ``/api/generate`` NDJSON from an Ollama server."""
+    url = base_url.rstrip("/") + "/api/generate"
+    body = json.dumps({"model": model, "prompt": prompt, "stream": True}).encode()
+
+    def target(user, iteration):
+        start = time.perf_counter()
+        request = urllib.request.Request(
+            url, data=body, headers={"Content-Type": "application/json"}
+        )
+        ttft = None
+        tokens = 0
+        with urllib.request.urlopen(request, timeout=300) as response:
+            for line in response:
+                chunk = json.loads(line)
+                if chunk.get("done"):
+                    tokens = chunk.get("eval_count", tokens)
+                    break
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                tokens += 1
+        return {"ttft": ttft, "tokens": tokens}
+
+    return target
+
+
+def run_load(target, users=10, duration=None, iterations=None, ramp_up=0.0, think=0.0):
+    """Drive ``target(user, iteration)`` from ``users`` threads and summarize.
+
+    Each virtual user loops until ``duration`` seconds pass or it has made
+    ``iterations`` calls. Users start evenly over ``ramp_up`` seconds and
+    pause ``think`` seconds between calls. A target may return a dict with
+    ``tokens`` and ``ttft``; exceptions count as errors.
+    """
+    if duration is None and iterations is None:
+        raise ValueError("Set duration or iterations")
+    samples = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else None
+
+    def user(index):
+        time.sleep(ramp_up * index / users)
+        iteration = 0
+        while iterations is None or iteration < iterations:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            began = time.perf_counter()
+            try:
+                result = target(index, iteration) or {}
+                error = None
+            except Exception as exc:
+                result, error = {}, f"{type(exc).__name__}: {exc}"
+            sample = {
+                "latency": time.perf_counter() - began,
+                "ttft": result.get("ttft"),
+                "tokens": result.get("tokens", 0),
+                "error": error,
+            }
+            with lock:
+                samples.append(sample)
+            iteration += 1
+            if think:
+                time.sleep(think)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize_load(samples, time.perf_counter() - start, users)
+
+
+def summarize_load(samples, elapsed, users):
+    """Return throughput, error rate and latency/TTFT percentiles."""
+    ok = [sample for sample in samples if sample["error"] is None]
+    latencies = [sample["latency"] for sample in ok]
+    ttfts = [sample["ttft"] for sample in ok if sample["ttft"] is not None]
+    errors = {}
+    for sample in samples:
+        if sample["error"]:
+            errors[sample["error"]] = errors.get(sample["error"], 0) + 1
+    summary = {
+        "users": users,
+        "duration": elapsed,
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "error_rate": (len(samples) - len(ok)) / len(samples) if samples else 0.0,
+        "requests_per_sec": len(ok) / elapsed if elapsed else 0.0,
+        "tokens_per_sec": sum(s["tokens"] for s in ok) / elapsed if elapsed else 0.0,
+        "error_types": errors,
+    }
+    for name, values in (("latency", latencies), ("ttft", ttfts)):
+        for q in (50, 90, 95, 99):
+            summary[f"{name}_p{q}"] = percentile(values, q)
+        summary[f"{name}_max"] = max(values, default=0.0)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m llm_lab.bench.loadgen")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, help="Seconds to run")
+    parser.add_argument("--iterations", type=int, help="Calls per user")
+    parser.add_argument("--ramp-up", type=float, default=0.0)
+    parser.add_argument("--think", type=float, default=0.0)
+    parser.add_argument("--model", default="fake", help="llm model id")
+    parser.add_argument("--url", help="Ollama-compatible server instead of llm")
+    parser.add_argument("--prompt", default="Explain recursion")
+    parser.add_argument("--json", action="store_true", help="Print the raw summary")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        target = ollama_target(args.url, args.model, args.prompt)
+    else:
+        target = model_target(args.model, args.prompt)
+    duration = args.duration
+    if duration is None and args.iterations is None:
+        duration = 10.0
+    summary = run_load(
+        target,
+        users=args.users,
+        duration=duration,
+        iterations=args.iterations,
+        ramp_up=args.ramp_up,
+        think=args.think,
+    )
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+    print(
+        f"{summary['requests']} requests from {summary['users']} users in "
+        f"{summary['duration']:.1f}s: {summary['requests_per_sec']:.1f} req/s, "
+        f"{summary['tokens_per_sec']:.0f} tokens/s, "
+        f"errors {summary['error_rate']:.1%}"
+    )
+    for name in ("latency", "ttft"):
+        print(
+            f"{name:<8} p50={summary[f'{name}_p50']:.3f}s "
+            f"p90={summary[f'{name}_p90']:.3f}s p95={summary[f'{name}_p95']:.3f}s "
+            f"p99={summary[f'{name}_p99']:.3f}s max={summary[f'{name}_max']:.3f}s"
+        )
+    for error, count in summary["error_types"].items():
+        print(f"  {count} x {error}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
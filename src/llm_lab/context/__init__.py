@@ -1,16 +1,249 @@
 """Context management functionality."""
 
+import heapq
+import sqlite3
+import time
+import uuid
+from bisect import bisect_left
+from datetime import datetime
 
-def create_context(config):
-    """Create a new context with specified configuration."""
+from llm_lab.context.retention import RetentionStore as RetentionStore
+from llm_lab.context.retention import parse_duration
+from llm_lab.utils import count_tokens, load_config, truncate_tokens
+
+
+class ContextEntry:
+    """A single piece of context with its relevance score."""
+
+    __slots__ = ("id", "content", "relevance", "created_at", "_tokens")
+
+    def __init__(self, content, relevance, id=None, created_at=None, tokens=None):
+        self.id = id or uuid.uuid4().hex
+        self.content = content
+        self.relevance = relevance
+        self.created_at = created_at or time.time()
+        self._tokens = tokens
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = count_tokens(self.content)
+        return self._tokens
+
+    def __repr__(self):
+        return f"ContextEntry(id={self.id!r}, relevance={self.relevance})"
+
+
+class ContextStore:
+    """Context entries kept sorted by relevance.
+
+    Entries live in a list ordered by ascending relevance alongside a parallel
+    list of scores, so pruning below a threshold is one binary search and one
+    slice deletion, and the most relevant entries are read from the end.
+    :meth:`add` pushes onto a heap in O(log n); pending entries are merged
+    into the sorted list in one linear pass by the next read.
+    """
+
+    def __init__(self, entries=()):
+        self._entries = sorted(entries, key=lambda e: e.relevance)
+        self._scores = [e.relevance for e in self._entries]
+        self._pending = []
+        self._added = 0
+
+    def __len__(self):
+        return len(self._entries) + len(self._pending)
+
+    def __iter__(self):
+        """Iterate entries from most to least relevant."""
+        self._merge()
+        return reversed(self._entries)
+
+    def add(self, content, relevance, **kwargs):
+        """Add an entry and return it."""
+        entry = ContextEntry(content, relevance, **kwargs)
+        # The counter keeps equal scores in insertion order
+        heapq.heappush(self._pending, (relevance, self._added, entry))
+        self._added += 1
+        return entry
+
+    def _merge(self):
+        if not self._pending:
+            return
+        added = [heapq.heappop(self._pending)[2] for _ in range(len(self._pending))]
+        self._entries = list(
+            heapq.merge(self._entries, added, key=lambda e: e.relevance)
+        )
+        self._scores = [e.relevance for e in self._entries]
+
+    def extend(self, entries):
+        """Add many entries with a single merge sort."""
+        self._merge()
+        self._entries.extend(entries)
+        self._entries.sort(key=lambda e: e.relevance)
+        self._scores = [e.relevance for e in self._entries]
+
+    def prune(self, min_relevance):
+        """Drop entries below ``min_relevance`` and return them."""
+        self._merge()
+        index = bisect_left(self._scores, min_relevance)
+        pruned = self._entries[:index]
+        del self._entries[:index]
+        del self._scores[:index]
+        return pruned
+
+    def top_k_tokens(self, budget):
+        """Return the most relevant entries that fit within a token budget."""
+        self._merge()
+        return self._entries[self._budget_index(budget) :][::-1]
+
+    def prune_to_budget(self, budget):
+        """Keep only the most relevant entries fitting ``budget`` tokens; return the rest."""
+        self._merge()
+        index = self._budget_index(budget)
+        pruned = self._entries[:index]
+        del self._entries[:index]
+        del self._scores[:index]
+        return pruned
+
+    def _budget_index(self, budget):
+        used = 0
+        for index in range(len(self._entries) - 1, -1, -1):
+            used += self._entries[index].tokens
+            if used > budget:
+                return index + 1
+        return 0
 
-    class Context:
-        def __init__(self, id, type, retention, metadata):
-            self.id = id
-            self.type = type
-            self.retention = retention
-            self.metadata = metadata
+    def save(self, path):
+        """Persist entries to a SQLite database, replacing its contents atomically."""
+        self._merge()
+        conn = sqlite3.connect(path, isolation_level=None)
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS context_entries (
+                    id TEXT PRIMARY KEY,
+                    content TEXT,
+                    relevance REAL NOT NULL,
+                    tokens INTEGER,
+                    created_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS context_entries_relevance
+                    ON context_entries (relevance);
+                """)
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM context_entries")
+                conn.executemany(
+                    "INSERT INTO context_entries VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (e.id, e.content, e.relevance, e._tokens, e.created_at)
+                        for e in self._entries
+                    ),
+                )
+        finally:
+            conn.close()
 
+    @classmethod
+    def load(cls, path):
+        """Load a store saved with :meth:`save`."""
+        conn = sqlite3.connect(path)
+        rows = conn.execute(
+            "SELECT id, content, relevance, tokens, created_at "
+            "FROM context_entries ORDER BY relevance"
+        )
+        store = cls()
+        store._entries = [
+            ContextEntry(content, relevance, id, created_at, tokens)
+            for id, content, relevance, tokens, created_at in rows
+        ]
+        store._scores = [e.relevance for e in store._entries]
+        conn.close()
+        return store
+
+
+def _entry_fields(entry):
+    if isinstance(entry, ContextEntry):
+        return entry.content, entry.relevance, entry.tokens
+    return entry["content"], entry["relevance"], count_tokens(entry["content"])
+
+
+def pack_context(entries, budget=None, separator="\n\n", truncate=True):
+    """Pack the most relevant context into a prompt within a token budget.
+
+    Entries (dicts with ``content``/``relevance`` or :class:`ContextEntry`)
+    are chosen greedily by relevance per token, the usual knapsack
+    approximation, and the best single entry is taken instead if it alone
+    scores higher. With ``truncate``, leftover budget is filled with the
+    start of the best entry that did not fit. The budget defaults to
+    ``processing.max_tokens``.
+    """
+    budget = budget if budget is not None else load_config()["processing"]["max_tokens"]
+    entries = list(entries)
+    sep_tokens = count_tokens(separator)
+    items = [(*_entry_fields(entry), index) for index, entry in enumerate(entries)]
+    smallest = min((item[2] for item in items), default=0)
+
+    # Pop entries lazily in order of relevance per token, stopping once
+    # nothing else could fit, instead of sorting the whole set
+    heap = [(-item[1] / max(item[2], 1), -item[1], item[3]) for item in items]
+    heapq.heapify(heap)
+    chosen, used, score, skipped = [], 0, 0.0, []
+    while heap and budget - used >= smallest + (sep_tokens if chosen else 0):
+        item = items[heapq.heappop(heap)[2]]
+        cost = item[2] + (sep_tokens if chosen else 0)
+        if used + cost <= budget:
+            chosen.append(item)
+            used += cost
+            score += item[1]
+        else:
+            skipped.append(item)
+    skipped.extend(items[entry[2]] for entry in heap)
+
+    best_single = max(
+        (item for item in items if item[2] <= budget),
+        key=lambda item: item[1],
+        default=None,
+    )
+    if best_single and best_single[1] > score:
+        skipped = [item for item in items if item is not best_single]
+        chosen, used, score = [best_single], best_single[2], best_single[1]
+
+    truncated = None
+    room = budget - used - (sep_tokens if chosen else 0)
+    if truncate and skipped and room > 0:
+        content, relevance, tokens, index = max(skipped, key=lambda item: item[1])
+        content = truncate_tokens(content, room)
+        kept = count_tokens(content)
+        if content and kept <= room:
+            chosen.append((content, relevance, kept, index))
+            used += kept + (sep_tokens if len(chosen) > 1 else 0)
+            score += relevance * kept / max(tokens, 1)
+            truncated = index
+
+    chosen.sort(key=lambda item: item[1], reverse=True)
+    return {
+        "prompt": separator.join(item[0] for item in chosen),
+        "entries": [entries[item[3]] for item in chosen],
+        "tokens": used,
+        "budget": budget,
+        "relevance": score,
+        "dropped": len(items) - len(chosen),
+        "truncated": truncated,
+    }
+
+
+class Context:
+    """A named context holding its entries in a :class:`ContextStore`."""
+
+    def __init__(self, id, type, retention, metadata):
+        self.id = id
+        self.type = type
+        self.retention = retention
+        self.metadata = metadata
+        self.store = ContextStore()
+
+
+def create_context(config):
+    """Create a new context with specified configuration."""
     return Context(
         id=config["id"],
         type=config["type"],
@@ -21,17 +254,24 @@ def create_context(config):
 
 def prune_context(entries, min_relevance):
     """Prune context entries based on relevance."""
-    kept = [e for e in entries if e["relevance"] >= min_relevance]
-    pruned = [e for e in entries if e["relevance"] < min_relevance]
+    kept, pruned = [], []
+    for entry in entries:
+        (kept if entry["relevance"] >= min_relevance else pruned).append(entry)
     return {"kept": kept, "pruned": pruned}
 
 
-def apply_memory_policy(policy, content):
-    """Apply memory management policy to content."""
-    from datetime import datetime, timedelta
+def apply_memory_policy(policy, content, store=None):
+    """Apply memory management policy to content.
 
-    retention_days = int(policy["retention"].replace("w", "")) * 7
-    return {
-        "retention_date": (datetime.now() + timedelta(days=retention_days)).isoformat(),
-        "compressed": policy["compression"],
+    With a :class:`RetentionStore`, the content is stored (compressed if the
+    policy asks for it) and expires after the policy's retention.
+    """
+    retention = parse_duration(policy["retention"])
+    result = {
+        "retention_date": (datetime.now() + retention).isoformat(),
+        "compressed": bool(policy["compression"]),
     }
+    if store is not None:
+        record = store.put(content, policy["retention"], policy["compression"])
+        result["id"] = record["id"]
+    return result
@@ -0,0 +1,179 @@
+"""Retention engine: expiring, compressed storage for context memory."""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from datetime import timedelta
+from pathlib import Path
+
+from llm_lab import DATA_DIR, ensure_data_dirs
+
+DURATION_UNITS = {
+    "h": timedelta(hours=1),
+    "d": timedelta(days=1),
+    "w": timedelta(weeks=1),
+    "m": timedelta(days=30),
+}
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*([hdwm])")
+
+logger = logging.getLogger(__name__)
+
+
+def parse_duration(spec):
+    """Parse durations like ``"12h"``, ``"3d"``, ``"1w"``, ``"6m"`` or ``"1w2d"``.
+
+    ``m`` is a 30-day month.
+    """
+    spec = spec.strip().lower()
+    parts = DURATION_PATTERN.findall(spec)
+    if not parts or DURATION_PATTERN.sub("", spec).strip():
+        raise ValueError(f"Invalid duration: {spec!r}")
+    return sum((float(n) * DURATION_UNITS[unit] for n, unit in parts), timedelta())
+
+
+class RetentionStore:
+    """SQLite store of context memory with expiry and cold-content compression.
+
+    Every entry records an indexed ``expires_at``; :meth:`sweep` deletes
+    expired entries in bulk and zlib-compresses entries not read for
+    ``cold_after``. :meth:`get` decompresses transparently.
+    """
+
+    def __init__(
+        self,
+        path=DATA_DIR / "context" / "memory.db",
+        cold_after="1d",
+        compress_level=6,
+    ):
+        self.path = Path(path)
+        self.cold_after = parse_duration(cold_after).total_seconds()
+        self.compress_level = compress_level
+        self._local = threading.local()
+        self._sweeper = None
+        self._stop = threading.Event()
+        ensure_data_dirs()
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS memory (
+                id TEXT PRIMARY KEY,
+                context_id TEXT,
+                content BLOB NOT NULL,
+                compressed INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS memory_expires_at ON memory (expires_at);
+            CREATE INDEX IF NOT EXISTS memory_cold
+                ON memory (compressed, accessed_at);
+            """)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, content, retention, compression=False, id=None, context_id=None):
+        """Store content for the ``retention`` duration and return its record."""
+        now = time.time()
+        record = {
+            "id": id or uuid.uuid4().hex,
+            "expires_at": now + parse_duration(retention).total_seconds(),
+            "compressed": bool(compression),
+        }
+        data = content.encode()
+        if compression:
+            data = zlib.compress(data, self.compress_level)
+        self._connect().execute(
+            "INSERT OR REPLACE INTO memory VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                record["id"],
+                context_id,
+                data,
+                int(record["compressed"]),
+                now,
+                now,
+                record["expires_at"],
+            ),
+        )
+        return record
+
+    def get(self, id):
+        """Return stored content, or None if missing or expired."""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT content, compressed FROM memory WHERE id = ? AND expires_at > ?",
+            (id, now),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE memory SET accessed_at = ? WHERE id = ?", (now, id))
+        data, compressed = row
+        return (zlib.decompress(data) if compressed else data).decode()
+
+    def sweep(self, now=None):
+        """Delete expired entries and compress cold ones in bulk."""
+        now = now or time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = conn.execute(
+                "DELETE FROM memory WHERE expires_at <= ?", (now,)
+            ).rowcount
+            cold = conn.execute(
+                "SELECT id, content FROM memory WHERE compressed = 0 AND accessed_at <= ?",
+                (now - self.cold_after,),
+            ).fetchall()
+            updates = []
+            for id, data in cold:
+                packed = zlib.compress(data, self.compress_level)
+                if len(packed) < len(data):
+                    updates.append((packed, id))
+            conn.executemany(
+                "UPDATE memory SET content = ?, compressed = 1 WHERE id = ?", updates
+            )
+        return {"expired": expired, "compressed": len(updates)}
+
+    def start_sweeper(self, interval=60.0):
+        """Run :meth:`sweep` every ``interval`` seconds on a daemon thread."""
+        if self._sweeper and self._sweeper.is_alive():
+            return self._sweeper
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                # A locked or briefly unavailable database must not end the loop
+                try:
+                    self.sweep()
+                except Exception:
+                    logger.exception("Retention sweep failed")
+
+        self._sweeper = threading.Thread(target=loop, daemon=True)
+        self._sweeper.start()
+        return self._sweeper
+
+    def stop_sweeper(self):
+        """Stop the background sweeper, if running."""
+        self._stop.set()
+        if self._sweeper:
+            self._sweeper.join()
+            self._sweeper = None
+
+    def stats(self):
+        """Return entry counts and stored bytes."""
+        entries, compressed, size = (
+            self._connect()
+            .execute(
+                "SELECT count(*), sum(compressed), sum(length(content)) FROM memory"
+            )
+            .fetchone()
+        )
+        return {"entries": entries, "compressed": compressed or 0, "bytes": size or 0}
@@ -0,0 +1,164 @@
+"""Pooled read-only SQLite access for database chat tools."""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class ConnectionPool:
+    """A bounded pool of read-only SQLite connections.
+
+    Connections are opened with ``mode=ro`` URIs and ``PRAGMA query_only`` so
+    model-written SQL cannot modify the database. Each connection keeps its own
+    prepared-statement cache, so repeated SQL strings skip re-parsing.
+
+    The database must already exist. ``wal=True`` switches it to WAL
+    journaling so readers run alongside a writer; that setting persists in
+    the file, so it is left to callers that own the database.
+    """
+
+    def __init__(self, path, size=4, cached_statements=256, timeout=30, wal=False):
+        self.path = Path(path)
+        if not self.path.is_file():
+            raise FileNotFoundError(f"No SQLite database at {self.path}")
+        self.size = size
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._schema = None
+        self._schema_version = None
+        if wal:
+            self._enable_wal()
+
+    def _uri(self, mode):
+        return f"{self.path.resolve().as_uri()}?mode={mode}"
+
+    def _enable_wal(self):
+        # mode=rw never creates the file, unlike a plain connect()
+        conn = sqlite3.connect(self._uri("rw"), uri=True, timeout=self.timeout)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self._uri("ro"),
+            uri=True,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, blocking while all ``size`` are in use."""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._opened < self.size
+                if grow:
+                    self._opened += 1
+            if grow:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def schema_version(self):
+        """Return ``PRAGMA schema_version``, which changes on every DDL statement."""
+        with self.connection() as conn:
+            return conn.execute("PRAGMA schema_version").fetchone()[0]
+
+    def schema(self):
+        """Return ``{table: [(column, type), ...]}``, cached until the schema changes."""
+        with self.connection() as conn:
+            version = conn.execute("PRAGMA schema_version").fetchone()[0]
+            if self._schema is not None and version == self._schema_version:
+                return self._schema
+            tables = [
+                name
+                for (name,) in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' "
+                    "AND name NOT LIKE 'sqlite_%' ORDER BY name"
+                )
+            ]
+            schema = {
+                table: [
+                    (row[1], row[2])
+                    for row in conn.execute(
+                        "SELECT * FROM pragma_table_info(?)", (table,)
+                    )
+                ]
+                for table in tables
+            }
+        self._schema, self._schema_version = schema, version
+        return schema
+
+    def describe(self):
+        """Return the schema as text for a system prompt."""
+        lines = []
+        for table, columns in self.schema().items():
+            lines.append(f"Table: {table}")
+            lines.extend(f"  - {name} ({kind})" for name, kind in columns)
+        return "\n".join(lines)
+
+    def iter_rows(self, sql, params=(), batch_size=256):
+        """Yield the column names, then rows fetched ``batch_size`` at a time."""
+        with self.connection() as conn:
+            cursor = conn.execute(sql, params)
+            try:
+                yield [col[0] for col in cursor.description or ()]
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cursor.close()
+
+    def query(self, sql, params=(), max_rows=1000, batch_size=256):
+        """Run a query, returning at most ``max_rows`` rows.
+
+        Only ``max_rows + 1`` rows are ever fetched, so ``truncated`` can be
+        reported without reading the rest of a large result.
+        """
+        rows = self.iter_rows(sql, params, batch_size=min(batch_size, max_rows + 1))
+        try:
+            columns = next(rows)
+            result = []
+            for row in rows:
+                if len(result) == max_rows:
+                    return {"columns": columns, "rows": result, "truncated": True}
+                result.append(list(row))
+            return {"columns": columns, "rows": result, "truncated": False}
+        finally:
+            rows.close()
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
@@ -0,0 +1,116 @@
+"""Shape query results into compact, token-budgeted columnar payloads."""
+
+import json
+from bisect import bisect_right
+
+from llm_lab.utils import count_tokens
+
+# SQLite's cross-type ordering: numbers < text < blobs
+TYPE_ORDER = {int: 0, float: 0, str: 1, bytes: 2}
+
+
+def _order(value):
+    return (TYPE_ORDER.get(type(value), 3), value)
+
+
+def _describe(value):
+    return f"<{len(value)} bytes>" if isinstance(value, bytes) else value
+
+
+def dumps(data):
+    """Serialize without whitespace, as sent to the model."""
+    return json.dumps(data, separators=(",", ":"), default=str)
+
+
+class ColumnStats:
+    """Single-pass count, nulls, min/max and distinct for one column.
+
+    Distinct values are tracked exactly up to ``distinct_limit``; beyond that
+    the count is reported as a lower bound.
+    """
+
+    __slots__ = ("count", "nulls", "min", "max", "_distinct", "_limit", "_capped")
+
+    def __init__(self, distinct_limit=10_000):
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self._distinct = set()
+        self._limit = distinct_limit
+        self._capped = False
+
+    def add(self, value):
+        if value is None:
+            self.nulls += 1
+            return
+        self.count += 1
+        if self.min is None:
+            self.min = self.max = value
+        else:
+            key = _order(value)
+            if key < _order(self.min):
+                self.min = value
+            elif key > _order(self.max):
+                self.max = value
+        if not self._capped:
+            self._distinct.add(value)
+            if len(self._distinct) >= self._limit:
+                self._capped = True
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "nulls": self.nulls,
+            "min": _describe(self.min),
+            "max": _describe(self.max),
+            "distinct": len(self._distinct),
+            "distinct_exact": not self._capped,
+        }
+
+
+def shape_rows(
+    columns, rows, budget=2000, model="gpt-3.5-turbo", distinct_limit=10_000
+):
+    """Stream rows into a columnar payload that fits ``budget`` tokens.
+
+    Every row feeds the column stats, but rows are only kept while they fit the
+    budget (after the column names and stats are accounted for).
+    """
+    stats = [ColumnStats(distinct_limit) for _ in columns]
+    kept, prefix, used, total = [], [], 0, 0
+    for row in rows:
+        total += 1
+        for column, value in zip(stats, row):
+            column.add(value)
+        if used <= budget:
+            used += count_tokens(dumps(row)[1:-1], model) + 1
+            kept.append(row)
+            prefix.append(used)
+
+    shaped = {
+        "columns": list(columns),
+        "rows": 0,
+        "total_rows": total,
+        "truncated": False,
+        "stats": {name: column.summary() for name, column in zip(columns, stats)},
+        "values": [],
+    }
+    overhead = count_tokens(dumps(shaped), model)
+    keep = bisect_right(prefix, budget - overhead)
+    shaped["rows"] = keep
+    shaped["truncated"] = keep < total
+    shaped["values"] = [list(values) for values in zip(*kept[:keep])] or [
+        [] for _ in columns
+    ]
+    return shaped
+
+
+def shape_query(pool, sql, params=(), budget=2000, batch_size=1000, **kwargs):
+    """Run a query on a ``ConnectionPool`` and shape the streamed result."""
+    rows = pool.iter_rows(sql, params, batch_size=batch_size)
+    try:
+        columns = next(rows)
+        return shape_rows(columns, rows, budget=budget, **kwargs)
+    finally:
+        rows.close()
@@ -0,0 +1,162 @@
+"""Cache of natural-language questions to generated SQL."""
+
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+from llm_lab import DATA_DIR, ensure_data_dirs
+from llm_lab.embeddings import normalize
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question):
+    """Case-fold and strip punctuation and extra whitespace from a question."""
+    text = unicodedata.normalize("NFKC", question).casefold()
+    return WHITESPACE.sub(" ", PUNCTUATION.sub(" ", text)).strip()
+
+
+class SQLCache:
+    """Maps questions to the SQL a model generated for them.
+
+    Entries are keyed on the database and its ``PRAGMA schema_version``, so any
+    schema change starts from an empty cache. With an ``embed`` callable,
+    questions whose embeddings are at least ``threshold`` cosine-similar to a
+    cached one also hit.
+    """
+
+    def __init__(
+        self, path=DATA_DIR / "cache" / "nl2sql.db", embed=None, threshold=0.92
+    ):
+        self.path = Path(path)
+        self.embed = embed
+        self.threshold = threshold
+        self.hits = {"exact": 0, "similar": 0}
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.saved_tokens = 0
+        self._vectors = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        ensure_data_dirs()
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS questions (
+                db TEXT NOT NULL,
+                schema_version INTEGER NOT NULL,
+                question TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                embedding BLOB,
+                latency REAL NOT NULL DEFAULT 0,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (db, schema_version, question)
+            );
+            """)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _embedded(self, db, version):
+        key = (db, version)
+        with self._lock:
+            if key not in self._vectors:
+                rows = self._connect().execute(
+                    "SELECT question, embedding FROM questions "
+                    "WHERE db = ? AND schema_version = ? AND embedding IS NOT NULL",
+                    (db, version),
+                )
+                questions, vectors = [], []
+                for question, blob in rows:
+                    questions.append(question)
+                    vectors.append(np.frombuffer(blob, dtype=np.float32))
+                self._vectors[key] = (questions, np.array(vectors, dtype=np.float32))
+            return self._vectors[key]
+
+    def get(self, question, schema_version, db=""):
+        """Return ``{"sql", "question", "match", "score"}`` or None on a miss."""
+        db, normalized = str(db), normalize_question(question)
+        conn = self._connect()
+        match, score = "exact", 1.0
+        row = conn.execute(
+            "SELECT question, sql, latency, tokens FROM questions "
+            "WHERE db = ? AND schema_version = ? AND question = ?",
+            (db, schema_version, normalized),
+        ).fetchone()
+        if row is None and self.embed is not None:
+            questions, vectors = self._embedded(db, schema_version)
+            if questions:
+                scores = vectors @ normalize(self.embed(normalized))
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    match, score = "similar", float(scores[best])
+                    row = conn.execute(
+                        "SELECT question, sql, latency, tokens FROM questions "
+                        "WHERE db = ? AND schema_version = ? AND question = ?",
+                        (db, schema_version, questions[best]),
+                    ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits[match] += 1
+            self.saved_seconds += row[2]
+            self.saved_tokens += row[3]
+        return {"sql": row[1], "question": row[0], "match": match, "score": score}
+
+    def set(self, question, schema_version, sql, db="", latency=0.0, tokens=0):
+        """Cache the SQL generated for a question, with what generating it cost."""
+        db, normalized = str(db), normalize_question(question)
+        embedding = None
+        if self.embed is not None:
+            embedding = normalize(self.embed(normalized)).tobytes()
+        self._connect().execute(
+            "INSERT OR REPLACE INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                db,
+                schema_version,
+                normalized,
+                sql,
+                embedding,
+                latency,
+                tokens,
+                time.time(),
+            ),
+        )
+        with self._lock:
+            self._vectors.pop((db, schema_version), None)
+
+    def discard(self, question, schema_version, db=""):
+        """Forget a question, e.g. after its cached SQL failed."""
+        self._connect().execute(
+            "DELETE FROM questions WHERE db = ? AND schema_version = ? AND question = ?",
+            (str(db), schema_version, normalize_question(question)),
+        )
+        with self._lock:
+            self._vectors.pop((str(db), schema_version), None)
+
+    def stats(self):
+        """Return hit rates and the model time and tokens hits avoided."""
+        hits = sum(self.hits.values())
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "exact_hits": self.hits["exact"],
+            "similar_hits": self.hits["similar"],
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+            "saved_tokens": self.saved_tokens,
+        }
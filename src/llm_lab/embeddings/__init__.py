@@ -0,0 +1,190 @@
+"""Vectorized similarity search over llm embedding collections."""
+
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+from llm_lab import DATA_DIR, ensure_data_dirs
+
+CACHE_DIR = DATA_DIR / "embeddings"
+LOAD_CHUNK = 10_000
+# Cap on the (queries x vectors) score matrix built per batch, in floats
+SCORE_BLOCK = 16_000_000
+
+
+def embeddings_db_path():
+    """Return the path of the llm embeddings database."""
+    import llm
+
+    return llm.user_dir() / "embeddings.db"
+
+
+def normalize(vectors):
+    """Scale vectors (rows) to unit length, leaving zero vectors as they are."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def cache_stem(db_path, name):
+    """Return the cache file stem of a collection in one embeddings database."""
+    db_key = hashlib.sha1(str(Path(db_path).resolve()).encode()).hexdigest()[:12]
+    return f"{name}-{db_key}"
+
+
+def collection_signature(conn, name):
+    """Return ``(collection_id, model, signature)`` for a collection.
+
+    The signature changes whenever rows are added, replaced or deleted.
+    ``updated`` only has one-second resolution, so it also carries a digest
+    of every row's id and content hash to catch re-embeds within a second.
+    """
+    row = conn.execute(
+        "SELECT id, model FROM collections WHERE name = ?", (name,)
+    ).fetchone()
+    if row is None:
+        raise KeyError(f"Collection '{name}' does not exist")
+    collection_id, model = row
+    signature = conn.execute(
+        "SELECT count(*), max(updated), max(rowid) FROM embeddings "
+        "WHERE collection_id = ?",
+        (collection_id,),
+    ).fetchone()
+    digest = hashlib.blake2b(digest_size=16)
+    cursor = conn.execute(
+        "SELECT id || char(0), coalesce(content_hash, x'') FROM embeddings "
+        "WHERE collection_id = ? ORDER BY rowid",
+        (collection_id,),
+    )
+    while rows := cursor.fetchmany(LOAD_CHUNK):
+        digest.update(b"".join(id.encode() + content for id, content in rows))
+    return collection_id, model, [*signature, digest.hexdigest()]
+
+
+def top_k(scores, k):
+    """Return ``(indexes, scores)`` of the k largest scores, best first."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=scores.dtype)
+    if k < scores.shape[-1]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[-1])
+    order = candidates[np.argsort(-scores[candidates], kind="stable")]
+    return order, scores[order]
+
+
+class VectorIndex:
+    """Exact cosine search over unit-normalized vectors held in one matrix."""
+
+    def __init__(self, ids, vectors, model=None, normalized=False):
+        self.ids = list(ids)
+        self.vectors = vectors if normalized else normalize(vectors)
+        self.model = model
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_collection(cls, name, db_path=None, cache_dir=CACHE_DIR, refresh=False):
+        """Load a collection from the llm embeddings database.
+
+        Vectors are cached as a memory-mapped ``.npy`` file, keyed by the
+        database and collection, that is rebuilt only when the collection's
+        signature changes.
+        """
+        db_path = db_path or embeddings_db_path()
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        try:
+            # One read transaction so the signature matches the rows loaded
+            conn.execute("BEGIN")
+            collection_id, model, signature = collection_signature(conn, name)
+            stem = Path(cache_dir) / cache_stem(db_path, name)
+            matrix_path = stem.with_name(f"{stem.name}.npy")
+            meta_path = stem.with_name(f"{stem.name}.json")
+            meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+            if (
+                refresh
+                or meta.get("signature") != signature
+                or not matrix_path.exists()
+            ):
+                ids = _write_matrix(conn, collection_id, signature[0], matrix_path)
+                meta = {"signature": signature, "model": model, "ids": ids}
+                meta_path.write_text(json.dumps(meta))
+        finally:
+            conn.close()
+        vectors = np.load(matrix_path, mmap_mode="r")
+        return cls(meta["ids"], vectors, model=model, normalized=True)
+
+    def embed(self, text):
+        """Embed query text with the collection's embedding model."""
+        import llm
+
+        return llm.get_embedding_model(self.model).embed(text)
+
+    def search(self, query, k=10):
+        """Return the ``(id, score)`` pairs most similar to a vector or text."""
+        if not self.ids:
+            return []
+        if isinstance(query, str):
+            query = self.embed(query)
+        indexes, scores = top_k(self.vectors @ normalize(query), k)
+        return [(self.ids[i], float(s)) for i, s in zip(indexes, scores)]
+
+    def search_many(self, queries, k=10):
+        """Search several query vectors at once with blocked matrix products."""
+        queries = normalize(queries)
+        if not self.ids:
+            return [[] for _ in queries]
+        block = max(1, SCORE_BLOCK // max(len(self.ids), 1))
+        results = []
+        for start in range(0, len(queries), block):
+            scores = queries[start : start + block] @ self.vectors.T
+            for row in scores:
+                indexes, top = top_k(row, k)
+                results.append([(self.ids[i], float(s)) for i, s in zip(indexes, top)])
+        return results
+
+
+def iter_vectors(conn, collection_id, after_rowid=0, chunk_size=LOAD_CHUNK):
+    """Yield ``(rowids, ids, vectors)`` chunks of a collection in rowid order."""
+    cursor = conn.execute(
+        "SELECT rowid, id, embedding FROM embeddings "
+        "WHERE collection_id = ? AND rowid > ? ORDER BY rowid",
+        (collection_id, after_rowid),
+    )
+    while rows := cursor.fetchmany(chunk_size):
+        vectors = np.frombuffer(b"".join(row[2] for row in rows), dtype="<f4")
+        yield (
+            [row[0] for row in rows],
+            [row[1] for row in rows],
+            vectors.reshape(len(rows), -1),
+        )
+
+
+def _write_matrix(conn, collection_id, count, path):
+    """Stream a collection's vectors into a normalized ``.npy`` file; return ids."""
+    ensure_data_dirs()
+    path.parent.mkdir(exist_ok=True, parents=True)
+    ids = []
+    tmp_path = path.with_suffix(".tmp.npy")
+    matrix = None
+    for _, chunk_ids, chunk in iter_vectors(conn, collection_id):
+        if matrix is None:
+            matrix = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=np.float32, shape=(count, chunk.shape[1])
+            )
+        matrix[len(ids) : len(ids) + len(chunk_ids)] = normalize(chunk)
+        ids.extend(chunk_ids)
+    if matrix is None:
+        matrix = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float32, shape=(0, 0)
+        )
+    matrix.flush()
+    del matrix
+    os.replace(tmp_path, path)
+    return ids
@@ -0,0 +1,233 @@
+"""Inverted-file (IVF) approximate nearest-neighbor index for embeddings."""
+
+import json
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+from llm_lab import ensure_data_dirs
+from llm_lab.embeddings import (
+    CACHE_DIR,
+    LOAD_CHUNK,
+    cache_stem,
+    collection_signature,
+    embeddings_db_path,
+    iter_vectors,
+    normalize,
+    top_k,
+)
+
+ASSIGN_BLOCK = 65_536
+
+
+def npz_path(path):
+    """Return ``path`` as ``np.savez`` writes it, with an ``.npz`` suffix."""
+    path = Path(path)
+    return path if path.suffix == ".npz" else path.with_name(path.name + ".npz")
+
+
+def assign(vectors, centroids):
+    """Return the index of the nearest centroid (by cosine) for each vector."""
+    labels = np.empty(len(vectors), dtype=np.intp)
+    for start in range(0, len(vectors), ASSIGN_BLOCK):
+        block = vectors[start : start + ASSIGN_BLOCK]
+        labels[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def kmeans(vectors, k, iterations=15, sample=None, seed=0):
+    """Spherical k-means on unit vectors; returns unit-length centroids.
+
+    Trains on at most ``sample`` rows (default ``64 * k``) to bound build time.
+    """
+    rng = np.random.default_rng(seed)
+    sample = sample or 64 * k
+    if len(vectors) > sample:
+        vectors = vectors[np.sort(rng.choice(len(vectors), sample, replace=False))]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        empty = ~sums.any(axis=1)
+        # Reseed empty clusters from random points
+        sums[empty] = vectors[rng.choice(len(vectors), empty.sum())]
+        centroids = normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    """Approximate cosine search that scans only the ``nprobe`` closest clusters.
+
+    Vectors are partitioned by a k-means coarse quantizer into inverted lists.
+    New rows can be added incrementally; re-added ids replace their old vector.
+    """
+
+    def __init__(self, centroids, nprobe=8, model=None):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.nprobe = nprobe
+        self.model = model
+        self.watermark = 0
+        self.signature = None
+        self._ids = [np.empty(0, dtype=object) for _ in self.centroids]
+        self._vectors = [
+            np.empty((0, self.centroids.shape[1]), dtype=np.float32)
+            for _ in self.centroids
+        ]
+        self._list_of = {}
+
+    def __len__(self):
+        return len(self._list_of)
+
+    @classmethod
+    def build(cls, ids, vectors, nlist=None, nprobe=8, model=None, seed=0):
+        """Train the quantizer on ``vectors`` and index them."""
+        vectors = normalize(vectors)
+        nlist = nlist or max(1, min(4096, int(np.sqrt(len(vectors)))))
+        index = cls(kmeans(vectors, nlist, seed=seed), nprobe=nprobe, model=model)
+        index.add(ids, vectors)
+        return index
+
+    def add(self, ids, vectors):
+        """Add (or replace) vectors, appending each to its nearest list."""
+        ids = np.asarray(ids, dtype=object)
+        vectors = normalize(vectors)
+        self.remove(ids.tolist())
+
+        labels = assign(vectors, self.centroids)
+        for list_no in np.unique(labels):
+            members = labels == list_no
+            self._ids[list_no] = np.concatenate([self._ids[list_no], ids[members]])
+            self._vectors[list_no] = np.concatenate(
+                [self._vectors[list_no], vectors[members]]
+            )
+        self._list_of.update(zip(ids.tolist(), labels.tolist()))
+
+    def remove(self, ids):
+        """Drop vectors by id; unknown ids are ignored."""
+        removed = {}
+        for id in ids:
+            list_no = self._list_of.pop(id, None)
+            if list_no is not None:
+                removed.setdefault(list_no, set()).add(id)
+        for list_no, stale in removed.items():
+            keep = np.array([id not in stale for id in self._ids[list_no]], dtype=bool)
+            self._ids[list_no] = self._ids[list_no][keep]
+            self._vectors[list_no] = self._vectors[list_no][keep]
+
+    def search(self, query, k=10, nprobe=None):
+        """Return approximate ``(id, score)`` pairs most similar to a vector."""
+        query = normalize(query)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        probes, _ = top_k(self.centroids @ query, nprobe)
+        ids = np.concatenate([self._ids[p] for p in probes])
+        scores = np.concatenate([self._vectors[p] @ query for p in probes])
+        indexes, top = top_k(scores, k)
+        return [(ids[i], float(s)) for i, s in zip(indexes, top)]
+
+    def save(self, path):
+        """Persist the index to an ``.npz`` file."""
+        sizes = [len(ids) for ids in self._ids]
+        np.savez(
+            npz_path(path),
+            centroids=self.centroids,
+            vectors=np.concatenate(self._vectors),
+            ids=np.concatenate(self._ids).astype(str),
+            offsets=np.concatenate([[0], np.cumsum(sizes)]),
+            meta=json.dumps(
+                {
+                    "nprobe": self.nprobe,
+                    "model": self.model,
+                    "watermark": self.watermark,
+                    "signature": self.signature,
+                }
+            ),
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with :meth:`save`."""
+        with np.load(npz_path(path)) as data:
+            meta = json.loads(str(data["meta"]))
+            index = cls(data["centroids"], nprobe=meta["nprobe"], model=meta["model"])
+            offsets = data["offsets"]
+            ids = data["ids"].astype(object)
+            vectors = data["vectors"]
+        for list_no in range(len(index.centroids)):
+            start, end = offsets[list_no], offsets[list_no + 1]
+            index._ids[list_no] = ids[start:end]
+            index._vectors[list_no] = vectors[start:end]
+            index._list_of.update(dict.fromkeys(ids[start:end].tolist(), list_no))
+        index.watermark = meta["watermark"]
+        index.signature = meta["signature"]
+        return index
+
+    def _sync(self, conn, collection_id):
+        """Reconcile the index with a collection it was built from."""
+        current = {
+            id
+            for (id,) in conn.execute(
+                "SELECT id FROM embeddings WHERE collection_id = ? AND rowid <= ?",
+                (collection_id, self.watermark),
+            )
+        }
+        self.remove([id for id in self._list_of if id not in current])
+        # Rows re-embedded in place keep their rowid but get a new timestamp;
+        # ">=" also catches updates within the second of the last sync
+        synced_at = self.signature[1] if self.signature else None
+        if synced_at is not None:
+            cursor = conn.execute(
+                "SELECT id, embedding FROM embeddings "
+                "WHERE collection_id = ? AND rowid <= ? AND updated >= ?",
+                (collection_id, self.watermark, synced_at),
+            )
+            while rows := cursor.fetchmany(LOAD_CHUNK):
+                vectors = np.frombuffer(b"".join(row[1] for row in rows), dtype="<f4")
+                self.add([row[0] for row in rows], vectors.reshape(len(rows), -1))
+        for rowids, ids, vectors in iter_vectors(conn, collection_id, self.watermark):
+            self.add(ids, vectors)
+            self.watermark = rowids[-1]
+
+    @classmethod
+    def from_collection(
+        cls, name, db_path=None, path=None, nlist=None, nprobe=8, rebuild=False
+    ):
+        """Build, load or incrementally update the IVF index of a collection.
+
+        The index is stored next to the exact-search cache. When it already
+        exists, only rows added past its rowid watermark or updated since the
+        last sync are read, and ids deleted from the collection are dropped.
+        """
+        db_path = db_path or embeddings_db_path()
+        path = npz_path(path or CACHE_DIR / f"{cache_stem(db_path, name)}.ivf.npz")
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        try:
+            conn.execute("BEGIN")
+            collection_id, model, signature = collection_signature(conn, name)
+            if path.exists() and not rebuild:
+                index = cls.load(path)
+                if index.signature == signature:
+                    return index
+                index._sync(conn, collection_id)
+            else:
+                chunks = list(iter_vectors(conn, collection_id))
+                if not chunks:
+                    raise ValueError(f"Collection '{name}' is empty")
+                index = cls.build(
+                    [id for _, ids, _ in chunks for id in ids],
+                    np.concatenate([vectors for _, _, vectors in chunks]),
+                    nlist=nlist,
+                    nprobe=nprobe,
+                    model=model,
+                )
+                index.watermark = chunks[-1][0][-1]
+        finally:
+            conn.close()
+        index.signature = signature
+        ensure_data_dirs()
+        path.parent.mkdir(exist_ok=True, parents=True)
+        index.save(path)
+        return index
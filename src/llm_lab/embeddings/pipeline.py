@@ -0,0 +1,189 @@
+"""Deduplicating, batched pipeline for filling llm embedding collections."""
+
+import glob
+import hashlib
+import json
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+from llm_lab.embeddings import embeddings_db_path
+
+
+def content_hash(content):
+    """Hash content the way llm collections do (MD5 digest)."""
+    if isinstance(content, str):
+        content = content.encode("utf8")
+    return hashlib.md5(content).digest()
+
+
+def files_source(pattern, root=".", binary=False):
+    """Yield ``(id, content, None)`` for files matching a glob, like ``--files``."""
+    root = Path(root)
+    for path in sorted(glob.glob(str(root / pattern), recursive=True)):
+        path = Path(path)
+        if path.is_file():
+            content = path.read_bytes() if binary else path.read_text(errors="replace")
+            yield str(path.relative_to(root)), content, None
+
+
+def sql_source(db_path, sql, params=()):
+    """Yield ``(id, content, None)`` rows from SQL, like ``--sql``.
+
+    The first column is the id and the remaining columns are joined with spaces.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        for row in conn.execute(sql, params):
+            yield str(row[0]), " ".join(str(v) for v in row[1:] if v is not None), None
+    finally:
+        conn.close()
+
+
+def jsonl_source(path, metadata_key=None):
+    """Yield ``(id, content, metadata)`` from a JSON lines file.
+
+    Each object needs an ``id``; other fields (except ``metadata_key``) form
+    the content, as ``llm embed-multi`` does for JSON input.
+    """
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            metadata = row.pop(metadata_key, None) if metadata_key else None
+            id = str(row.pop("id"))
+            yield id, " ".join(str(v) for v in row.values() if v is not None), metadata
+
+
+def open_collection(name, db_path=None, model=None):
+    """Open (creating if ``model`` is given) an llm collection."""
+    import llm
+    from sqlite_utils import Database
+
+    db = Database(db_path or embeddings_db_path())
+    kwargs = {"model_id": model} if isinstance(model, str) else {"model": model}
+    return llm.Collection(name, db, create=model is not None, **kwargs)
+
+
+def embed_pipeline(
+    collection,
+    items,
+    db_path=None,
+    model=None,
+    batch_size=100,
+    workers=4,
+    store=False,
+    embed=None,
+):
+    """Embed ``(id, content, metadata)`` items into a collection, skipping unchanged ones.
+
+    Items whose content hash is already stored under the same id are
+    skipped; content already embedded under another id reuses that vector.
+    The rest are embedded in batches of ``batch_size`` on ``workers``
+    threads and written with one ``executemany`` transaction per batch.
+    ``embed`` maps a list of contents to vectors and defaults to the
+    collection's embedding model. Returns counts of what was done.
+    """
+    if isinstance(collection, str):
+        collection = open_collection(collection, db_path, model)
+    embed = embed or (lambda batch: list(collection.model().embed_multi(batch)))
+    conn = collection.db.conn
+    known = dict(
+        conn.execute(
+            "SELECT id, content_hash FROM embeddings WHERE collection_id = ?",
+            (collection.id,),
+        )
+    )
+    copies = []
+    known_hashes = set(known.values())
+    stats = {"seen": 0, "skipped": 0, "reused": 0, "embedded": 0, "batches": 0}
+
+    def write(rows):
+        with conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO embeddings
+                    (collection_id, id, embedding, content, content_blob,
+                     content_hash, metadata, updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+
+    def row(id, content, metadata, digest, blob):
+        return (
+            collection.id,
+            id,
+            blob,
+            content if store and isinstance(content, str) else None,
+            content if store and isinstance(content, bytes) else None,
+            digest,
+            json.dumps(metadata) if metadata else None,
+            int(time.time()),
+        )
+
+    def fresh_items():
+        for id, content, metadata in items:
+            stats["seen"] += 1
+            digest = content_hash(content)
+            if known.get(id) == digest:
+                stats["skipped"] += 1
+                continue
+            if digest in known_hashes:
+                # Same content under another id: reuse its vector once known
+                stats["reused"] += 1
+                copies.append((id, content, metadata, digest))
+                if len(copies) >= batch_size:
+                    write_copies()
+                continue
+            known_hashes.add(digest)
+            yield id, content, metadata, digest
+
+    def write_copies():
+        ready, waiting = [], []
+        for id, content, metadata, digest in copies:
+            stored = conn.execute(
+                "SELECT embedding FROM embeddings "
+                "WHERE collection_id = ? AND content_hash = ? LIMIT 1",
+                (collection.id, digest),
+            ).fetchone()
+            if stored is None:
+                # Still being embedded in this run
+                waiting.append((id, content, metadata, digest))
+            else:
+                ready.append(row(id, content, metadata, digest, stored[0]))
+        if ready:
+            write(ready)
+        copies[:] = waiting
+
+    def embed_batch(batch):
+        return batch, embed([item[1] for item in batch])
+
+    def flush(future):
+        batch, vectors = future.result()
+        rows = []
+        for (id, content, metadata, digest), vector in zip(batch, vectors):
+            blob = np.asarray(vector, dtype="<f4").tobytes()
+            rows.append(row(id, content, metadata, digest, blob))
+        write(rows)
+        stats["embedded"] += len(rows)
+        stats["batches"] += 1
+
+    pending = fresh_items()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        while batch := list(islice(pending, batch_size)):
+            in_flight.append(pool.submit(embed_batch, batch))
+            # Bound the number of batches held in memory
+            while len(in_flight) >= 2 * workers:
+                flush(in_flight.popleft())
+        while in_flight:
+            flush(in_flight.popleft())
+    write_copies()
+    return stats
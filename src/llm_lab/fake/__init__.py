@@ -0,0 +1,119 @@
+"""Local fake models for exercising LLM Lab without a network."""
+
+import math
+import random
+import threading
+import time
+
+DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+def sample_latency(rng, mean, distribution="fixed", spread=0.5):
+    """Draw a delay in seconds averaging ``mean``.
+
+    ``spread`` is the half-width (as a fraction of the mean) for ``uniform``
+    and the log-space sigma for ``lognormal``, whose long tail mimics real
+    provider latency.
+    """
+    if mean <= 0:
+        return 0.0
+    if distribution == "fixed":
+        return mean
+    if distribution == "uniform":
+        return max(0.0, rng.uniform(mean * (1 - spread), mean * (1 + spread)))
+    if distribution == "exponential":
+        return rng.expovariate(1 / mean)
+    if distribution == "lognormal":
+        # Pick mu so the distribution's mean is ``mean``
+        return rng.lognormvariate(math.log(mean) - spread**2 / 2, spread)
+    raise ValueError(f"Unknown latency distribution: {distribution}")
+
+
+class CallRandom:
+    """Hand out a generator per call, seeded by the call's key and repeat count.
+
+    The nth call with a given key always draws the same numbers, so seeded
+    fakes behave the same however concurrent calls are interleaved.
+    """
+
+    __slots__ = ("_counts", "_lock")
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, *key):
+        with self._lock:
+            n = self._counts[key] = self._counts.get(key, -1) + 1
+        return random.Random("\0".join(map(str, (*key, n))))
+
+
+class FakeResponse:
+    """Streamed response from a :class:`FakeModel`."""
+
+    def __init__(self, chunks, ttft, interval):
+        self._chunks = chunks
+        self._ttft = ttft
+        self._interval = interval
+        self._done = False
+
+    def __iter__(self):
+        for i, chunk in enumerate(self._chunks):
+            time.sleep(self._ttft if i == 0 else self._interval)
+            yield chunk
+        self._done = True
+
+    def text(self):
+        if not self._done:
+            for _ in self:
+                pass
+        return "".join(self._chunks)
+
+    def usage(self):
+        class Usage:
+            input = None
+            output = len(self._chunks)
+
+        return Usage()
+
+
+class FakeModel:
+    """Model that replays a canned reply at a configurable pace.
+
+    Each whitespace-separated word of ``reply`` is one token, the first after
+    ``ttft`` seconds and the rest at ``tokens_per_sec``.
+    """
+
+    model_id = "fake"
+
+    def __init__(self, reply="The answer is 42", ttft=0.05, tokens_per_sec=100.0):
+        self.reply = reply
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+
+    def prompt(self, prompt, system=None, stream=True, **options):
+        words = self.reply.split(" ")
+        chunks = [words[0]] + [" " + word for word in words[1:]]
+        return FakeResponse(chunks, self.ttft, 1 / self.tokens_per_sec)
+
+
+def fake_backend(latency=0.01, jitter=0.0, tokens=50, error_rate=0.0, seed=None):
+    """Return a ``(prompt, model) -> response`` backend that sleeps instead of calling a model.
+
+    Latency is uniform in ``latency ± jitter`` seconds and a fraction
+    ``error_rate`` of calls raise, like a flaky provider would. With a
+    ``seed``, the nth call for each prompt and model draws from its own
+    generator, so concurrent runs see the same outcomes in any order.
+    """
+    rng = random.Random()
+    per_call = CallRandom()
+
+    def backend(prompt, model=None):
+        draw = rng if seed is None else per_call(seed, model, prompt)
+        delay = max(0.0, latency + draw.uniform(-jitter, jitter))
+        time.sleep(delay)
+        if draw.random() < error_rate:
+            raise RuntimeError("fake model error")
+        return {"text": f"Fake reply to: {prompt}", "tokens": tokens, "latency": delay}
+
+    return backend
@@ -0,0 +1,99 @@
+"""``llm`` plugin registering fake models for offline load testing.
+
+Registered through the ``llm`` entry point in pyproject.toml, so once the
+package is installed ``llm -m fake "hello"`` works with no network.
+"""
+
+import json
+import random
+import time
+
+import llm
+from pydantic import Field
+
+from llm_lab.fake import DISTRIBUTIONS, CallRandom, sample_latency
+
+
+class FakeLLM(llm.Model):
+    """Streams a canned reply with configurable latency, errors and tool calls."""
+
+    can_stream = True
+    supports_tools = True
+
+    class Options(llm.Options):
+        reply: str | None = Field(
+            None, description="Reply text (default: echoes the prompt)"
+        )
+        ttft_ms: float = Field(200.0, description="Mean time to first token")
+        latency: str = Field(
+            "lognormal", description=f"TTFT distribution: {', '.join(DISTRIBUTIONS)}"
+        )
+        spread: float = Field(0.5, description="Distribution spread")
+        tokens_per_sec: float = Field(50.0, description="Decode rate")
+        error_rate: float = Field(0.0, description="Fraction of calls that fail")
+        tool_script: str | None = Field(
+            None,
+            description="JSON list of turns; a turn is a reply string or a list "
+            'of {"name", "arguments"} tool calls',
+        )
+        seed: int | None = Field(None, description="Random seed")
+
+    def __init__(self, model_id="fake", **defaults):
+        self.model_id = model_id
+        self.defaults = defaults
+        self._rng = random.Random()
+        self._per_call = CallRandom()
+
+    def __str__(self):
+        return f"Fake: {self.model_id}"
+
+    def _options(self, options):
+        # Per-model defaults apply unless the caller set the option explicitly
+        values = options.model_dump()
+        for name, value in self.defaults.items():
+            if name not in options.model_fields_set:
+                values[name] = value
+        return values
+
+    def execute(self, prompt, stream, response, conversation):
+        options = self._options(prompt.options)
+        seed = options["seed"]
+        # Threads share the model, so seeded calls get their own generator
+        rng = self._rng if seed is None else self._per_call(seed, prompt.prompt)
+        ttft = options["ttft_ms"] / 1000
+        time.sleep(sample_latency(rng, ttft, options["latency"], options["spread"]))
+        if rng.random() < options["error_rate"]:
+            raise llm.ModelError(f"{self.model_id}: simulated provider error")
+
+        input_tokens = len((prompt.prompt or "").split())
+        reply = options["reply"] or f"Fake reply to: {prompt.prompt}"
+        if options["tool_script"] and prompt.tools:
+            turns = json.loads(options["tool_script"])
+            turn = turns[
+                min(len(conversation.responses) if conversation else 0, len(turns) - 1)
+            ]
+            if isinstance(turn, list):
+                for call in turn:
+                    response.add_tool_call(
+                        llm.ToolCall(
+                            name=call["name"], arguments=call.get("arguments", {})
+                        )
+                    )
+                response.set_usage(input=input_tokens, output=0)
+                return
+            reply = turn
+
+        words = reply.split(" ")
+        interval = 1 / options["tokens_per_sec"]
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(interval)
+            yield word if i == 0 else " " + word
+        response.set_usage(input=input_tokens, output=len(words))
+
+
+@llm.hookimpl
+def register_models(register):
+    register(FakeLLM("fake"))
+    register(FakeLLM("fake-fast", ttft_ms=0.0, tokens_per_sec=1e6))
+    register(FakeLLM("fake-flaky", error_rate=0.1))
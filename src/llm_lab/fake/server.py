@@ -0,0 +1,211 @@
+"""Local HTTP stand-in for Ollama's streaming NDJSON API.
+
+Serves ``/api/version``, ``/api/tags``, ``/api/generate`` and ``/api/chat``
+with the same chunk and final-telemetry fields Ollama sends, so
+``scripts/ollama-stream-telemetry.sh`` and Ollama clients can be exercised
+without a model::
+
+    python -m llm_lab.fake.server --port 11434 --ttft-ms 150 --error-rate 0.05
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_lab.fake import DISTRIBUTIONS, sample_latency
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Request handler; behaviour comes from the server's ``profile`` dict."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/version":
+            self._send_json(200, {"version": "0.0.0-fake"})
+        elif self.path == "/api/tags":
+            models = [{"name": name} for name in self.server.profile["models"]]
+            self._send_json(200, {"models": models})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path not in ("/api/generate", "/api/chat"):
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+        profile = self.server.profile
+        rng = self.server.rng
+        start = time.perf_counter_ns()
+        time.sleep(
+            sample_latency(
+                rng,
+                profile["ttft_ms"] / 1000,
+                profile["latency"],
+                profile["spread"],
+            )
+        )
+        if rng.random() < profile["error_rate"]:
+            self._send_json(profile["error_status"], {"error": "simulated error"})
+            return
+
+        chat = self.path == "/api/chat"
+        if chat:
+            prompt = " ".join(
+                message.get("content", "") for message in request.get("messages", [])
+            )
+        else:
+            prompt = request.get("prompt", "")
+        reply = profile["reply"] or f"Fake reply to: {prompt}"
+        words = reply.split(" ")
+        chunks = [words[0]] + [" " + word for word in words[1:]]
+        model = request.get("model", profile["models"][0])
+
+        def chunk(text, done):
+            data = {"model": model, "created_at": _now(), "done": done}
+            if chat:
+                data["message"] = {"role": "assistant", "content": text}
+            else:
+                data["response"] = text
+            return data
+
+        eval_start = time.perf_counter_ns()
+        stream = request.get("stream", True)
+        if stream:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+        interval = 1 / profile["tokens_per_sec"]
+        for i, text in enumerate(chunks):
+            if i:
+                time.sleep(interval)
+            if stream:
+                self._write_chunk(chunk(text, False))
+        final = {
+            **chunk("" if stream else reply, True),
+            "done_reason": "stop",
+            "total_duration": time.perf_counter_ns() - start,
+            "load_duration": 0,
+            "prompt_eval_count": len(prompt.split()),
+            "prompt_eval_duration": eval_start - start,
+            "eval_count": len(chunks),
+            "eval_duration": time.perf_counter_ns() - eval_start,
+        }
+        if stream:
+            self._write_chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self._send_json(200, final)
+
+    def _write_chunk(self, data):
+        line = json.dumps(data).encode() + b"\n"
+        self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under load tests
+    request_queue_size = 1024
+
+
+def make_server(
+    host="127.0.0.1",
+    port=11434,
+    models=("llama3.2:latest",),
+    reply=None,
+    ttft_ms=150.0,
+    latency="lognormal",
+    spread=0.5,
+    tokens_per_sec=50.0,
+    error_rate=0.0,
+    error_status=500,
+    seed=None,
+):
+    """Create (but do not start) a fake Ollama server; ``port=0`` picks a free one."""
+    server = FakeOllamaServer((host, port), FakeOllamaHandler)
+    server.rng = random.Random(seed)
+    server.profile = {
+        "models": list(models),
+        "reply": reply,
+        "ttft_ms": ttft_ms,
+        "latency": latency,
+        "spread": spread,
+        "tokens_per_sec": tokens_per_sec,
+        "error_rate": error_rate,
+        "error_status": error_status,
+    }
+    return server
+
+
+def serve_in_background(**kwargs):
+    """Start a fake server on a daemon thread; returns ``(server, base_url)``."""
+    server = make_server(**{"port": 0, **kwargs})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m llm_lab.fake.server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--model", action="append", help="Model names to list")
+    parser.add_argument("--reply", help="Reply text (default: echo the prompt)")
+    parser.add_argument("--ttft-ms", type=float, default=150.0)
+    parser.add_argument("--latency", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--spread", type=float, default=0.5)
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    server = make_server(
+        args.host,
+        args.port,
+        models=args.model or ["llama3.2:latest"],
+        reply=args.reply,
+        ttft_ms=args.ttft_ms,
+        latency=args.latency,
+        spread=args.spread,
+        tokens_per_sec=args.tokens_per_sec,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    print(f"Fake Ollama listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
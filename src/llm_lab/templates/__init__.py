@@ -0,0 +1,195 @@
+"""Compiled, lazily loaded registry for templates/*.yaml prompt templates."""
+
+import os
+import re
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import yaml
+
+from llm_lab import TEMPLATES_DIR
+
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+PARAMETER_TYPES = {
+    "string": str,
+    "str": str,
+    "boolean": bool,
+    "bool": bool,
+    "integer": int,
+    "int": int,
+    "number": (int, float),
+    "float": (int, float),
+    "list": list,
+    "array": list,
+    "object": dict,
+}
+
+
+def compile_format(text, names):
+    """Turn ``{name}`` placeholders for known parameters into a ``str.format`` string.
+
+    Every other brace is escaped, so JSON or code in a template stays literal.
+    """
+    parts, last = [], 0
+    for match in PLACEHOLDER.finditer(text):
+        literal = text[last : match.start()]
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if match.group(1) in names:
+            parts.append(match.group(0))
+        else:
+            parts.append(match.group(0).replace("{", "{{").replace("}", "}}"))
+        last = match.end()
+    parts.append(text[last:].replace("{", "{{").replace("}", "}}"))
+    return "".join(parts)
+
+
+class Template:
+    """A parsed template with validated parameters and precompiled formatters."""
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+        self.description = data.get("description")
+        self.model = data.get("model")
+        self.parameters = {}
+        for spec in data.get("parameters") or []:
+            kind = spec.get("type", "string")
+            if kind not in PARAMETER_TYPES:
+                raise ValueError(f"Template {name}: unknown type {kind!r}")
+            self.parameters[spec["name"]] = spec
+        self.defaults = {
+            key: spec["default"]
+            for key, spec in self.parameters.items()
+            if "default" in spec
+        }
+        self.required = [
+            key for key, spec in self.parameters.items() if spec.get("required")
+        ]
+        names = set(self.parameters) or {"input"}
+        self._prompt = compile_format(data.get("prompt") or "", names)
+        self._system = compile_format(data.get("system") or "", names)
+        self._options = {
+            provider: {
+                key: self._compile_option(value, names) for key, value in opts.items()
+            }
+            for provider, opts in (data.get("provider_options") or {}).items()
+        }
+        # Parameters the formatters need a value for, declared or not
+        formats = [self._prompt, self._system] + [
+            value
+            for opts in self._options.values()
+            for kind, value in opts.values()
+            if kind == "format"
+        ]
+        self.placeholders = {
+            match.group(1)
+            for text in formats
+            for match in PLACEHOLDER.finditer(text)
+            if match.group(1) in names
+        }
+
+    @staticmethod
+    def _compile_option(value, names):
+        if not isinstance(value, str):
+            return ("value", value)
+        match = PLACEHOLDER.fullmatch(value)
+        if match and match.group(1) in names:
+            # A bare placeholder keeps the parameter's type (e.g. booleans)
+            return ("param", match.group(1))
+        return ("format", compile_format(value, names))
+
+    def values(self, params):
+        """Validate parameters, filling in defaults."""
+        if self.parameters:
+            unknown = set(params) - set(self.parameters)
+            if unknown:
+                raise ValueError(
+                    f"Template {self.name}: unknown parameters {sorted(unknown)}"
+                )
+        values = {**self.defaults, **params}
+        missing = sorted(
+            key for key in {*self.required, *self.placeholders} if key not in values
+        )
+        if missing:
+            raise ValueError(f"Template {self.name}: missing parameters {missing}")
+        for key, value in values.items():
+            spec = self.parameters.get(key)
+            if spec is None:
+                continue
+            kind = spec.get("type", "string")
+            # bool is an int subclass; only accept it for boolean parameters
+            if not isinstance(value, PARAMETER_TYPES[kind]) or (
+                isinstance(value, bool) and PARAMETER_TYPES[kind] is not bool
+            ):
+                raise TypeError(
+                    f"Template {self.name}: parameter {key!r} should be {kind}"
+                )
+        return values
+
+    def options(self, provider, values):
+        """Resolve ``provider_options`` for one provider."""
+        resolved = {}
+        for key, (kind, value) in self._options.get(provider, {}).items():
+            if kind == "param":
+                resolved[key] = values.get(value)
+            elif kind == "format":
+                resolved[key] = value.format_map(values)
+            else:
+                resolved[key] = value
+        return resolved
+
+    def render(self, provider=None, **params):
+        """Render the prompt, system prompt and provider options."""
+        values = self.values(params)
+        return {
+            "prompt": self._prompt.format_map(values),
+            "system": self._system.format_map(values) or None,
+            "options": self.options(provider, values) if provider else {},
+        }
+
+
+class TemplateRegistry:
+    """Loads each template on first use and reuses it until its file changes."""
+
+    def __init__(self, directory=TEMPLATES_DIR):
+        self.directory = Path(directory)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        """Return available template names without parsing them."""
+        return sorted(path.stem for path in self.directory.glob("*.yaml"))
+
+    def get(self, name):
+        """Return the compiled template, reparsing only if the file's mtime changed."""
+        path = self.directory / f"{name}.yaml"
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._cache.get(name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with self._lock:
+            with open(path) as f:
+                template = Template(name, yaml.safe_load(f) or {})
+            self._cache[name] = (mtime, template)
+        return template
+
+    def render(self, name, provider=None, **params):
+        """Render a template by name."""
+        return self.get(name).render(provider, **params)
+
+
+@lru_cache(maxsize=None)
+def default_registry():
+    """Return the process-wide registry for TEMPLATES_DIR."""
+    return TemplateRegistry()
+
+
+def get_template(name):
+    """Return a compiled template from the default registry."""
+    return default_registry().get(name)
+
+
+def render_template(name, provider=None, **params):
+    """Render a template from the default registry."""
+    return default_registry().render(name, provider, **params)
@@ -0,0 +1,274 @@
+"""Client-side rate limiting, retries and adaptive concurrency for providers.
+
+A :class:`Throttle` wraps each call to a provider with:
+
+* token buckets pacing requests/min and tokens/min to the provider's quota,
+* an AIMD limiter that halves concurrency on rate-limit signals and adds
+  one slot per window of successes, and
+* jittered exponential retries for 429s, 5xxs and timeouts.
+"""
+
+import random
+import re
+import threading
+import time
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504, 529}
+# Statuses meaning "slow down" rather than a one-off failure
+CONGESTION_STATUS = {429, 503, 529}
+CONGESTION_TEXT = re.compile(
+    r"rate.?limit|too many requests|overloaded|quota|capacity", re.IGNORECASE
+)
+STATUS_TEXT = re.compile(
+    r"\b(?:error code|status(?: code)?|http)\W{0,3}(\d{3})\b", re.IGNORECASE
+)
+
+
+def status_code(exc):
+    """Return the HTTP status an exception carries, if any."""
+    for owner in (exc, getattr(exc, "response", None)):
+        for name in ("status_code", "status", "code", "http_status"):
+            value = getattr(owner, name, None)
+            if isinstance(value, int) and 100 <= value < 600:
+                return value
+    match = STATUS_TEXT.search(str(exc))
+    return int(match.group(1)) if match else None
+
+
+def is_congestion(exc):
+    """Whether an error asks the client to slow down (429, 503, "overloaded")."""
+    status = status_code(exc)
+    if status is not None:
+        return status in CONGESTION_STATUS
+    return bool(CONGESTION_TEXT.search(str(exc)))
+
+
+def is_retryable(exc):
+    """Whether a call that raised ``exc`` may succeed if repeated."""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    status = status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return is_congestion(exc) or "timed out" in str(exc).lower()
+
+
+def retry_after(exc):
+    """Return the server's ``Retry-After`` delay in seconds, if it sent one."""
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        for owner in (exc, getattr(exc, "response", None)):
+            headers = getattr(owner, "headers", None)
+            if headers is not None:
+                value = headers.get("retry-after") or headers.get("Retry-After")
+                if value is not None:
+                    break
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt, base=0.5, cap=30.0, rng=random):
+    """Full-jitter exponential delay before retry number ``attempt`` (from 0)."""
+    return rng.uniform(0, min(cap, base * 2**attempt))
+
+
+class TokenBucket:
+    """Pace work to ``per_minute`` units, allowing bursts up to ``capacity``.
+
+    ``acquire`` reserves units immediately and sleeps off any deficit, so
+    callers are served in arrival order and a request larger than the
+    bucket just waits longer instead of blocking forever.
+    """
+
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic, sleep=None):
+        self.rate = per_minute / 60.0
+        # Ten seconds of quota: enough to absorb jitter without tripping
+        # per-second enforcement on the provider side
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate * 10)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep or time.sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self, n=1):
+        """Take ``n`` units, sleeping until they are earned; returns the wait."""
+        with self._lock:
+            self._refill()
+            self._tokens -= n
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            self._sleep(wait)
+        return wait
+
+    def credit(self, n):
+        """Return ``n`` unused units, or charge extra ones when ``n`` is negative."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + n)
+
+    @property
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+class AIMDLimiter:
+    """A concurrency limit that adapts like TCP congestion control.
+
+    Each success adds ``increase / limit`` (one slot per window of
+    successes); a congestion signal multiplies the limit by ``decrease``.
+    Only calls started after the last cut can trigger another, so one burst
+    of 429s from requests already in flight halves the limit once rather
+    than collapsing it to the minimum.
+    """
+
+    def __init__(self, maximum, initial=None, minimum=1, increase=1.0, decrease=0.5):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.increase = increase
+        self.decrease = decrease
+        self.limit = float(initial if initial is not None else maximum)
+        self.in_flight = 0
+        self._started = 0
+        self._cut_at = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Wait for a free slot; returns a ticket to pass to ``release``."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            self._started += 1
+            return self._started
+
+    def release(self, ticket, congested=False):
+        """Free a slot and adjust the limit by the call's outcome."""
+        with self._cond:
+            self.in_flight -= 1
+            if congested:
+                if ticket > self._cut_at:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._cut_at = self._started
+            else:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self._cond.notify_all()
+
+
+class Throttle:
+    """Rate limits, adaptive concurrency and retries for one provider.
+
+    Any limit left as None is not enforced, so ``Throttle()`` only retries.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        max_concurrency=None,
+        retries=4,
+        base_delay=0.5,
+        max_delay=30.0,
+        seed=None,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.requests = None
+        self.tokens = None
+        self.limiter = None
+        if requests_per_minute:
+            self.requests = TokenBucket(requests_per_minute, clock=clock, sleep=sleep)
+        if tokens_per_minute:
+            self.tokens = TokenBucket(tokens_per_minute, clock=clock, sleep=sleep)
+        if max_concurrency:
+            # Start halfway and let successes ramp up to the ceiling
+            self.limiter = AIMDLimiter(
+                max_concurrency, initial=max(1, max_concurrency // 2)
+            )
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = random.Random(seed)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+        self.counts = {"calls": 0, "retries": 0, "congested": 0, "failed": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _pause(self, delay):
+        # A Retry-After applies to the whole provider, not just this caller
+        with self._lock:
+            self._resume_at = max(self._resume_at, self._clock() + delay)
+
+    def _wait_for_resume(self):
+        with self._lock:
+            wait = self._resume_at - self._clock()
+        if wait > 0:
+            self._sleep(wait)
+
+    def call(self, fn, tokens=0):
+        """Call ``fn()`` within the limits, retrying retryable errors.
+
+        ``tokens`` is the expected prompt plus completion size; when ``fn``
+        returns a dict with the actual ``tokens``, the difference is settled
+        with the tokens/min bucket.
+        """
+        self._count("calls")
+        for attempt in range(self.retries + 1):
+            self._wait_for_resume()
+            if self.requests:
+                self.requests.acquire(1)
+            if self.tokens and tokens:
+                self.tokens.acquire(tokens)
+            ticket = self.limiter.acquire() if self.limiter else None
+            try:
+                result = fn()
+            except Exception as exc:
+                congested = is_congestion(exc)
+                if self.limiter:
+                    self.limiter.release(ticket, congested)
+                if self.tokens and tokens:
+                    # Rejected calls do not use up the token quota
+                    self.tokens.credit(tokens)
+                if congested:
+                    self._count("congested")
+                if attempt == self.retries or not is_retryable(exc):
+                    self._count("failed")
+                    raise
+                self._count("retries")
+                delay = backoff(attempt, self.base_delay, self.max_delay, self._rng)
+                server_delay = retry_after(exc)
+                if server_delay is not None:
+                    delay = max(delay, server_delay)
+                    self._pause(server_delay)
+                self._sleep(delay)
+                continue
+            if self.limiter:
+                self.limiter.release(ticket)
+            used = result.get("tokens") if isinstance(result, dict) else None
+            if self.tokens and isinstance(used, int):
+                self.tokens.credit(tokens - used)
+            return result
+
+    def stats(self):
+        """Return call counts and the current concurrency limit."""
+        stats = dict(self.counts)
+        if self.limiter:
+            stats["limit"] = self.limiter.limit
+            stats["in_flight"] = self.limiter.in_flight
+        return stats
@@ -1,11 +1,20 @@
 """Utility functions for LLM Lab."""
 
+import hashlib
 import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator
 
-import llm
-from llm_lab import DATA_DIR
+from llm_lab import CONFIG_DIR, DATA_DIR, ensure_data_dirs
+from llm_lab.throttle import Throttle
+
+# ``llm`` (which loads every installed provider plugin) and ``yaml`` are
+# imported where they are used, keeping ``import llm_lab.utils`` cheap.
 
 
 def load_json(path: Path) -> dict[str, Any]:
@@ -21,21 +30,464 @@ def save_json(data: dict[str, Any], path: Path) -> None:
         json.dump(data, f, indent=2)
 
 
-def get_model_response(prompt: str, model: str | None = None) -> dict[str, Any]:
-    """Get response from LLM model with metrics."""
+def percentile(values: Iterable[float], q: float) -> float:
+    """Return the q-th percentile (0-100) of values by linear interpolation."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+@lru_cache(maxsize=None)
+def load_config(path: Path = CONFIG_DIR / "default.yaml") -> dict[str, Any]:
+    """Load YAML configuration (cached per path)."""
+    import yaml
+
+    with open(path) as f:
+        return yaml.safe_load(f) or {}
+
+
+@lru_cache(maxsize=None)
+def _token_encoding(model: str) -> Any:
+    """Return the tiktoken encoding ``ttok`` would use, or None if unavailable."""
     try:
-        response = llm.complete(prompt, model=model)
+        import tiktoken
+
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=65536)
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """Count tokens the way ``ttok`` does, estimating ~4 characters per token offline."""
+    encoding = _token_encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-3.5-turbo") -> str:
+    """Truncate text to at most ``max_tokens`` tokens."""
+    encoding = _token_encoding(model)
+    if encoding is None:
+        return text[: max(0, max_tokens) * 4]
+    return encoding.decode(encoding.encode(text)[: max(0, max_tokens)])
+
+
+def provider_for_model(model: str | None) -> str | None:
+    """Return the configured provider serving a model, if known."""
+    providers = load_config().get("providers", {})
+    if model is None:
+        return None
+    for name, provider in providers.items():
+        if model == provider.get("default_model") or model in provider.get(
+            "models", []
+        ):
+            return name
+    for name in providers:
+        if name in model:
+            return name
+    return None
+
+
+def provider_limits() -> dict[str | None, int]:
+    """Return per-provider concurrency limits from the config."""
+    providers = load_config().get("providers", {})
+    return {
+        name: provider["max_concurrency"]
+        for name, provider in providers.items()
+        if provider.get("max_concurrency")
+    }
+
+
+@lru_cache(maxsize=None)
+def provider_throttle(provider: str | None) -> Throttle:
+    """Return the process-wide throttle for a provider, built from the config.
+
+    Providers may set ``requests_per_minute``, ``tokens_per_minute`` and
+    ``max_concurrency``; retry settings come from the ``throttle`` section.
+    """
+    config = load_config()
+    settings = config.get("providers", {}).get(provider, {}) if provider else {}
+    retry = config.get("throttle", {})
+    return Throttle(
+        requests_per_minute=settings.get("requests_per_minute"),
+        tokens_per_minute=settings.get("tokens_per_minute"),
+        max_concurrency=settings.get("max_concurrency"),
+        retries=retry.get("retries", 4),
+        base_delay=retry.get("base_delay", 0.5),
+        max_delay=retry.get("max_delay", 30.0),
+    )
+
+
+def expected_tokens(prompt: str, options: dict[str, Any] | None = None) -> int:
+    """Estimate a call's prompt plus completion tokens for tokens/min pacing."""
+    output = (options or {}).get("max_tokens") or load_config().get("throttle", {}).get(
+        "output_tokens", 256
+    )
+    return count_tokens(prompt) + output
+
+
+class ResponseCache:
+    """Content-addressed SQLite cache of model responses.
+
+    Entries expire after ``ttl`` seconds and the least recently used ones are
+    evicted beyond ``max_entries``. The database runs in WAL mode so several
+    processes can share one cache file.
+    """
+
+    def __init__(
+        self,
+        path: Path = DATA_DIR / "cache" / "responses.db",
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 10_000,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        ensure_data_dirs()
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed_at
+                ON responses (accessed_at);
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(
+        model: str | None,
+        prompt: str,
+        system: str | None = None,
+        options: dict[str, Any] | None = None,
+    ) -> str:
+        """Return the cache key for a request."""
+        payload = json.dumps([model, prompt, system, options or {}], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the cached response for a key, or None on a miss."""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT response FROM responses WHERE key = ? AND created_at > ?",
+            (key, now - self.ttl),
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, response: dict[str, Any]) -> None:
+        """Store a response and evict expired and least recently used entries."""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response), now, now),
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,)
+            )
+            (count,) = conn.execute("SELECT count(*) FROM responses").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    """
+                    DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses ORDER BY accessed_at LIMIT ?
+                    )
+                    """,
+                    (count - self.max_entries,),
+                )
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        self._connect().execute("DELETE FROM responses")
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss counters and the current entry count."""
+        (entries,) = (
+            self._connect().execute("SELECT count(*) FROM responses").fetchone()
+        )
+        lookups = self.hits + self.misses
         return {
-            "text": response.text(),
-            "tokens": response.tokens,
-            "latency": response.completion_ms / 1000.0,  # Convert to seconds
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
         }
+
+
+def _complete(
+    prompt: str,
+    model: str | None = None,
+    system: str | None = None,
+    options: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Run one completion, raising on failure."""
+    import llm
+
+    kwargs = dict(options or {})
+    if system is not None:
+        kwargs["system"] = system
+    response = llm.complete(prompt, model=model, **kwargs)
+    return {
+        "text": response.text(),
+        "tokens": response.tokens,
+        "latency": response.completion_ms / 1000.0,  # Convert to seconds
+    }
+
+
+def get_model_response(
+    prompt: str,
+    model: str | None = None,
+    system: str | None = None,
+    options: dict[str, Any] | None = None,
+    cache: ResponseCache | None = None,
+    bypass_cache: bool = False,
+    throttle: Throttle | None = None,
+) -> dict[str, Any]:
+    """Get response from LLM model with metrics.
+
+    With a ``cache``, identical requests are answered from it; ``bypass_cache``
+    skips the lookup but still stores the fresh response. Calls go through
+    ``throttle`` (default: the model's :func:`provider_throttle`), so rate
+    limits and transient errors are retried before an ``error`` is returned.
+    """
+    key = cache.key(model, prompt, system, options) if cache else None
+    if cache and not bypass_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+    if throttle is None:
+        throttle = provider_throttle(provider_for_model(model))
+    try:
+        result = throttle.call(
+            lambda: _complete(prompt, model, system, options),
+            tokens=expected_tokens((system or "") + prompt, options),
+        )
     except Exception as e:
         return {"error": str(e)}
+    if cache:
+        cache.set(key, result)
+    return result
+
+
+class ResponseStream:
+    """Iterate a streaming model response, timing each chunk as it arrives.
+
+    Once exhausted, :meth:`metrics` returns the usual ``text``/``tokens``/
+    ``latency`` dict plus time to first token, inter-token latency
+    percentiles and tokens per second. The underlying response is read once:
+    iterating again replays the buffered chunks, then resumes the stream.
+    If the stream fails part-way, iterating re-raises its error and
+    :meth:`metrics` reports the chunks that arrived, with an ``error`` entry.
+    """
+
+    def __init__(self, response: Iterable[str]):
+        self.response = response
+        self.chunks: list[str] = []
+        self.arrivals: list[float] = []
+        self.start: float | None = None
+        self.end: float | None = None
+        self.error: Exception | None = None
+        self._source: Iterator[str] | None = None
+
+    def __iter__(self) -> Iterator[str]:
+        if self._source is None:
+            self.start = time.perf_counter()
+            self._source = iter(self.response)
+        i = 0
+        while True:
+            if i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+                continue
+            if self.end is not None:
+                if self.error is not None:
+                    raise self.error
+                return
+            try:
+                chunk = next(self._source)
+            except StopIteration:
+                self.end = time.perf_counter()
+                return
+            except Exception as e:
+                self.end = time.perf_counter()
+                self.error = e
+                raise
+            self.arrivals.append(time.perf_counter())
+            self.chunks.append(chunk)
+
+    def text(self) -> str:
+        """Return the full text, consuming the rest of the stream if needed."""
+        if self.end is None:
+            for _ in self:
+                pass
+        return "".join(self.chunks)
+
+    def _tokens(self) -> int:
+        usage = getattr(self.response, "usage", None)
+        output = getattr(usage(), "output", None) if callable(usage) else None
+        return output or len(self.chunks)
+
+    def metrics(self) -> dict[str, Any]:
+        """Return text and timing metrics for the completed or failed stream."""
+        try:
+            text = self.text()
+        except Exception:
+            if self.error is None:
+                raise
+            text = "".join(self.chunks)
+        tokens = self._tokens()
+        latency = self.end - self.start
+        ttft = self.arrivals[0] - self.start if self.arrivals else latency
+        gaps = [b - a for a, b in zip(self.arrivals, self.arrivals[1:])]
+        # Rate over the decode phase, after the first token has arrived
+        decode = latency - ttft
+        if tokens > 1 and decode > 0:
+            tokens_per_sec = (tokens - 1) / decode
+        else:
+            tokens_per_sec = tokens / latency if latency else 0.0
+        metrics = {
+            "text": text,
+            "tokens": tokens,
+            "latency": latency,
+            "ttft": ttft,
+            "itl_p50": percentile(gaps, 50),
+            "itl_p90": percentile(gaps, 90),
+            "itl_p99": percentile(gaps, 99),
+            "tokens_per_sec": tokens_per_sec,
+        }
+        if self.error is not None:
+            metrics["error"] = str(self.error)
+        return metrics
+
+
+def stream_model_response(
+    prompt: str,
+    model: Any = None,
+    system: str | None = None,
+    options: dict[str, Any] | None = None,
+) -> ResponseStream:
+    """Stream a response from an LLM model, collecting streaming metrics.
+
+    ``model`` is a model ID or an object with an ``llm``-style
+    ``prompt(..., stream=True)`` method, such as :class:`llm_lab.fake.FakeModel`.
+    """
+    if model is None or isinstance(model, str):
+        import llm
+
+        model = llm.get_model(model)
+    return ResponseStream(
+        model.prompt(prompt, system=system, stream=True, **(options or {}))
+    )
 
 
 def save_baseline(name: str, data: dict[str, Any]) -> None:
     """Save baseline metrics."""
+    ensure_data_dirs()
     baseline_dir = DATA_DIR / "baselines"
-    baseline_dir.mkdir(exist_ok=True)
+    baseline_dir.mkdir(exist_ok=True, parents=True)
     save_json(data, baseline_dir / f"{name}.json")
+
+
+def get_model_responses(
+    prompts: Iterable[str],
+    models: Iterable[str | None] | None = None,
+    max_concurrency: int = 8,
+    backend: Callable[[str, str | None], dict[str, Any]] | None = None,
+    limits: dict[str | None, int] | None = None,
+    throttles: dict[str | None, Throttle] | None = None,
+) -> list[dict[str, Any]]:
+    """Get responses for every prompt/model pair concurrently.
+
+    Results come back in input order (prompt-major), each carrying its
+    ``prompt`` and ``model`` plus the ``text``/``tokens``/``latency`` or
+    ``error`` keys of :func:`get_model_response`. Each provider gets its own
+    worker pool, so a provider at its limit never holds up the others. Calls
+    to a provider never exceed its ``max_concurrency`` from
+    ``config/default.yaml`` (nor ``max_concurrency`` overall), and go through
+    its throttle (``throttles``, default :func:`provider_throttle`), which
+    paces, retries and adapts concurrency to rate-limit errors the backend
+    raises. Retry backoff sleeps hold no concurrency permit.
+    """
+    backend = backend or _complete
+    limits = provider_limits() if limits is None else limits
+    jobs = [(prompt, model) for prompt in prompts for model in (models or [None])]
+    if not jobs:
+        return []
+
+    job_counts: dict[str | None, int] = {}
+    for _, model in jobs:
+        provider = provider_for_model(model)
+        job_counts[provider] = job_counts.get(provider, 0) + 1
+    semaphores = {
+        provider: threading.BoundedSemaphore(
+            min(limits.get(provider, max_concurrency), max_concurrency)
+        )
+        for provider in job_counts
+    }
+    overall = threading.BoundedSemaphore(max_concurrency)
+    if throttles is None:
+        throttles = {provider: provider_throttle(provider) for provider in job_counts}
+
+    def run(job: tuple[str, str | None]) -> dict[str, Any]:
+        prompt, model = job
+        provider = provider_for_model(model)
+        throttle = throttles.get(provider)
+
+        def attempt() -> dict[str, Any]:
+            # Permits are held per attempt, not across the throttle's backoff
+            with semaphores[provider], overall:
+                return backend(prompt, model)
+
+        start = time.perf_counter()
+        try:
+            if throttle is None:
+                response = attempt()
+            else:
+                response = throttle.call(attempt, tokens=expected_tokens(prompt))
+        except Exception as e:
+            response = {"error": str(e)}
+        elapsed = time.perf_counter() - start
+        if "error" not in response:
+            response.setdefault("latency", elapsed)
+        return {"prompt": prompt, "model": model, **response}
+
+    pools = {
+        provider: ThreadPoolExecutor(max_workers=min(max_concurrency, count))
+        for provider, count in job_counts.items()
+    }
+    try:
+        futures = [pools[provider_for_model(job[1])].submit(run, job) for job in jobs]
+        return [future.result() for future in futures]
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
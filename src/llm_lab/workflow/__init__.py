@@ -1,19 +1,272 @@
 """Workflow management functionality."""
 
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def execute_workflow(workflow):
+from llm_lab.utils import (
+    count_tokens,
+    get_model_response,
+    load_config,
+    truncate_tokens,
+)
+
+DEFAULT_CONCURRENCY = 8
+
+
+def _noop_runner(step, upstream):
+    """Runner for steps without an action: succeed immediately."""
+    return {}
+
+
+def _normalize_steps(workflow):
+    """Return workflow steps as ``{name: step}`` with explicit dependencies."""
+    steps = {}
+    for entry in workflow["agents"]:
+        step = {"agent": entry} if isinstance(entry, str) else dict(entry)
+        step["depends_on"] = list(step.get("depends_on", []))
+        # Results are keyed by agent, so a second step would overwrite the first
+        if step["agent"] in steps:
+            raise ValueError(f"Duplicate workflow step: {step['agent']}")
+        steps[step["agent"]] = step
+
+    for name, step in steps.items():
+        unknown = [dep for dep in step["depends_on"] if dep not in steps]
+        if unknown:
+            raise ValueError(f"Step {name} depends on unknown steps: {unknown}")
+
+    # Kahn's algorithm: every step must be reachable in topological order
+    remaining = {name: set(step["depends_on"]) for name, step in steps.items()}
+    ready = [name for name, deps in remaining.items() if not deps]
+    while ready:
+        done = ready.pop()
+        del remaining[done]
+        for name, deps in remaining.items():
+            if done in deps:
+                deps.discard(done)
+                if not deps:
+                    ready.append(name)
+    if remaining:
+        raise ValueError(f"Workflow has a dependency cycle: {sorted(remaining)}")
+    return steps
+
+
+def _run_step(runner, step, upstream):
+    """Run one step, turning exceptions into a failed result."""
+    start = time.perf_counter()
+    try:
+        result = {"status": "success", **(step.get("run") or runner)(step, upstream)}
+    except Exception as e:
+        result = {"status": "failed", "error": str(e)}
+    return {"agent": step["agent"], "latency": time.perf_counter() - start, **result}
+
+
+def iter_workflow(workflow, runner=None, max_concurrency=None):
+    """Execute workflow steps as their dependencies allow, yielding each result as it finishes.
+
+    Steps are agent names or dicts with ``agent``, optional ``depends_on``,
+    ``timeout`` (seconds) and ``run`` (a callable overriding ``runner``).
+    A runner is called as ``runner(step, upstream_results)`` and returns a
+    result dict. Independent steps run concurrently up to the workflow's
+    ``max_concurrency``; ``"sequence": "sequential"`` runs one step at a time
+    in declaration order. Steps whose dependencies fail or time out are
+    cancelled. A step's timeout counts from when it starts running. Its
+    thread cannot be interrupted, so it finishes in the background without
+    holding one of the ``max_concurrency`` slots.
+    """
+    steps = _normalize_steps(workflow)
+    runner = runner or _noop_runner
+    if workflow.get("sequence") == "sequential":
+        limit = 1
+    elif max_concurrency is not None:
+        limit = max_concurrency
+    else:
+        limit = workflow.get("max_concurrency", DEFAULT_CONCURRENCY)
+    if limit < 1:
+        raise ValueError(f"max_concurrency must be at least 1, got {limit}")
+
+    pending = dict(steps)
+    results = {}
+    # name -> deadline, None until the step's thread reports it has started
+    running = {}
+    events = queue.SimpleQueue()
+
+    def start(name, step, upstream):
+        def target():
+            events.put((name, "started", time.monotonic()))
+            events.put((name, "done", _run_step(runner, step, upstream)))
+
+        threading.Thread(target=target, name=f"workflow-{name}", daemon=True).start()
+
+    while pending or running:
+        for name, step in list(pending.items()):
+            failed = [
+                dep
+                for dep in step["depends_on"]
+                if dep in results and results[dep]["status"] != "success"
+            ]
+            if failed:
+                del pending[name]
+                results[name] = {
+                    "agent": name,
+                    "status": "cancelled",
+                    "error": f"Dependencies did not succeed: {failed}",
+                }
+                yield results[name]
+
+        for name, step in list(pending.items()):
+            if len(running) >= limit:
+                break
+            if all(dep in results for dep in step["depends_on"]):
+                del pending[name]
+                running[name] = None
+                start(name, step, {dep: results[dep] for dep in step["depends_on"]})
+
+        if not running:
+            continue
+
+        deadlines = [deadline for deadline in running.values() if deadline]
+        wait_for = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+        try:
+            name, kind, value = events.get(timeout=wait_for)
+        except queue.Empty:
+            pass
+        else:
+            # Events from steps that already timed out are ignored
+            if name in running:
+                if kind == "started":
+                    timeout = steps[name].get("timeout")
+                    running[name] = value + timeout if timeout else None
+                else:
+                    del running[name]
+                    results[name] = value
+                    yield value
+
+        now = time.monotonic()
+        for name, deadline in list(running.items()):
+            if deadline and now >= deadline:
+                del running[name]
+                results[name] = {
+                    "agent": name,
+                    "status": "timeout",
+                    "error": f"Step exceeded {steps[name]['timeout']}s",
+                }
+                yield results[name]
+
+
+def execute_workflow(workflow, runner=None, max_concurrency=None):
     """Execute a workflow with multiple agents."""
+    finished = {
+        result["agent"]: result
+        for result in iter_workflow(workflow, runner, max_concurrency)
+    }
+    agent_results = [finished[name] for name in _normalize_steps(workflow)]
+    succeeded = all(result["status"] == "success" for result in agent_results)
     return {
-        "status": "completed",
-        "agent_results": [
-            {"agent": agent, "status": "success"} for agent in workflow["agents"]
-        ],
+        "status": "completed" if succeeded else "failed",
+        "agent_results": agent_results,
     }
 
 
-def synthesize_results(results):
-    """Synthesize results from multiple agents."""
+def _finding_key(finding):
+    """Normalize a finding for deduplication."""
+    return " ".join(str(finding).casefold().split())
+
+
+def _join_findings(budget):
+    """Return a local summarizer joining a batch into one line cut to ``budget`` tokens."""
+
+    def summarize(items):
+        return truncate_tokens("; ".join(items), budget)
+
+    return summarize
+
+
+def llm_summarizer(model=None):
+    """Return a summarizer that condenses a batch of findings with an LLM."""
+
+    def summarize(items):
+        prompt = (
+            "Condense these agent findings into a short summary, "
+            "keeping every distinct issue:\n" + "\n".join(f"- {i}" for i in items)
+        )
+        response = get_model_response(prompt, model)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["text"]
+
+    return summarize
+
+
+def _batches(items, budget):
+    """Group items into batches whose token counts stay within budget."""
+    batch, used = [], 0
+    for item in items:
+        tokens = count_tokens(item)
+        if batch and used + tokens > budget:
+            yield batch
+            batch, used = [], 0
+        batch.append(item)
+        used += tokens
+    if batch:
+        yield batch
+
+
+def synthesize_results(results, summarize=None, max_tokens=None, max_concurrency=4):
+    """Synthesize results from multiple agents.
+
+    Findings are deduplicated, packed into batches of at most ``max_tokens``
+    (default ``processing.max_tokens``) and summarized concurrently; batch
+    summaries are then reduced the same way until they fit one final
+    summarization. ``results`` may be any iterable, such as
+    :func:`iter_workflow`, and batches are dispatched while it is still
+    producing results. ``summarize`` maps a list of strings to a summary
+    string; the default joins them locally and truncates to the budget, so
+    the summary never exceeds ``max_tokens``; :func:`llm_summarizer` uses a
+    model.
+    """
+    budget = max_tokens or load_config()["processing"]["max_tokens"]
+    summarize = summarize or _join_findings(budget)
+
+    findings = {}
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        futures, batch, used = [], [], 0
+        for result in results:
+            for finding in result.get("findings", []):
+                key = _finding_key(finding)
+                if key in findings:
+                    findings[key]["agents"].append(result["agent"])
+                    continue
+                findings[key] = {"finding": finding, "agents": [result["agent"]]}
+                tokens = count_tokens(finding)
+                if batch and used + tokens > budget:
+                    futures.append(pool.submit(summarize, batch))
+                    batch, used = [], 0
+                batch.append(finding)
+                used += tokens
+        if batch:
+            futures.append(pool.submit(summarize, batch))
+        summaries = [future.result() for future in futures]
+        batches = len(summaries)
+
+        while len(summaries) > 1 and count_tokens("\n".join(summaries)) > budget:
+            reduced = list(pool.map(summarize, _batches(summaries, budget)))
+            batches += len(reduced)
+            if len(reduced) >= len(summaries):
+                break
+            summaries = reduced
+
+    if len(summaries) > 1:
+        summary = summarize(summaries)
+        batches += 1
+    else:
+        summary = summaries[0] if summaries else "No findings"
+
+    ranked = sorted(findings.values(), key=lambda f: -len(set(f["agents"])))
     return {
-        "summary": "Combined agent findings",
-        "action_items": ["Fix identified issues"],
+        "summary": summary,
+        "action_items": [f["finding"] for f in ranked],
+        "findings": ranked,
+        "batches": batches,
     }
@@ -1,11 +1,12 @@
 -- [[file:../../../examples/51-sqlite-queries.org::*Response Time Analysis][Response Time Analysis:1]]
+-- Reads rollups; refresh first with: python -m llm_lab.analytics refresh
 SELECT model,
-       COUNT(*) as responses,
-       ROUND(AVG(duration_ms), 2) as avg_duration_ms,
-       ROUND(MIN(duration_ms), 2) as min_duration_ms,
-       ROUND(MAX(duration_ms), 2) as max_duration_ms,
-       ROUND(AVG(input_tokens + output_tokens), 2) as avg_total_tokens
-FROM responses
+       SUM(responses) as responses,
+       ROUND(SUM(duration_ms) * 1.0 / NULLIF(SUM(duration_count), 0), 2) as avg_duration_ms,
+       ROUND(MIN(duration_min), 2) as min_duration_ms,
+       ROUND(MAX(duration_max), 2) as max_duration_ms,
+       ROUND(SUM(total_tokens) * 1.0 / NULLIF(SUM(total_count), 0), 2) as avg_total_tokens
+FROM rollup_model_day
 GROUP BY model
 ORDER BY avg_duration_ms DESC;
 -- Response Time Analysis:1 ends here
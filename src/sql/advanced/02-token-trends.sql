@@ -1,11 +1,19 @@
 -- [[file:../../../examples/51-sqlite-queries.org::*Token Usage Trends][Token Usage Trends:1]]
-SELECT DATE(r.datetime_utc) as date,
-       COUNT(DISTINCT r.conversation_id) as conversations,
-       SUM(r.input_tokens) as total_input_tokens,
-       SUM(r.output_tokens) as total_output_tokens,
-       ROUND(AVG(r.duration_ms), 2) as avg_response_time
-FROM responses r
-GROUP BY date
+-- Reads rollups; refresh first with: python -m llm_lab.analytics refresh
+WITH conversations AS (
+  SELECT day, COUNT(DISTINCT conversation_id) as conversations
+  FROM rollup_conversation_day
+  WHERE conversation_id != ''
+  GROUP BY day
+)
+SELECT m.day as date,
+       COALESCE(c.conversations, 0) as conversations,
+       CASE WHEN SUM(m.input_count) > 0 THEN SUM(m.input_tokens) END as total_input_tokens,
+       CASE WHEN SUM(m.output_count) > 0 THEN SUM(m.output_tokens) END as total_output_tokens,
+       ROUND(SUM(m.duration_ms) * 1.0 / NULLIF(SUM(m.duration_count), 0), 2) as avg_response_time
+FROM rollup_model_day m
+LEFT JOIN conversations c ON c.day = m.day
+GROUP BY m.day
 ORDER BY date DESC
 LIMIT 7;
 -- Token Usage Trends:1 ends here
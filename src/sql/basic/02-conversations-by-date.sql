@@ -1,10 +1,11 @@
 -- [[file:../../../examples/51-sqlite-queries.org::*Conversations by Date][Conversations by Date:1]]
-SELECT DATE(r.datetime_utc) as date,
-       COUNT(DISTINCT c.id) as conversation_count,
-       COUNT(*) as response_count
-FROM conversations c
-JOIN responses r ON c.id = r.conversation_id
-GROUP BY date
+-- Reads rollups; refresh first with: python -m llm_lab.analytics refresh
+SELECT day as date,
+       COUNT(DISTINCT conversation_id) as conversation_count,
+       SUM(responses) as response_count
+FROM rollup_conversation_day
+WHERE conversation_id != ''
+GROUP BY day
 ORDER BY date DESC
 LIMIT 10;
 -- Conversations by Date:1 ends here
@@ -1,10 +1,18 @@
 -- [[file:../../../examples/51-sqlite-queries.org::*Model Usage Statistics][Model Usage Statistics:1]]
-SELECT r.model,
-       COUNT(*) as usage_count,
-       COUNT(DISTINCT r.conversation_id) as unique_conversations,
-       ROUND(AVG(r.input_tokens), 2) as avg_input_tokens,
-       ROUND(AVG(r.output_tokens), 2) as avg_output_tokens
-FROM responses r
-GROUP BY r.model
+-- Reads rollups; refresh first with: python -m llm_lab.analytics refresh
+WITH conversations AS (
+  SELECT model, COUNT(DISTINCT conversation_id) as unique_conversations
+  FROM rollup_conversation_day
+  WHERE conversation_id != ''
+  GROUP BY model
+)
+SELECT m.model,
+       SUM(m.responses) as usage_count,
+       COALESCE(c.unique_conversations, 0) as unique_conversations,
+       ROUND(SUM(m.input_tokens) * 1.0 / NULLIF(SUM(m.input_count), 0), 2) as avg_input_tokens,
+       ROUND(SUM(m.output_tokens) * 1.0 / NULLIF(SUM(m.output_count), 0), 2) as avg_output_tokens
+FROM rollup_model_day m
+LEFT JOIN conversations c ON c.model = m.model
+GROUP BY m.model
 ORDER BY usage_count DESC;
 -- Model Usage Statistics:1 ends here
@@ -1,8 +1,9 @@
 -- [[file:../../../examples/51-sqlite-queries.org::*Total Token Usage and Estimated Cost][Total Token Usage and Estimated Cost:1]]
+-- Reads rollups; refresh first with: python -m llm_lab.analytics refresh
 WITH model_costs AS (
   SELECT model,
-         SUM(input_tokens) as total_input_tokens,
-         SUM(output_tokens) as total_output_tokens,
+         CASE WHEN SUM(input_count) > 0 THEN SUM(input_tokens) END as total_input_tokens,
+         CASE WHEN SUM(output_count) > 0 THEN SUM(output_tokens) END as total_output_tokens,
          -- Approximate costs (modify according to actual pricing)
          CASE 
            WHEN model LIKE '%gpt-4%' THEN 0.03
@@ -14,7 +15,7 @@ WITH model_costs AS (
            WHEN model LIKE '%gpt-3.5%' THEN 0.002
            ELSE 0.03
          END as output_cost_per_1k
-  FROM responses
+  FROM rollup_model_day
   GROUP BY model
 )
 SELECT 
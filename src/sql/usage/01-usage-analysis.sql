@@ -1,18 +1,24 @@
 -- [[file:../../../examples/51-sqlite-queries.org::*Conversation Patterns][Conversation Patterns:1]]
-WITH ConversationStats AS (
+-- Reads rollups; refresh first with: python -m llm_lab.analytics refresh
+WITH ConversationTotals AS (
+  SELECT conversation_id,
+         SUM(responses) as num_responses,
+         CASE WHEN SUM(input_count) > 0 THEN SUM(input_tokens) END as total_input_tokens,
+         CASE WHEN SUM(output_count) > 0 THEN SUM(output_tokens) END as total_output_tokens,
+         CASE WHEN SUM(duration_count) > 0 THEN SUM(duration_ms) END as total_duration_ms
+  FROM rollup_conversation_day
+  WHERE conversation_id != ''
+  GROUP BY conversation_id
+),
+ConversationStats AS (
   SELECT 
     c.id as conversation_id,
-    c.name as conversation_name,
-    c.model as initial_model,
-    COUNT(r.id) as num_responses,
-    MIN(r.datetime_utc) as start_time,
-    MAX(r.datetime_utc) as end_time,
-    SUM(r.input_tokens) as total_input_tokens,
-    SUM(r.output_tokens) as total_output_tokens,
-    SUM(r.duration_ms) as total_duration_ms
+    COALESCE(t.num_responses, 0) as num_responses,
+    t.total_input_tokens,
+    t.total_output_tokens,
+    t.total_duration_ms
   FROM conversations c
-  LEFT JOIN responses r ON c.id = r.conversation_id
-  GROUP BY c.id
+  LEFT JOIN ConversationTotals t ON t.conversation_id = c.id
 )
 SELECT 
   ROUND(AVG(num_responses), 1) as avg_responses_per_conversation,
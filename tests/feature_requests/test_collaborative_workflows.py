@@ -44,3 +44,267 @@ def test_result_synthesis():
     synthesis = synthesize_results(results)
     assert "summary" in synthesis
     assert len(synthesis["action_items"]) > 0
+
+
+def test_workflow_parallel_steps_overlap():
+    """Test that independent steps run concurrently and dependents wait."""
+    import time
+
+    from llm_lab.workflow import execute_workflow
+
+    spans = {}
+
+    def runner(step, upstream):
+        start = time.perf_counter()
+        time.sleep(0.1)
+        spans[step["agent"]] = (start, time.perf_counter())
+        return {"findings": [f"{step['agent']} saw {sorted(upstream)}"]}
+
+    workflow = {
+        "name": "code-review",
+        "agents": [
+            "code-reviewer",
+            "security-analyst",
+            {"agent": "summary", "depends_on": ["code-reviewer", "security-analyst"]},
+        ],
+        "sequence": "parallel",
+    }
+    result = execute_workflow(workflow, runner)
+
+    assert result["status"] == "completed"
+    reviewer, security = spans["code-reviewer"], spans["security-analyst"]
+    # The independent steps overlap; the dependent one starts after both
+    assert reviewer[0] < security[1] and security[0] < reviewer[1]
+    assert spans["summary"][0] >= max(reviewer[1], security[1])
+    assert result["agent_results"][2]["findings"] == [
+        "summary saw ['code-reviewer', 'security-analyst']"
+    ]
+
+
+def test_workflow_failure_and_timeout_cancel_dependents():
+    """Test that failed or timed-out steps cancel the steps after them."""
+    import time
+
+    from llm_lab.workflow import iter_workflow
+
+    def fail(step, upstream):
+        raise RuntimeError("reviewer crashed")
+
+    workflow = {
+        "agents": [
+            {"agent": "reviewer", "run": fail},
+            {"agent": "slow", "run": lambda s, u: time.sleep(1) or {}, "timeout": 0.05},
+            {"agent": "report", "depends_on": ["reviewer"]},
+            {"agent": "archive", "depends_on": ["slow"]},
+            "linter",
+        ],
+    }
+    statuses = {r["agent"]: r["status"] for r in iter_workflow(workflow)}
+    assert statuses == {
+        "reviewer": "failed",
+        "slow": "timeout",
+        "report": "cancelled",
+        "archive": "cancelled",
+        "linter": "success",
+    }
+
+
+def test_workflow_timeout_counts_from_start_and_frees_its_slot():
+    """Test that a timed-out step does not block or time out the next one."""
+    import time
+
+    from llm_lab.workflow import iter_workflow
+
+    workflow = {
+        "sequence": "sequential",
+        "agents": [
+            {
+                "agent": "stuck",
+                "run": lambda s, u: time.sleep(1) or {},
+                "timeout": 0.05,
+            },
+            {
+                "agent": "quick",
+                "run": lambda s, u: time.sleep(0.1) or {},
+                "timeout": 0.5,
+            },
+        ],
+    }
+    statuses = {r["agent"]: r["status"] for r in iter_workflow(workflow)}
+    assert statuses == {"stuck": "timeout", "quick": "success"}
+
+
+def test_workflow_rejects_cycles():
+    """Test that cyclic dependencies are rejected up front."""
+    from llm_lab.workflow import execute_workflow
+
+    workflow = {
+        "agents": [
+            {"agent": "a", "depends_on": ["b"]},
+            {"agent": "b", "depends_on": ["a"]},
+        ]
+    }
+    with pytest.raises(ValueError, match="cycle"):
+        execute_workflow(workflow)
+
+
+def test_workflow_rejects_duplicate_steps():
+    """Test that two steps for the same agent are rejected instead of merged."""
+    from llm_lab.workflow import execute_workflow
+
+    workflow = {"agents": ["a", {"agent": "a", "timeout": 1}]}
+    with pytest.raises(ValueError, match="Duplicate"):
+        execute_workflow(workflow)
+
+
+def test_workflow_rejects_non_positive_concurrency():
+    """Test that a concurrency limit below one is rejected rather than spinning."""
+    from llm_lab.workflow import execute_workflow
+
+    for limit in (0, -1):
+        with pytest.raises(ValueError, match="max_concurrency"):
+            execute_workflow({"agents": ["a"]}, max_concurrency=limit)
+        with pytest.raises(ValueError, match="max_concurrency"):
+            execute_workflow({"agents": ["a"], "max_concurrency": limit})
+
+
+def test_result_synthesis_map_reduce():
+    """Test deduplication and hierarchical batching under a token budget."""
+    from llm_lab.utils import count_tokens
+    from llm_lab.workflow import synthesize_results
+
+    results = [
+        {
+            "agent": "code-reviewer",
+            "findings": [f"issue number {i}" for i in range(20)],
+        },
+        {"agent": "security-analyst", "findings": ["Issue  number 3", "sql injection"]},
+    ]
+    calls = []
+
+    def summarize(items):
+        calls.append(sum(count_tokens(item) for item in items))
+        return f"{len(items)} items"
+
+    synthesis = synthesize_results(results, summarize, max_tokens=12)
+    assert len(synthesis["action_items"]) == 21
+    assert synthesis["action_items"][0] == "issue number 3"
+    assert synthesis["findings"][0]["agents"] == ["code-reviewer", "security-analyst"]
+    assert all(tokens <= 12 for tokens in calls[:-1])
+    assert synthesis["batches"] == len(calls) > 3
+    assert synthesis["summary"].endswith("items")
+
+
+def test_default_synthesis_fits_the_budget():
+    """Test that the local summarizer keeps the summary within max_tokens."""
+    from llm_lab.utils import count_tokens
+    from llm_lab.workflow import synthesize_results
+
+    results = [
+        {"agent": f"agent-{i}", "findings": [f"distinct finding number {i}"]}
+        for i in range(200)
+    ]
+    synthesis = synthesize_results(results, max_tokens=50)
+    assert len(synthesis["action_items"]) == 200
+    assert 0 < count_tokens(synthesis["summary"]) <= 50
+
+
+def test_result_synthesis_consumes_incrementally():
+    """Test that batches are summarized while results are still arriving."""
+    from llm_lab.workflow import synthesize_results
+
+    events = []
+
+    def agent_results():
+        for i in range(3):
+            events.append(f"result {i}")
+            yield {"agent": f"agent-{i}", "findings": [f"finding {i} " * 4]}
+
+    def summarize(items):
+        events.append("summarize")
+        return " ".join(items)
+
+    synthesize_results(agent_results(), summarize, max_tokens=8, max_concurrency=1)
+    assert events.index("summarize") < events.index("result 2")
+
+
+def test_agent_is_slotted_with_prompt():
+    """Test the module-level Agent and its prompts/agents system prompt."""
+    from llm_lab.agents import Agent, create_agent
+
+    agent = create_agent(
+        {"role": "summary", "capabilities": ["summarize"], "constraints": []}
+    )
+    assert isinstance(agent, Agent)
+    assert agent.can("summarize")
+    assert not agent.is_constrained("focus:code-review")
+    assert agent.system.startswith("# Summary Agent")
+    with pytest.raises(AttributeError):
+        agent.extra = True
+
+
+def test_agent_pool_reuses_models():
+    """Test that pooled workers resolve each model once across many tasks."""
+    from llm_lab.agents.runtime import AgentPool
+    from llm_lab.fake import FakeModel
+
+    resolved = []
+
+    def factory(model_id):
+        resolved.append(model_id)
+        return FakeModel("ok", ttft=0, tokens_per_sec=1e6)
+
+    agents = [{"role": "summary"}, {"role": "memory", "model": "other"}]
+    with AgentPool(agents, model="fake", workers=4, model_factory=factory) as pool:
+        results = list(pool.map("summary", (f"task {i}" for i in range(200))))
+        assert pool.submit("memory", "remember").result()["text"] == "ok"
+        stats = pool.stats()
+    assert len(results) == 200
+    assert results[0] == {"role": "summary", "text": "ok"}
+    assert sorted(resolved) == ["fake", "other"]
+    assert stats["summary"]["completed"] == 200
+    assert stats["memory"]["completed"] == 1
+
+
+def test_agent_pool_backpressure_and_errors():
+    """Test that full queues push back and handler errors reach the caller."""
+    import queue
+    import threading
+    import time
+
+    from llm_lab.agents import Agent
+    from llm_lab.agents.runtime import AgentPool
+
+    release = threading.Event()
+
+    def handler(agent, model, task):
+        release.wait(5)
+        if task == "bad":
+            raise ValueError(task)
+        return {"text": task}
+
+    pool = AgentPool(
+        [Agent("worker")],
+        handler=handler,
+        workers=1,
+        queue_size=2,
+        model_factory=lambda model_id: None,
+    )
+    futures = [pool.submit("worker", task) for task in ("a", "bad", "c")]
+    # Once the worker has taken "a", "bad" and "c" fill the queue
+    for _ in range(100):
+        if pool.stats()["worker"]["queued"] == 2:
+            break
+        time.sleep(0.01)
+    with pytest.raises(queue.Full):
+        pool.submit("worker", "d", block=False)
+    release.set()
+    assert futures[0].result()["text"] == "a"
+    with pytest.raises(ValueError):
+        futures[1].result()
+    assert futures[2].result()["text"] == "c"
+    pool.shutdown()
+    assert pool.stats()["worker"]["failed"] == 1
+    with pytest.raises(RuntimeError):
+        pool.submit("worker", "late")
+    pool.shutdown()
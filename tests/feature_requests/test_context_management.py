@@ -43,3 +43,183 @@ def test_memory_management():
     result = apply_memory_policy(policy, "test-content")
     assert "retention_date" in result
     assert result["compressed"] is True
+
+
+def test_context_store_pruning():
+    """Test relevance-ordered pruning and token-budget selection."""
+    from llm_lab.context import ContextStore
+
+    store = ContextStore()
+    for i, relevance in enumerate([0.2, 0.9, 0.5, 0.7, 0.7]):
+        store.add(f"entry {i}", relevance, tokens=10)
+
+    assert [e.relevance for e in store] == [0.9, 0.7, 0.7, 0.5, 0.2]
+    assert [e.content for e in store.top_k_tokens(25)] == ["entry 1", "entry 4"]
+
+    pruned = store.prune(0.7)
+    assert sorted(e.relevance for e in pruned) == [0.2, 0.5]
+    assert len(store) == 3
+
+    pruned = store.prune_to_budget(20)
+    assert [e.content for e in pruned] == ["entry 3"]
+    assert [e.content for e in store] == ["entry 1", "entry 4"]
+
+
+def test_context_store_persistence(tmp_path):
+    """Test saving and loading a store through SQLite."""
+    from llm_lab.context import ContextStore, create_context
+
+    context = create_context(
+        {"id": "c", "type": "long-term", "retention": "1w", "metadata": {}}
+    )
+    context.store.add("low", 0.1, id="a")
+    context.store.add("high", 0.8, id="b")
+    context.store.save(tmp_path / "context.db")
+
+    loaded = ContextStore.load(tmp_path / "context.db")
+    assert [(e.id, e.content, e.relevance) for e in loaded] == [
+        ("b", "high", 0.8),
+        ("a", "low", 0.1),
+    ]
+    assert loaded.prune(0.5)[0].id == "a"
+
+
+def test_context_store_failed_save_keeps_previous_contents(tmp_path):
+    """Test that a save failing mid-way rolls back instead of emptying the table."""
+    import sqlite3
+
+    from llm_lab.context import ContextStore
+
+    path = tmp_path / "context.db"
+    store = ContextStore()
+    store.add("kept", 0.5, id="a")
+    store.save(path)
+
+    store.add("new", 0.7, id="b")
+    store.add("duplicate id", 0.9, id="b")
+    with pytest.raises(sqlite3.IntegrityError):
+        store.save(path)
+    assert [e.content for e in ContextStore.load(path)] == ["kept"]
+
+    # Adds after a read merge back into relevance order
+    store.prune(0.6)
+    store.add("middle", 0.8)
+    assert [e.relevance for e in store] == [0.9, 0.8, 0.7]
+
+
+def test_parse_duration():
+    """Test hour, day, week and month retention strings."""
+    from datetime import timedelta
+
+    from llm_lab.context import parse_duration
+
+    assert parse_duration("12h") == timedelta(hours=12)
+    assert parse_duration("3d") == timedelta(days=3)
+    assert parse_duration("1w2d") == timedelta(days=9)
+    assert parse_duration("2m") == timedelta(days=60)
+    with pytest.raises(ValueError):
+        parse_duration("1 fortnight")
+
+
+def test_retention_store_expiry_and_compression(tmp_path):
+    """Test bulk expiry, cold compression and transparent reads."""
+    import time
+
+    from llm_lab.context import RetentionStore, apply_memory_policy
+
+    store = RetentionStore(tmp_path / "memory.db", cold_after="1h")
+    policy = {"retention": "1w", "compression": True, "priority": "normal"}
+    kept = apply_memory_policy(policy, "test-content", store)
+    cold = store.put("warm " * 100, "1d")
+    expired = store.put("old", "1h")
+
+    assert store.get(kept["id"]) == "test-content"
+    result = store.sweep(now=time.time() + 2 * 3600)
+    assert result == {"expired": 1, "compressed": 1}
+    assert store.get(expired["id"]) is None
+    assert store.get(cold["id"]) == "warm " * 100
+    assert store.stats()["compressed"] == 2
+
+
+def test_retention_store_background_sweep(tmp_path):
+    """Test that the sweeper thread evicts expired entries."""
+    import time
+
+    from llm_lab.context import RetentionStore
+
+    store = RetentionStore(tmp_path / "memory.db")
+    store.put("short-lived", "0.00001h")
+    store.start_sweeper(interval=0.01)
+    try:
+        deadline = time.time() + 2
+        while store.stats()["entries"] and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        store.stop_sweeper()
+    assert store.stats()["entries"] == 0
+
+
+def test_retention_sweeper_survives_failed_sweeps(tmp_path, caplog):
+    """Test that an exception in one sweep is logged and the sweeper keeps running."""
+    import sqlite3
+    import time
+
+    from llm_lab.context import RetentionStore
+
+    store = RetentionStore(tmp_path / "memory.db")
+    sweep = store.sweep
+    failures = [sqlite3.OperationalError("database is locked")]
+
+    def flaky_sweep(now=None):
+        if failures:
+            raise failures.pop()
+        return sweep(now)
+
+    store.sweep = flaky_sweep
+    store.put("short-lived", "0.00001h")
+    store.start_sweeper(interval=0.01)
+    try:
+        deadline = time.time() + 2
+        while store.stats()["entries"] and time.time() < deadline:
+            time.sleep(0.01)
+        assert store._sweeper.is_alive()
+    finally:
+        store.stop_sweeper()
+    assert store.stats()["entries"] == 0
+    assert "Retention sweep failed" in caplog.text
+
+
+def test_pack_context_within_budget():
+    """Test relevance-per-token packing, truncation and accounting."""
+    from llm_lab.context import pack_context
+    from llm_lab.utils import count_tokens
+
+    entries = [
+        {"content": "short and relevant", "relevance": 0.9},
+        {"content": "long " * 200, "relevance": 0.95},
+        {"content": "barely relevant", "relevance": 0.1},
+    ]
+    packed = pack_context(entries, budget=30, separator="\n")
+
+    assert packed["prompt"].startswith("long long")
+    assert "short and relevant" in packed["prompt"]
+    assert packed["truncated"] == 1
+    assert packed["tokens"] <= 30
+    assert count_tokens(packed["prompt"]) <= 30
+    assert packed["entries"][-1] is entries[2]
+
+    untruncated = pack_context(entries, budget=30, truncate=False)
+    assert untruncated["dropped"] == 1
+    assert untruncated["truncated"] is None
+
+
+def test_pack_context_prefers_best_single_entry():
+    """Test the knapsack guard against many cheap low-value entries."""
+    from llm_lab.context import ContextEntry, pack_context
+
+    entries = [
+        ContextEntry("a", 0.2, tokens=1),
+        ContextEntry("b " * 50, 0.9, tokens=10),
+    ]
+    packed = pack_context(entries, budget=10, separator="", truncate=False)
+    assert [e.content for e in packed["entries"]] == ["b " * 50]
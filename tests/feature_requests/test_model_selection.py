@@ -15,7 +15,17 @@ def test_task_analysis():
     assert isinstance(result["complexity"], float)
 
 
-def test_model_selection():
+@pytest.fixture
+def scratch_router(tmp_path, monkeypatch):
+    """Point the process-wide router at a throwaway database."""
+    import llm_lab.auto_model as auto_model
+
+    router = auto_model.ModelRouter(path=tmp_path / "perf.db")
+    monkeypatch.setattr(auto_model, "default_router", lambda: router)
+    return router
+
+
+def test_model_selection(scratch_router):
     """Test model selection based on task requirements."""
     from llm_lab.auto_model import select_model
 
@@ -30,7 +40,7 @@ def test_model_selection():
     assert model.cost_per_1k <= requirements["max_cost"]
 
 
-def test_performance_tracking():
+def test_performance_tracking(scratch_router):
     """Test performance history tracking."""
     from llm_lab.auto_model import track_performance
 
@@ -39,3 +49,145 @@ def test_performance_tracking():
     )
     assert result["recorded"] is True
     assert "timestamp" in result
+    assert scratch_router.estimate("test-model")[1] == 1.5
+
+
+CATALOG = {
+    "cheap": {"cost_per_1k": 0.001, "accuracy": 0.8},
+    "mid": {"cost_per_1k": 0.01, "accuracy": 0.91},
+    "premium": {"cost_per_1k": 0.03, "accuracy": 0.95},
+}
+
+
+def test_router_prefers_cheapest_qualifying_model(tmp_path):
+    """Test cost ordering, accuracy floors and observed failures."""
+    from llm_lab.auto_model import ModelRouter
+
+    router = ModelRouter(CATALOG, path=tmp_path / "perf.db")
+    assert router.select({"min_accuracy": 0.7}).name == "cheap"
+    assert router.select({"min_accuracy": 0.9}).name == "mid"
+    assert router.select({"min_accuracy": 0.9, "max_cost": 0.005}) is None
+
+    for _ in range(20):
+        router.record("mid", "write code", False, 1.0, 100, domain="code")
+    assert router.select({"min_accuracy": 0.9, "domain": "code"}).name == "premium"
+    assert router.select({"min_accuracy": 0.9, "domain": "prose"}).name == "premium"
+    assert router.select(
+        {"min_accuracy": 0.9, "task_type": "code-generation"}
+    ).name == ("premium")
+
+
+def test_router_latency_slo_and_persistence(tmp_path):
+    """Test p95 latency constraints and reloading history from SQLite."""
+    from llm_lab.auto_model import ModelRouter
+
+    router = ModelRouter(CATALOG, path=tmp_path / "perf.db", window=50)
+    for i in range(100):
+        router.record("cheap", "summarize", True, 5.0 if i % 10 == 0 else 0.5, 50)
+    assert router.select({"max_latency": 4.0}).name == "mid"
+    assert router.select({"max_latency": 6.0}).name == "cheap"
+
+    reloaded = ModelRouter(CATALOG, path=tmp_path / "perf.db", window=50)
+    assert reloaded.estimate("cheap") == router.estimate("cheap")
+    assert len(reloaded._windows[("cheap", None)].outcomes) == 50
+
+
+def test_performance_window_percentiles_track_evictions():
+    """Test that the sorted latencies follow the rolling window."""
+    import random
+
+    from llm_lab.auto_model import PerformanceWindow
+    from llm_lab.utils import percentile
+
+    rng = random.Random(0)
+    window = PerformanceWindow(25)
+    for _ in range(200):
+        window.add(rng.random() < 0.9, rng.choice([0.5, 1.0, rng.random() * 5]))
+        latencies = [latency for _, latency in window.outcomes]
+        for q in (50, 95):
+            assert window.latency(q) == percentile(latencies, q)
+    assert window.successes == sum(success for success, _ in window.outcomes)
+
+
+def test_router_exploration(tmp_path):
+    """Test that the exploration knob routes some traffic to other models."""
+    from llm_lab.auto_model import ModelRouter
+
+    router = ModelRouter(CATALOG, path=tmp_path / "perf.db", explore=0.5, seed=3)
+    choices = [router.select({"min_accuracy": 0.9}) for _ in range(100)]
+    explored = [c for c in choices if c.explored]
+    assert 20 < len(explored) < 80
+    assert {c.name for c in explored} == set(CATALOG)
+    assert {c.name for c in choices if not c.explored} == {"mid"}
+
+
+def test_task_classifier_domains():
+    """Test that the local classifier separates common task domains."""
+    from llm_lab.auto_model import analyze_task
+
+    cases = {
+        "Generate unit tests for authentication module": "code",
+        "Write a cover letter for a job": "writing",
+        "What is 12 + 30?": "math",
+        "Summarize the quarterly report and compare with last year": "analysis",
+        "What's the capital of France?": "chat",
+    }
+    for task, domain in cases.items():
+        assert analyze_task(task)["domain"] == domain, task
+
+    simple = analyze_task("Who wrote Dune?")
+    involved = analyze_task(
+        "Design a scalable distributed cache with a security review "
+        "and a step-by-step production deployment plan"
+    )
+    assert simple["complexity"] < involved["complexity"] <= 1.0
+    assert simple["tokens_estimate"] < involved["tokens_estimate"] <= 8000
+
+
+def test_task_classifier_features_match_whole_words_independently():
+    """Test that keywords count for every feature they match, as whole words."""
+    import numpy as np
+
+    from llm_lab.auto_model.classifier import (
+        FEATURES,
+        WEIGHTS,
+        features,
+        fit_weights,
+    )
+
+    def counts(task):
+        return dict(zip(FEATURES, features(task)))
+
+    report = counts("Write a detailed report and an essay")
+    assert report["analysis"] == 1 and report["writing"] == 2
+    assert report["long_output"] == 3
+    # "data", "post" and "who" must not match inside longer words
+    migration = counts("Migrate the database to PostgreSQL as a whole")
+    assert migration["analysis"] == migration["writing"] == migration["chat"] == 0
+    assert counts("Who needs this data?")["chat"] == 1
+    np.testing.assert_allclose(WEIGHTS, fit_weights(), atol=1e-4)
+    # Every feature is exercised by the seed tasks, so none is dead weight
+    assert np.abs(WEIGHTS).sum(axis=1).min() > 0.1
+    pasted = counts("Fix this\n```python\nx = 1\n```\nand:\n- a\n- b")
+    assert pasted["code_blocks"] == 1 and pasted["list_items"] == 2
+
+
+def test_task_classifier_is_fast_and_memoized():
+    """Test that classification stays well under a millisecond."""
+    import time
+
+    from llm_lab.auto_model import analyze_task
+    from llm_lab.auto_model.classifier import classify
+
+    analyze_task("warm up")
+    tasks = [f"Refactor module {i} and add tests" for i in range(500)]
+    start = time.perf_counter()
+    for task in tasks:
+        analyze_task(task)
+    assert (time.perf_counter() - start) / len(tasks) < 0.001
+
+    hits = classify.cache_info().hits
+    result = analyze_task(tasks[0])
+    result["domain"] = "mutated"
+    assert classify.cache_info().hits == hits + 1
+    assert analyze_task(tasks[0])["domain"] == "code"
@@ -0,0 +1,314 @@
+"""Tests for incremental log rollups."""
+
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+from llm_lab import ROOT_DIR
+from llm_lab.analytics import (
+    connect,
+    duration_bucket,
+    latency_quantiles,
+    refresh_rollups,
+    refresh_sketches,
+)
+from llm_lab.analytics.__main__ import main
+from llm_lab.analytics.sketch import LogSketch
+
+SQL_DIR = ROOT_DIR / "src" / "sql"
+
+# The full-scan reports the rollup versions replace
+ORIGINAL_REPORTS = {
+    "advanced/01-response-time.sql": """
+        SELECT model, COUNT(*), ROUND(AVG(duration_ms), 2),
+               ROUND(MIN(duration_ms), 2), ROUND(MAX(duration_ms), 2),
+               ROUND(AVG(input_tokens + output_tokens), 2)
+        FROM responses GROUP BY model ORDER BY 3 DESC
+        """,
+    "advanced/02-token-trends.sql": """
+        SELECT DATE(datetime_utc) as date, COUNT(DISTINCT conversation_id),
+               SUM(input_tokens), SUM(output_tokens), ROUND(AVG(duration_ms), 2)
+        FROM responses GROUP BY date ORDER BY date DESC LIMIT 7
+        """,
+    "cost/01-token-cost-analysis.sql": """
+        SELECT model, SUM(input_tokens) as i, SUM(output_tokens) as o,
+               ROUND((SUM(input_tokens) * CASE WHEN model LIKE '%gpt-4%' THEN 0.03
+                      WHEN model LIKE '%gpt-3.5%' THEN 0.002 ELSE 0.01 END / 1000.0)
+                     + (SUM(output_tokens) * CASE WHEN model LIKE '%gpt-4%' THEN 0.06
+                        WHEN model LIKE '%gpt-3.5%' THEN 0.002 ELSE 0.03 END / 1000.0),
+                     2) as cost,
+               ROUND((SUM(input_tokens) + SUM(output_tokens)) / 1000.0, 1)
+        FROM responses GROUP BY model ORDER BY cost DESC
+        """,
+    "basic/02-conversations-by-date.sql": """
+        SELECT DATE(r.datetime_utc) as date, COUNT(DISTINCT c.id), COUNT(*)
+        FROM conversations c JOIN responses r ON c.id = r.conversation_id
+        GROUP BY date ORDER BY date DESC LIMIT 10
+        """,
+    "basic/03-model-usage-stats.sql": """
+        SELECT model, COUNT(*) as usage_count, COUNT(DISTINCT conversation_id),
+               ROUND(AVG(input_tokens), 2), ROUND(AVG(output_tokens), 2)
+        FROM responses GROUP BY model ORDER BY usage_count DESC
+        """,
+    "usage/01-usage-analysis.sql": """
+        WITH s AS (
+          SELECT c.id, COUNT(r.id) as n, SUM(r.input_tokens) as i,
+                 SUM(r.output_tokens) as o, SUM(r.duration_ms) as d
+          FROM conversations c LEFT JOIN responses r ON c.id = r.conversation_id
+          GROUP BY c.id
+        )
+        SELECT ROUND(AVG(n), 1), ROUND(AVG(i), 0), ROUND(AVG(o), 0),
+               ROUND(AVG(d) / 1000.0, 1), COUNT(*), SUM(n)
+        FROM s
+        """,
+}
+
+
+def maybe_null(rng, value, rate=0.1):
+    """Return ``value``, or None for a fraction ``rate`` of calls."""
+    return None if rng.random() < rate else value
+
+
+def add_responses(conn, n, seed):
+    """Insert ``n`` random responses, some with NULL tokens and durations."""
+    rng = random.Random(seed)
+    # "local" never records token counts, so its averages (and those of its
+    # own conversation) must stay NULL
+    models = ["gpt-4", "gpt-3.5-turbo", "claude-3", "local"]
+    conversations = [f"conv-{i}" for i in range(20)]
+    conn.executemany(
+        "INSERT OR IGNORE INTO conversations (id, name, model) VALUES (?, ?, ?)",
+        [(c, c, rng.choice(models)) for c in [*conversations, "conv-local"]],
+    )
+    rows = []
+    for i in range(n):
+        model = rng.choice(models)
+        tokens = [maybe_null(rng, rng.randint(1, 2000)) for _ in range(2)]
+        rows.append(
+            (
+                f"r-{seed}-{i}",
+                model,
+                "conv-local" if model == "local" else rng.choice(conversations),
+                maybe_null(rng, rng.randint(50, 20_000)),
+                f"2025-05-{rng.randint(1, 12):02d}T{rng.randint(0, 23):02d}:00:00",
+                *([None, None] if model == "local" else tokens),
+            )
+        )
+    conn.executemany(
+        "INSERT INTO responses (id, model, conversation_id, duration_ms, "
+        "datetime_utc, input_tokens, output_tokens) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+
+
+@pytest.fixture
+def logs(tmp_path):
+    """Return a connection to a logs database with 500 responses."""
+    conn = sqlite3.connect(tmp_path / "logs.db", isolation_level=None)
+    conn.executescript("""
+        CREATE TABLE conversations (id TEXT PRIMARY KEY, name TEXT, model TEXT);
+        CREATE TABLE responses (
+            id TEXT PRIMARY KEY, model TEXT, prompt TEXT, system TEXT,
+            response TEXT, conversation_id TEXT, duration_ms INTEGER,
+            datetime_utc TEXT, input_tokens INTEGER, output_tokens INTEGER
+        );
+        """)
+    conn.execute("INSERT INTO conversations VALUES ('empty', 'empty', 'gpt-4')")
+    add_responses(conn, 500, seed=1)
+    return conn
+
+
+def test_duration_bucket():
+    """Test the log2 duration bucket boundaries."""
+    assert duration_bucket(0) == 0
+    assert duration_bucket(1) == 1
+    assert duration_bucket(1023) == 10
+    assert duration_bucket(1024) == 11
+
+
+def test_refresh_is_incremental(logs):
+    """Test that refreshing only rolls up responses added since the last run."""
+    assert refresh_rollups(logs, chunk_size=64)["processed"] == 500
+    assert refresh_rollups(logs)["processed"] == 0
+    add_responses(logs, 30, seed=2)
+    result = refresh_rollups(logs)
+    assert result["processed"] == 30
+    total, timed = logs.execute(
+        "SELECT SUM(responses), SUM(duration_count) FROM rollup_model_day"
+    ).fetchone()
+    (histogram,) = logs.execute(
+        "SELECT SUM(responses) FROM rollup_duration_histogram"
+    ).fetchone()
+    assert total == 530
+    assert histogram == timed < total
+
+
+@pytest.mark.parametrize("report", sorted(ORIGINAL_REPORTS))
+def test_rollup_reports_match_full_scans(logs, report):
+    """Test that each rollup report matches its full-scan original."""
+    refresh_rollups(logs, chunk_size=100)
+    add_responses(logs, 120, seed=3)
+    refresh_rollups(logs, chunk_size=100)
+    expected = logs.execute(ORIGINAL_REPORTS[report]).fetchall()
+    actual = logs.execute((SQL_DIR / report).read_text()).fetchall()
+    assert actual == expected
+
+
+def test_sketch_relative_accuracy_and_merge():
+    """Test sketch quantile accuracy, merging and serialisation."""
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(6, 1.5, 50_000)
+    whole = LogSketch(0.01).add(values)
+    halves = LogSketch(0.01).add(values[:20_000])
+    halves.merge(LogSketch(0.01).add(values[20_000:]))
+    for q in (0.5, 0.95, 0.99):
+        exact = np.quantile(values, q, method="lower")
+        assert whole.quantile(q) == pytest.approx(exact, rel=0.011)
+        assert halves.quantile(q) == whole.quantile(q)
+    assert whole.quantile(0) == values.min()
+    assert whole.quantile(1) == values.max()
+    restored = LogSketch.from_json(whole.to_json())
+    assert restored.quantile(0.99) == whole.quantile(0.99)
+    assert LogSketch().quantile(0.5) is None
+    with pytest.raises(ValueError):
+        whole.merge(LogSketch(0.05))
+
+
+def test_sketches_persist_and_merge_new_days(logs):
+    """Test that stored sketches merge new responses and stay accurate."""
+    assert refresh_sketches(logs, chunk_size=64)["processed"] == 500
+    add_responses(logs, 200, seed=2)
+    assert refresh_sketches(logs)["processed"] == 200
+    by_model = latency_quantiles(logs, by="model")
+    (timed,) = logs.execute("SELECT COUNT(duration_ms) FROM responses").fetchone()
+    assert sum(row["responses"] for row in by_model) == timed
+    for row in by_model:
+        durations = [
+            d
+            for (d,) in logs.execute(
+                "SELECT duration_ms FROM responses "
+                "WHERE model = ? AND duration_ms IS NOT NULL",
+                (row["model"],),
+            )
+        ]
+        for q in (0.5, 0.95, 0.99):
+            exact = np.quantile(durations, q, method="lower")
+            assert row[f"p{round(q * 100)}"] == pytest.approx(exact, rel=0.011)
+    by_day = latency_quantiles(logs, by="model_day", since="2025-05-10")
+    assert {row["day"] for row in by_day} == {"2025-05-10", "2025-05-11", "2025-05-12"}
+
+
+def test_cli_latency(logs, tmp_path, capsys):
+    """Test the ``latency`` command prints per-model percentiles."""
+    logs.close()
+    assert main(["latency", "--db", str(tmp_path / "logs.db")]) == 0
+    out = capsys.readouterr().out
+    assert "p99 ms" in out
+    assert "gpt-4" in out
+
+
+def test_connect_leaves_journal_mode_alone(logs, tmp_path):
+    """Test that WAL journaling is only enabled when asked for."""
+    logs.close()
+    path = tmp_path / "logs.db"
+    assert connect(path).execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert connect(path, wal=True).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+@pytest.fixture
+def searchable(tmp_path):
+    """Return a connection to a database with an FTS index over 90 responses."""
+    conn = sqlite3.connect(tmp_path / "search.db", isolation_level=None)
+    conn.executescript("""
+        CREATE TABLE responses (
+            id TEXT PRIMARY KEY, model TEXT, prompt TEXT, response TEXT,
+            datetime_utc TEXT
+        );
+        CREATE VIRTUAL TABLE responses_fts USING fts5(
+            prompt, response, content=[responses]
+        );
+        """)
+    topics = ["python generators", "javascript promises", "sqlite indexes"]
+    conn.executemany(
+        "INSERT INTO responses VALUES (?, ?, ?, ?, ?)",
+        [
+            (
+                f"r{i:03d}",
+                "gpt-4" if i % 2 else "claude-3",
+                f"Question about {topics[i % 3]}",
+                "word " * (i % 7) + f"answer about {topics[i % 3]}",
+                f"2025-05-{i % 28 + 1:02d}T12:00:00",
+            )
+            for i in range(90)
+        ],
+    )
+    conn.execute(
+        "INSERT INTO responses_fts (rowid, prompt, response) "
+        "SELECT rowid, prompt, response FROM responses"
+    )
+    return conn
+
+
+def test_fts_search_filters_and_keyset_pages(searchable):
+    """Test filtered full-text search paged by keyset."""
+    from llm_lab.analytics.search import fts_search
+
+    seen = []
+    page = fts_search(searchable, "python", model="gpt-4", limit=4)
+    while True:
+        seen.extend(result["id"] for result in page["results"])
+        if page["next"] is None:
+            break
+        page = fts_search(
+            searchable, "python", model="gpt-4", limit=4, after=page["next"]
+        )
+    expected = {
+        id_
+        for (id_,) in searchable.execute(
+            "SELECT id FROM responses WHERE prompt LIKE '%python%' AND model = 'gpt-4'"
+        )
+    }
+    assert len(seen) == len(set(seen)) == len(expected)
+    assert set(seen) == expected
+    dated = fts_search(searchable, "sqlite", since="2025-05-10", until="2025-05-12")
+    assert all(
+        "2025-05-10" <= r["datetime_utc"] < "2025-05-12" for r in dated["results"]
+    )
+    assert "[sqlite]" in dated["results"][0]["snippet"]
+
+
+def test_hybrid_search_fuses_rankings(searchable):
+    """Test that hybrid search fuses BM25 and vector rankings."""
+    from llm_lab.analytics.search import hybrid_search
+
+    class Index:
+        def search(self, query, k):
+            # r001 and r004 are about other topics; r003 is a python answer
+            return [("r001", 0.9), ("r003", 0.8), ("r004", 0.7)][:k]
+
+    page = hybrid_search(searchable, "python generators", index=Index(), limit=5)
+    top = page["results"][0]
+    # Ranked well by both BM25 and similarity, r003 beats the top BM25 hit
+    assert top["id"] == "r003"
+    assert top["bm25"] is not None and top["similarity"] == 0.8
+    assert "r001" in [result["id"] for result in page["results"]]
+    only_vector = next(r for r in page["results"] if r["id"] == "r001")
+    assert only_vector["model"] == "gpt-4"
+    assert only_vector["bm25"] is None
+
+    filtered = hybrid_search(
+        searchable, "python generators", index=Index(), model="claude-3", limit=50
+    )
+    assert {r["model"] for r in filtered["results"]} == {"claude-3"}
+
+    pages, after = [], None
+    while True:
+        page = hybrid_search(searchable, "python", index=Index(), limit=7, after=after)
+        pages.extend(r["id"] for r in page["results"])
+        after = page["next"]
+        if after is None:
+            break
+    assert len(pages) == len(set(pages)) == 32
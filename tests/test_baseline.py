@@ -5,8 +5,8 @@ from pathlib import Path
 
 import pytest
 
-from llm_lab import DATA_DIR
-from llm_lab.utils import get_model_response, load_json, save_json
+from llm_lab.bench import detect_regressions, load_history, pool_runs, run_benchmark
+from llm_lab.utils import get_model_responses, save_json
 
 BASELINE_TIMEOUT = 30  # Seconds to wait for model responses
 
@@ -17,11 +17,10 @@ def test_model_consistency():
     models = ["gemini-1.5-pro-latest", "gpt-4", "claude-3"]
 
     results = {}
-    for model in models:
-        response = get_model_response(prompt, model)
+    for response in get_model_responses([prompt], models):
         if "error" in response:
-            pytest.skip(f"Model {model} failed: {response['error']}")
-        results[model] = response
+            pytest.skip(f"Model {response['model']} failed: {response['error']}")
+        results[response["model"]] = response
 
     # Check response lengths are within 20%
     lengths = [len(r["text"]) for r in results.values()]
@@ -32,10 +31,12 @@ def test_model_consistency():
 
 @pytest.mark.timeout(BASELINE_TIMEOUT)
 def test_performance_regression():
-    """Compare against baseline metrics."""
-    baseline_file = DATA_DIR / "baselines" / "performance.json"
-    if not baseline_file.exists():
-        pytest.skip(f"No baseline file: {baseline_file}")
+    """Compare a fresh benchmark run against the stored run history."""
+    history = load_history("performance")
+    if not history:
+        pytest.skip(
+            "No baseline history: run python -m llm_lab.bench --save performance"
+        )
 
     # Run test cases
     test_cases = [
@@ -44,26 +45,9 @@ def test_performance_regression():
         "How do generators work?",
     ]
 
-    results = []
-    for prompt in test_cases:
-        response = get_model_response(prompt)
-        if "error" not in response:
-            results.append(response)
-
-    if not results:
+    run = run_benchmark(test_cases, runs=3, warmup=1, max_concurrency=3)
+    if run["models"]["default"]["error_rate"] == 1:
         pytest.skip("No successful responses")
 
-    current = {
-        "latency": sum(r["latency"] for r in results) / len(results),
-        "tokens": sum(r["tokens"] for r in results) / len(results),
-    }
-
-    baseline = load_json(baseline_file)
-
-    # Allow 10% regression from baseline
-    assert (
-        current["latency"] <= baseline["latency"] * 1.1
-    ), f"Latency regression: {current['latency']:.2f}s > {baseline['latency']:.2f}s"
-    assert (
-        current["tokens"] <= baseline["tokens"] * 1.1
-    ), f"Token count regression: {current['tokens']} > {baseline['tokens']}"
+    regressions = detect_regressions(pool_runs(history), run)
+    assert not regressions, f"Performance regressions: {regressions}"
@@ -0,0 +1,125 @@
+"""Tests for the offline benchmark harness."""
+
+import time
+
+import pytest
+
+from llm_lab import bench
+from llm_lab.bench import (
+    compare_samples,
+    detect_regressions,
+    load_history,
+    mann_whitney_u,
+    run_benchmark,
+    save_run,
+)
+from llm_lab.fake import fake_backend
+
+
+def test_run_benchmark_metrics():
+    """Test that the harness records percentiles, throughput and errors."""
+    run = run_benchmark(
+        ["a", "b"],
+        ["m1", "m2"],
+        runs=5,
+        warmup=1,
+        backend=fake_backend(latency=0.002, tokens=10, error_rate=0.2, seed=1),
+        max_concurrency=4,
+    )
+    summary = run["models"]["m1"]
+    assert summary["requests"] == 10
+    assert 0 < summary["error_rate"] < 1
+    assert summary["latency_p50"] <= summary["latency_p90"] <= summary["latency_p99"]
+    assert summary["tokens_per_sec"] > 0
+    assert len(summary["latency"]) == 10 - round(summary["error_rate"] * 10)
+
+
+def test_seeded_backend_is_deterministic_under_concurrency():
+    """Test that a seeded fake backend fails the same calls at any concurrency."""
+
+    def errors(max_concurrency):
+        run = run_benchmark(
+            ["a", "b", "c"],
+            ["m1", "m2"],
+            runs=4,
+            warmup=1,
+            backend=fake_backend(latency=0.001, error_rate=0.3, seed=7),
+            max_concurrency=max_concurrency,
+        )
+        return {model: s["error_rate"] for model, s in run["models"].items()}
+
+    assert errors(1) == errors(6) == errors(6)
+
+
+def test_mann_whitney_u():
+    """Test the one-sided rank test on separated and identical samples."""
+    _, p_slower = mann_whitney_u([1, 2, 3, 4, 5], [6, 7, 8, 9, 10])
+    _, p_faster = mann_whitney_u([6, 7, 8, 9, 10], [1, 2, 3, 4, 5])
+    _, p_same = mann_whitney_u([1, 1, 1], [1, 1, 1])
+    assert p_slower < 0.01
+    assert p_faster > 0.99
+    assert p_same == 1.0
+
+
+def test_detect_regressions():
+    """Test that only a genuinely slower run is flagged."""
+
+    def stub_run(latency):
+        return run_benchmark(
+            ["a", "b", "c"],
+            ["m1"],
+            runs=4,
+            warmup=0,
+            backend=fake_backend(latency=latency, jitter=0.001, seed=2),
+            max_concurrency=3,
+        )
+
+    baseline = stub_run(0.005)
+    assert detect_regressions(baseline, stub_run(0.005), metrics=["tokens"]) == []
+    regressions = detect_regressions(baseline, stub_run(0.02))
+    assert [r["metric"] for r in regressions] == ["latency"]
+    assert compare_samples([1.0] * 10, [1.0] * 10)["regressed"] is False
+
+
+def test_run_history(tmp_path, monkeypatch):
+    """Test that runs accumulate in the baseline history."""
+    monkeypatch.setattr(bench, "DATA_DIR", tmp_path)
+    monkeypatch.setattr("llm_lab.utils.DATA_DIR", tmp_path)
+    for i in range(3):
+        save_run("perf", {"models": {}, "i": i}, limit=2)
+    assert [run["i"] for run in load_history("perf")] == [1, 2]
+
+
+def test_load_generator_counts_and_percentiles():
+    """Test virtual users, error accounting and latency percentiles."""
+    from llm_lab.bench.loadgen import run_load
+
+    def target(user, iteration):
+        time.sleep(0.001 * (1 + user))
+        if iteration == 2:
+            raise RuntimeError("boom")
+        return {"tokens": 10, "ttft": 0.001}
+
+    summary = run_load(target, users=5, iterations=4)
+    assert summary["requests"] == 20
+    assert summary["errors"] == 5
+    assert summary["error_types"] == {"RuntimeError: boom": 5}
+    assert summary["latency_p50"] <= summary["latency_p99"] <= summary["latency_max"]
+    assert summary["requests_per_sec"] > 0
+    assert summary["ttft_p50"] == 0.001
+
+
+def test_load_generator_against_fake_ollama():
+    """Test driving the fake Ollama server for a fixed duration."""
+    from llm_lab.bench.loadgen import ollama_target, run_load
+    from llm_lab.fake.server import serve_in_background
+
+    server, url = serve_in_background(ttft_ms=5, tokens_per_sec=1e4, reply="a b c d")
+    try:
+        summary = run_load(ollama_target(url), users=8, duration=0.5)
+    finally:
+        server.shutdown()
+    assert summary["requests"] > 8
+    assert summary["error_rate"] == 0
+    assert summary["tokens_per_sec"] == pytest.approx(summary["requests_per_sec"] * 4)
+    assert summary["ttft_p50"] >= 0.005
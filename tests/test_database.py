@@ -0,0 +1,192 @@
+"""Tests for the pooled read-only database layer."""
+
+import sqlite3
+import threading
+
+import pytest
+
+from llm_lab.database import ConnectionPool
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Return the path of a database with 50 rows in ``items``."""
+    path = tmp_path / "test.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.executemany(
+        "INSERT INTO items (name) VALUES (?)", [(f"item-{i}",) for i in range(50)]
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_pool_is_read_only(db_path):
+    """Test that pooled connections cannot write and WAL is opt-in."""
+    pool = ConnectionPool(db_path)
+    with pytest.raises(sqlite3.OperationalError):
+        pool.query("DELETE FROM items")
+    assert pool.query("SELECT count(*) FROM items")["rows"] == [[50]]
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    ConnectionPool(db_path, wal=True)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_pool_requires_existing_database(tmp_path):
+    """Test that a missing database file raises instead of being created."""
+    missing = tmp_path / "typo.db"
+    with pytest.raises(FileNotFoundError):
+        ConnectionPool(missing)
+    with pytest.raises(FileNotFoundError):
+        ConnectionPool(missing, wal=True)
+    assert not missing.exists()
+
+
+def test_query_limits_rows(db_path):
+    """Test that query results are capped at ``max_rows`` and flagged."""
+    pool = ConnectionPool(db_path)
+    result = pool.query("SELECT id, name FROM items ORDER BY id", max_rows=10)
+    assert result["columns"] == ["id", "name"]
+    assert result["rows"][0] == [1, "item-0"]
+    assert len(result["rows"]) == 10
+    assert result["truncated"]
+    assert not pool.query("SELECT * FROM items", max_rows=50)["truncated"]
+
+
+def test_iter_rows_streams_and_releases(db_path):
+    """Test that closing a row iterator returns its connection."""
+    pool = ConnectionPool(db_path, size=1)
+    rows = pool.iter_rows("SELECT id FROM items", batch_size=5)
+    assert next(rows) == ["id"]
+    assert next(rows) == (1,)
+    rows.close()
+    # The single connection is back in the pool
+    assert pool.query("SELECT 1")["rows"] == [[1]]
+
+
+def test_schema_cache_invalidated_by_ddl(db_path):
+    """Test that the cached schema is refreshed after DDL."""
+    pool = ConnectionPool(db_path)
+    schema = pool.schema()
+    assert schema == {"items": [("id", "INTEGER"), ("name", "TEXT")]}
+    assert pool.schema() is schema
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("ALTER TABLE items ADD COLUMN price REAL")
+    assert pool.schema()["items"][-1] == ("price", "REAL")
+    assert "  - price (REAL)" in pool.describe()
+
+
+def test_pool_bounds_connections(db_path):
+    """Test that concurrent queries never open more than ``size`` connections."""
+    pool = ConnectionPool(db_path, size=2)
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(20):
+                assert pool.query("SELECT count(*) FROM items")["rows"] == [[50]]
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert pool._opened <= 2
+    pool.close()
+    assert pool._opened == 0
+
+
+def test_shape_query_columnar_stats(db_path):
+    """Test that shaped results are columnar with per-column stats."""
+    from llm_lab.database.shaping import shape_query
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO items (name) VALUES (NULL)")
+    pool = ConnectionPool(db_path)
+    shaped = shape_query(pool, "SELECT id, name FROM items ORDER BY id")
+    assert shaped["columns"] == ["id", "name"]
+    assert shaped["total_rows"] == shaped["rows"] == 51
+    assert not shaped["truncated"]
+    assert shaped["values"][0][:3] == [1, 2, 3]
+    assert shaped["stats"]["id"] == {
+        "count": 51,
+        "nulls": 0,
+        "min": 1,
+        "max": 51,
+        "distinct": 51,
+        "distinct_exact": True,
+    }
+    assert shaped["stats"]["name"]["nulls"] == 1
+    assert shaped["stats"]["name"]["min"] == "item-0"
+
+
+def test_shape_rows_respects_token_budget():
+    """Test that shaped rows are truncated to the token budget."""
+    from llm_lab.database.shaping import dumps, shape_rows
+    from llm_lab.utils import count_tokens
+
+    rows = ((i, "x" * 40, i * 0.5) for i in range(10_000))
+    shaped = shape_rows(["id", "text", "half"], rows, budget=500, distinct_limit=100)
+    assert shaped["total_rows"] == 10_000
+    assert 0 < shaped["rows"] < 10_000
+    assert shaped["truncated"]
+    assert len(shaped["values"][0]) == shaped["rows"]
+    assert count_tokens(dumps(shaped)) <= 500
+    assert shaped["stats"]["half"]["max"] == 4999.5
+    assert shaped["stats"]["text"]["distinct"] == 1
+    assert shaped["stats"]["id"]["distinct_exact"] is False
+
+
+def test_shape_rows_mixed_types_and_empty():
+    """Test stats over mixed-type columns and empty results."""
+    from llm_lab.database.shaping import shape_rows
+
+    shaped = shape_rows(["v"], [(3,), ("a",), (1.5,), (None,), (b"\0",)])
+    assert shaped["stats"]["v"]["min"] == 1.5
+    assert shaped["stats"]["v"]["max"] == "<1 bytes>"
+    empty = shape_rows(["a", "b"], [])
+    assert empty["values"] == [[], []]
+    assert empty["stats"]["a"]["min"] is None
+
+
+def test_sql_cache_normalized_and_schema_keyed(tmp_path):
+    """Test that cached SQL is keyed by normalised question and schema version."""
+    from llm_lab.database.sql_cache import SQLCache, normalize_question
+
+    assert normalize_question("  How many ORDERS?? ") == "how many orders"
+    cache = SQLCache(tmp_path / "nl2sql.db")
+    cache.set("How many orders?", 1, "SELECT count(*) FROM orders", latency=2.5)
+    hit = cache.get("how many orders", 1)
+    assert hit["sql"] == "SELECT count(*) FROM orders"
+    assert hit["match"] == "exact"
+    assert cache.get("How many orders?", 2) is None
+    cache.discard("how many orders!", 1)
+    assert cache.get("how many orders", 1) is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["saved_seconds"] == 2.5
+
+
+def test_sql_cache_embedding_neighbours(tmp_path):
+    """Test that similar questions hit the cache through embeddings."""
+    from llm_lab.database.sql_cache import SQLCache
+
+    vocabulary = ["orders", "customers", "count", "total"]
+
+    def embed(text):
+        words = text.split()
+        return [float(word in words) for word in vocabulary]
+
+    cache = SQLCache(tmp_path / "nl2sql.db", embed=embed, threshold=0.9)
+    cache.set("count the orders", 1, "SELECT count(*) FROM orders")
+    hit = cache.get("please count all orders", 1)
+    assert hit["match"] == "similar"
+    assert hit["question"] == "count the orders"
+    assert cache.get("count customers", 1) is None
+    assert cache.stats()["similar_hits"] == 1
@@ -0,0 +1,277 @@
+"""Tests for vectorized embedding search."""
+
+import sqlite3
+import struct
+
+import numpy as np
+import pytest
+
+from llm_lab.embeddings import VectorIndex
+
+
+def create_collection(path, name, vectors, start=0):
+    """Create (or extend) a collection in an llm-style embeddings database."""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS collections (
+            id INTEGER PRIMARY KEY, name TEXT UNIQUE, model TEXT
+        );
+        CREATE TABLE IF NOT EXISTS embeddings (
+            collection_id INTEGER, id TEXT, embedding BLOB, content TEXT,
+            content_hash BLOB, metadata TEXT, updated INTEGER,
+            PRIMARY KEY (collection_id, id)
+        );
+        """)
+    conn.execute(
+        "INSERT OR IGNORE INTO collections (name, model) VALUES (?, 'fake-embed')",
+        (name,),
+    )
+    (collection_id,) = conn.execute(
+        "SELECT id FROM collections WHERE name = ?", (name,)
+    ).fetchone()
+    conn.executemany(
+        "INSERT INTO embeddings (collection_id, id, embedding, updated) "
+        "VALUES (?, ?, ?, ?)",
+        [
+            (collection_id, f"doc-{start + i}", struct.pack(f"<{len(v)}f", *v), 1)
+            for i, v in enumerate(vectors)
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def vectors():
+    """Return 500 random 16-dimensional vectors."""
+    return np.random.default_rng(0).normal(size=(500, 16)).astype(np.float32)
+
+
+def brute_force(vectors, query, k):
+    """Return the ids of the ``k`` vectors most cosine-similar to ``query``."""
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    return [f"doc-{i}" for i in np.argsort(-scores)[:k]]
+
+
+def test_search_matches_brute_force(tmp_path, vectors):
+    """Test top-k cosine search against a full sort."""
+    create_collection(tmp_path / "embeddings.db", "docs", vectors)
+    index = VectorIndex.from_collection(
+        "docs", tmp_path / "embeddings.db", cache_dir=tmp_path / "cache"
+    )
+    query = vectors[42] + 0.1
+    results = index.search(query, k=5)
+
+    assert [id for id, _ in results] == brute_force(vectors, query, 5)
+    assert results[0][0] == "doc-42"
+    assert results[0][1] == pytest.approx(max(score for _, score in results))
+
+    batched = index.search_many(vectors[:3], k=5)
+    assert [r[0][0] for r in batched] == ["doc-0", "doc-1", "doc-2"]
+    single = index.search(vectors[0], k=5)
+    assert [id for id, _ in batched[0]] == [id for id, _ in single]
+    assert [s for _, s in batched[0]] == pytest.approx([s for _, s in single])
+
+
+def test_cache_invalidated_on_collection_change(tmp_path, vectors):
+    """Test that new rows rebuild the memory-mapped cache."""
+    db_path, cache_dir = tmp_path / "embeddings.db", tmp_path / "cache"
+    create_collection(db_path, "docs", vectors[:100])
+    first = VectorIndex.from_collection("docs", db_path, cache_dir=cache_dir)
+    again = VectorIndex.from_collection("docs", db_path, cache_dir=cache_dir)
+    assert isinstance(again.vectors, np.memmap)
+    assert len(first) == len(again) == 100
+
+    create_collection(db_path, "docs", vectors[100:], start=100)
+    updated = VectorIndex.from_collection("docs", db_path, cache_dir=cache_dir)
+    assert len(updated) == 500
+    assert updated.search(vectors[300], k=1)[0][0] == "doc-300"
+
+
+def test_cache_keyed_by_database_and_content(tmp_path, vectors):
+    """Test that same-named collections and same-second re-embeds get fresh caches."""
+    cache_dir = tmp_path / "cache"
+    first_db, second_db = tmp_path / "first.db", tmp_path / "second.db"
+    create_collection(first_db, "docs", vectors[:50])
+    create_collection(second_db, "docs", vectors[50:80])
+    first = VectorIndex.from_collection("docs", first_db, cache_dir=cache_dir)
+    second = VectorIndex.from_collection("docs", second_db, cache_dir=cache_dir)
+    assert len(first) == 50 and len(second) == 30
+    assert len(VectorIndex.from_collection("docs", first_db, cache_dir=cache_dir)) == 50
+
+    # Re-embedded in place: same rowid, count and (one-second) timestamp
+    conn = sqlite3.connect(first_db)
+    conn.execute(
+        "UPDATE embeddings SET embedding = ?, content_hash = x'01' "
+        "WHERE id = 'doc-7'",
+        (struct.pack(f"<{vectors.shape[1]}f", *-vectors[7]),),
+    )
+    conn.commit()
+    conn.close()
+    updated = VectorIndex.from_collection("docs", first_db, cache_dir=cache_dir)
+    assert updated.search(-vectors[7], k=1)[0][0] == "doc-7"
+
+
+def test_missing_collection(tmp_path, vectors):
+    """Test that an unknown collection name raises KeyError."""
+    create_collection(tmp_path / "embeddings.db", "docs", vectors[:1])
+    with pytest.raises(KeyError):
+        VectorIndex.from_collection("nope", tmp_path / "embeddings.db", tmp_path)
+
+
+def clustered(n=2000, dims=16, clusters=20, seed=1):
+    """Return vectors drawn around random cluster centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dims))
+    points = centres[rng.integers(clusters, size=n)] + 0.2 * rng.normal(size=(n, dims))
+    return points.astype(np.float32)
+
+
+def test_ivf_recall_against_exact():
+    """Test that IVF search approaches exact results as nprobe grows."""
+    from llm_lab.embeddings.ivf import IVFIndex
+
+    data = clustered()
+    ids = [f"doc-{i}" for i in range(len(data))]
+    exact = VectorIndex(ids, data)
+    ivf = IVFIndex.build(ids, data, nlist=16, nprobe=4)
+    queries = data[:50] + 0.05
+
+    def recall(nprobe):
+        hits = 0
+        for q in queries:
+            truth = {id for id, _ in exact.search(q, k=10)}
+            hits += len(truth & {id for id, _ in ivf.search(q, k=10, nprobe=nprobe)})
+        return hits / (10 * len(queries))
+
+    assert recall(4) >= 0.9
+    assert recall(16) == 1.0
+
+
+def test_ivf_persistence_and_incremental_update(tmp_path):
+    """Test that the stored index picks up rows added after it was built."""
+    from llm_lab.embeddings.ivf import IVFIndex
+
+    data = clustered(600)
+    db_path, path = tmp_path / "embeddings.db", tmp_path / "docs.ivf.npz"
+    create_collection(db_path, "docs", data[:500])
+    built = IVFIndex.from_collection("docs", db_path, path=path, nlist=8)
+    assert len(built) == 500
+
+    create_collection(db_path, "docs", data[500:], start=500)
+    updated = IVFIndex.from_collection("docs", db_path, path=path)
+    assert len(updated) == 600
+    assert updated.watermark > built.watermark
+    assert updated.search(data[550], k=1, nprobe=8)[0][0] == "doc-550"
+
+    updated.add(["doc-550"], [-data[550]])
+    assert len(updated) == 600
+    assert updated.search(data[550], k=1, nprobe=8)[0][0] != "doc-550"
+
+
+def test_ivf_sync_drops_deleted_and_reembedded_rows(tmp_path):
+    """Test that deletions and in-place re-embeds reach the stored index."""
+    from llm_lab.embeddings.ivf import IVFIndex
+
+    data = clustered(300)
+    db_path, path = tmp_path / "embeddings.db", tmp_path / "docs.ivf"
+    create_collection(db_path, "docs", data)
+    IVFIndex.from_collection("docs", db_path, path=path, nlist=4)
+    # np.savez adds the suffix; loading must find the same file
+    assert (tmp_path / "docs.ivf.npz").exists() and not path.exists()
+    assert len(IVFIndex.load(path)) == 300
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM embeddings WHERE id IN ('doc-10', 'doc-20')")
+    conn.execute(
+        "UPDATE embeddings SET embedding = ?, updated = 2 WHERE id = 'doc-30'",
+        (struct.pack(f"<{data.shape[1]}f", *-data[30]),),
+    )
+    conn.commit()
+    conn.close()
+
+    synced = IVFIndex.from_collection("docs", db_path, path=path)
+    assert len(synced) == 298
+    found = {id for id, _ in synced.search(data[10], k=300, nprobe=4)}
+    assert not found & {"doc-10", "doc-20"}
+    assert synced.search(-data[30], k=1, nprobe=4)[0][0] == "doc-30"
+
+
+class FakeEmbeddingModel:
+    """Embedding model stand-in: only its ID is needed to create a collection."""
+
+    model_id = "fake-embed"
+
+
+def test_embed_pipeline_skips_unchanged_content(tmp_path):
+    """Test hash skipping, vector reuse and batched writes across runs."""
+    from llm_lab.embeddings.pipeline import embed_pipeline, jsonl_source
+
+    calls = []
+
+    def embed(batch):
+        calls.append(len(batch))
+        return [[float(len(text)), 1.0, 0.0] for text in batch]
+
+    source = tmp_path / "issues.jsonl"
+    source.write_text(
+        "".join(
+            f'{{"id": {i}, "title": "issue {i % 7}", "body": "text"}}\n'
+            for i in range(20)
+        )
+    )
+    db_path = tmp_path / "embeddings.db"
+
+    def run():
+        return embed_pipeline(
+            "issues",
+            jsonl_source(source),
+            db_path=db_path,
+            model=FakeEmbeddingModel(),
+            batch_size=3,
+            workers=2,
+            store=True,
+            embed=embed,
+        )
+
+    first = run()
+    assert first == {
+        "seen": 20,
+        "skipped": 0,
+        "reused": 13,
+        "embedded": 7,
+        "batches": 3,
+    }
+    assert sum(calls) == 7
+
+    second = run()
+    assert second["skipped"] == 20
+    assert sum(calls) == 7
+
+    source.write_text('{"id": 0, "title": "changed", "body": "text"}\n')
+    assert run()["embedded"] == 1
+
+    index = VectorIndex.from_collection("issues", db_path, cache_dir=tmp_path)
+    assert len(index) == 20
+
+
+def test_files_and_sql_sources(tmp_path):
+    """Test reading pipeline items from files and SQL rows."""
+    import sqlite3
+
+    from llm_lab.embeddings.pipeline import files_source, sql_source
+
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.txt").write_text("alpha")
+    assert list(files_source("docs/*.txt", root=tmp_path)) == [
+        ("docs/a.txt", "alpha", None)
+    ]
+
+    conn = sqlite3.connect(tmp_path / "data.db")
+    conn.execute("CREATE TABLE t (id INTEGER, title TEXT, body TEXT)")
+    conn.execute("INSERT INTO t VALUES (1, 'hello', 'world')")
+    conn.commit()
+    assert list(sql_source(tmp_path / "data.db", "SELECT * FROM t")) == [
+        ("1", "hello world", None)
+    ]
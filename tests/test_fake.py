@@ -0,0 +1,126 @@
+"""Tests for the fake llm plugin and Ollama stand-in."""
+
+import json
+import random
+import urllib.error
+import urllib.request
+
+import llm
+import pytest
+
+from llm_lab.fake import sample_latency
+from llm_lab.fake.plugin import FakeLLM, register_models
+from llm_lab.fake.server import serve_in_background
+
+
+@pytest.mark.parametrize("distribution", ["uniform", "exponential", "lognormal"])
+def test_sample_latency_mean(distribution):
+    """Test that sampled latencies average the requested mean."""
+    rng = random.Random(0)
+    samples = [sample_latency(rng, 0.2, distribution) for _ in range(20_000)]
+    assert min(samples) >= 0
+    assert sum(samples) / len(samples) == pytest.approx(0.2, rel=0.05)
+    assert sample_latency(rng, 0.2) == 0.2
+    with pytest.raises(ValueError):
+        sample_latency(rng, 0.2, "bimodal")
+
+
+def test_plugin_registers_models():
+    """Test that the plugin registers the fake models."""
+    registered = []
+    register_models(registered.append)
+    assert [model.model_id for model in registered] == [
+        "fake",
+        "fake-fast",
+        "fake-flaky",
+    ]
+
+
+def test_fake_model_streams_and_fails():
+    """Test that the fake model streams its reply and can fail on demand."""
+    model = FakeLLM("fake-test", ttft_ms=0.0, tokens_per_sec=1e6)
+    response = model.prompt("hello there")
+    assert list(response) == ["Fake", " reply", " to:", " hello", " there"]
+    assert response.output_tokens == 5
+    assert model.prompt("x", reply="hi", latency="fixed").text() == "hi"
+    with pytest.raises(llm.ModelError):
+        model.prompt("x", error_rate=1.0).text()
+
+
+def test_seeded_fake_model_is_deterministic_across_threads():
+    """Test that seeded calls fail the same way sequentially and concurrently."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    prompts = [f"p{i % 10}" for i in range(60)]
+
+    def failures(workers):
+        model = FakeLLM("fake-test", ttft_ms=1.0, tokens_per_sec=1e6)
+
+        def call(prompt):
+            try:
+                model.prompt(prompt, error_rate=0.5, seed=4).text()
+            except llm.ModelError:
+                return prompt
+            return None
+
+        with ThreadPoolExecutor(workers) as pool:
+            failed = [p for p in pool.map(call, prompts) if p]
+        return sorted(failed)
+
+    sequential = failures(1)
+    assert 0 < len(sequential) < len(prompts)
+    assert failures(8) == sequential
+
+
+def test_fake_model_tool_script():
+    """Test that a tool script drives tool calls before the final reply."""
+    model = FakeLLM("fake-test", ttft_ms=0.0, tokens_per_sec=1e6)
+    calls = []
+
+    def lookup(city: str) -> str:
+        "Look up the weather for a city."
+        calls.append(city)
+        return f"sunny in {city}"
+
+    script = [[{"name": "lookup", "arguments": {"city": "Paris"}}], "It is sunny"]
+    chain = model.chain(
+        "weather?", tools=[lookup], options={"tool_script": json.dumps(script)}
+    )
+    assert chain.text().endswith("It is sunny")
+    assert calls == ["Paris"]
+
+
+def test_fake_ollama_server_streams_ndjson():
+    """Test that the fake Ollama server streams NDJSON chunks."""
+    server, url = serve_in_background(ttft_ms=0, tokens_per_sec=1e6, reply="a b c")
+    try:
+        with urllib.request.urlopen(url + "/api/tags") as response:
+            assert json.load(response)["models"][0]["name"] == "llama3.2:latest"
+        request = urllib.request.Request(
+            url + "/api/generate",
+            data=json.dumps({"model": "m", "prompt": "hi"}).encode(),
+        )
+        with urllib.request.urlopen(request) as response:
+            assert response.headers["Content-Type"] == "application/x-ndjson"
+            chunks = [json.loads(line) for line in response]
+        assert "".join(chunk["response"] for chunk in chunks) == "a b c"
+        final = chunks[-1]
+        assert final["done"] and final["done_reason"] == "stop"
+        assert final["eval_count"] == 3 and final["total_duration"] > 0
+    finally:
+        server.shutdown()
+
+
+def test_fake_ollama_server_errors():
+    """Test that the fake Ollama server returns the configured error status."""
+    server, url = serve_in_background(ttft_ms=0, error_rate=1.0, error_status=429)
+    try:
+        request = urllib.request.Request(
+            url + "/api/chat",
+            data=json.dumps({"messages": [{"role": "user", "content": "hi"}]}).encode(),
+        )
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request)
+        assert error.value.code == 429
+    finally:
+        server.shutdown()
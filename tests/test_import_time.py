@@ -0,0 +1,75 @@
+"""Import-time regression guard, measured with ``python -X importtime``."""
+
+import subprocess
+import sys
+
+import pytest
+
+# Cumulative microseconds allowed per module; the measured cost is a few
+# milliseconds, so these only trip when a heavy dependency sneaks back in.
+BUDGETS_US = {"llm_lab": 50_000, "llm_lab.utils": 100_000}
+HEAVY = {"llm", "yaml", "numpy", "sqlite_utils"}
+
+
+def import_times(statement):
+    """Return ``{module: cumulative_us}`` for a fresh interpreter running statement."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS_US))
+def test_import_is_light(module):
+    """Test that importing the module skips heavy dependencies and stays in budget."""
+    times = import_times(f"import {module}")
+    assert not HEAVY & set(times), f"{module} imports {sorted(HEAVY & set(times))}"
+    # Best of three, to ride out a busy machine
+    best = min(import_times(f"import {module}")[module] for _ in range(3))
+    assert best < BUDGETS_US[module], f"import {module} took {best} us"
+
+
+def test_import_does_not_touch_disk():
+    """Test that importing the package creates no directories."""
+    statement = (
+        "import pathlib\n"
+        "def mkdir(*args, **kwargs):\n"
+        "    raise AssertionError('mkdir at import time')\n"
+        "pathlib.Path.mkdir = mkdir\n"
+        "import llm_lab, llm_lab.utils"
+    )
+    subprocess.run([sys.executable, "-c", statement], check=True)
+
+
+def test_submodules_load_on_attribute_access():
+    """Test that submodules are imported on first attribute access."""
+    statement = (
+        "import sys, llm_lab\n"
+        "assert 'llm_lab.templates' not in sys.modules\n"
+        "assert llm_lab.templates.TemplateRegistry\n"
+        "assert 'llm_lab.templates' in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", statement], check=True)
+
+
+def test_writers_create_data_dirs(tmp_path, monkeypatch):
+    """Test that the data directories are created by the first writer."""
+    import llm_lab
+    from llm_lab.context import RetentionStore
+
+    data = tmp_path / "data"
+    monkeypatch.setattr(llm_lab, "DATA_DIR", data)
+    monkeypatch.setattr(llm_lab, "SIN_DIR", data / "sin")
+    monkeypatch.setattr(llm_lab, "IMAGES_DIR", data / "images")
+    assert not data.exists()
+    RetentionStore(tmp_path / "memory.db")
+    assert (data / "sin").is_dir() and (data / "images").is_dir()
@@ -0,0 +1,93 @@
+"""Tests for the cached template registry."""
+
+import os
+
+import pytest
+import yaml
+
+from llm_lab import templates
+from llm_lab.templates import TemplateRegistry, compile_format
+
+
+def write_template(directory, name, body):
+    """Write a YAML template called ``name`` into ``directory``."""
+    path = directory / f"{name}.yaml"
+    path.write_text(body)
+    return path
+
+
+def test_compile_format_escapes_literal_braces():
+    """Test that braces outside declared parameters are kept literally."""
+    fmt = compile_format('{"key": {value}} {other}', {"value"})
+    assert fmt.format_map({"value": 1}) == '{"key": 1} {other}'
+
+
+def test_registry_parses_once(tmp_path, monkeypatch):
+    """Test that a template is parsed lazily and only once."""
+    write_template(tmp_path, "t", "prompt: Hello {input}\n")
+    calls = []
+    real = yaml.safe_load
+    monkeypatch.setattr(
+        templates.yaml, "safe_load", lambda f: calls.append(1) or real(f)
+    )
+    registry = TemplateRegistry(tmp_path)
+    assert registry.names() == ["t"]
+    assert calls == []
+    for _ in range(3):
+        assert registry.render("t", input="x")["prompt"] == "Hello x"
+    assert len(calls) == 1
+
+
+def test_registry_reloads_on_mtime_change(tmp_path):
+    """Test that an edited template file is reloaded."""
+    path = write_template(tmp_path, "t", "prompt: one {input}\n")
+    registry = TemplateRegistry(tmp_path)
+    assert registry.render("t", input="x")["prompt"] == "one x"
+    path.write_text("prompt: two {input}\n")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert registry.render("t", input="x")["prompt"] == "two x"
+
+
+def test_parameter_validation():
+    """Test that missing, unknown and mistyped parameters are rejected."""
+    template = TemplateRegistry().get("basic")
+    with pytest.raises(ValueError):
+        template.render()
+    with pytest.raises(ValueError):
+        template.render(input="x", colour="red")
+    with pytest.raises(TypeError):
+        template.render(input="x", ground_truth="yes")
+    rendered = template.render(input="text")
+    assert rendered["prompt"].endswith("Format as: markdown\n")
+
+
+def test_missing_placeholder_values_raise_value_error(tmp_path):
+    """Test that placeholders without a value fail like missing parameters."""
+    write_template(tmp_path, "bare", "prompt: Summarise {input}\n")
+    write_template(
+        tmp_path,
+        "declared",
+        "prompt: Translate {text} to {language}\n"
+        "parameters:\n  - name: text\n    required: true\n  - name: language\n",
+    )
+    registry = TemplateRegistry(tmp_path)
+    with pytest.raises(ValueError, match="input"):
+        registry.render("bare")
+    with pytest.raises(ValueError, match="language"):
+        registry.render("declared", text="hola")
+    assert registry.render("bare", input="x")["prompt"] == "Summarise x"
+
+
+def test_provider_options_keep_parameter_types():
+    """Test that provider options keep the types of rendered parameters."""
+    rendered = templates.render_template(
+        "basic", provider="gemini", input="text", ground_truth=True
+    )
+    assert rendered["options"] == {
+        "model": "gemini-1.5-pro-latest",
+        "google_search": True,
+    }
+    assert templates.render_template("basic", "claude", input="t")["options"] == {
+        "model": "claude-3"
+    }
@@ -0,0 +1,218 @@
+"""Tests for client-side rate limiting, retries and adaptive concurrency."""
+
+import threading
+import time
+from functools import partial
+from types import SimpleNamespace
+
+import llm
+import pytest
+
+from llm_lab.throttle import (
+    AIMDLimiter,
+    Throttle,
+    TokenBucket,
+    is_congestion,
+    is_retryable,
+    retry_after,
+)
+from llm_lab.utils import get_model_response, get_model_responses
+
+
+class FakeClock:
+    """A clock whose ``sleep`` advances time instantly."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class HTTPError(Exception):
+    """An exception carrying an HTTP status and headers."""
+
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.headers = headers or {}
+
+
+def test_error_classification():
+    """Test which errors are retryable or signal congestion."""
+    assert is_retryable(HTTPError(429)) and is_congestion(HTTPError(429))
+    assert is_retryable(HTTPError(502)) and not is_congestion(HTTPError(502))
+    assert not is_retryable(HTTPError(400))
+    response = SimpleNamespace(status_code=529, headers={"retry-after": "3"})
+    wrapped = RuntimeError("boom")
+    wrapped.response = response
+    assert is_congestion(wrapped) and retry_after(wrapped) == 3.0
+    assert is_congestion(RuntimeError("Error code: 429 - rate_limit_error"))
+    assert is_retryable(RuntimeError("Anthropic API is overloaded"))
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(RuntimeError("model unavailable"))
+    assert retry_after(HTTPError(429)) is None
+
+
+def test_token_bucket_paces_to_rate():
+    """Test that the token bucket paces acquisitions to its rate."""
+    clock = FakeClock()
+    bucket = TokenBucket(60, capacity=2, clock=clock, sleep=clock.sleep)
+    for _ in range(12):
+        bucket.acquire()
+    # Two from the burst, then one per second
+    assert clock.now == pytest.approx(10.0)
+    # Oversized requests wait for the deficit instead of blocking forever
+    assert bucket.acquire(5) == pytest.approx(5.0)
+    bucket.credit(3)
+    assert bucket.available == pytest.approx(2.0)
+
+
+def test_aimd_cuts_once_per_congestion_event_and_ramps_up():
+    """Test that the AIMD limit halves once per event and recovers."""
+    limiter = AIMDLimiter(8, initial=8)
+    tickets = [limiter.acquire() for _ in range(8)]
+    # Every in-flight call is rejected, but that is a single event
+    for ticket in tickets:
+        limiter.release(ticket, congested=True)
+    assert limiter.limit == 4
+    limiter.release(limiter.acquire(), congested=True)
+    assert limiter.limit == 2
+    for _ in range(20):
+        limiter.release(limiter.acquire())
+    assert 6 < limiter.limit <= 8
+    for _ in range(200):
+        limiter.release(limiter.acquire())
+    assert limiter.limit == 8
+
+
+def test_throttle_retries_transient_errors():
+    """Test that transient errors are retried and others raised."""
+    clock = FakeClock()
+    throttle = Throttle(seed=0, clock=clock, sleep=clock.sleep)
+    failures = [HTTPError(429, {"Retry-After": "2"}), HTTPError(503)]
+
+    def flaky():
+        if failures:
+            raise failures.pop(0)
+        return {"text": "ok"}
+
+    assert throttle.call(flaky) == {"text": "ok"}
+    assert clock.slept[0] == 2.0
+    assert throttle.stats()["retries"] == 2
+
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise HTTPError(400)
+
+    with pytest.raises(HTTPError):
+        throttle.call(broken)
+    assert len(calls) == 1
+
+    exhausted = Throttle(retries=2, sleep=clock.sleep)
+    with pytest.raises(HTTPError):
+        exhausted.call(flaky_forever)
+    assert exhausted.stats()["retries"] == 2
+    assert exhausted.stats()["failed"] == 1
+    assert throttle.stats()["failed"] == 1
+
+
+def flaky_forever():
+    """Always fail with a retryable server error."""
+    raise HTTPError(500)
+
+
+def test_throttle_settles_actual_tokens():
+    """Test that unused reserved tokens are credited back."""
+    clock = FakeClock()
+    throttle = Throttle(tokens_per_minute=600, clock=clock, sleep=clock.sleep)
+    throttle.call(lambda: {"tokens": 20}, tokens=50)
+    assert throttle.tokens.available == pytest.approx(80)
+    with pytest.raises(HTTPError):
+        Throttle(tokens_per_minute=600, retries=0, clock=clock).call(
+            flaky_forever, tokens=50
+        )
+
+
+def provider_backend(capacity):
+    """Return a backend that answers 429 when over ``capacity`` concurrent calls."""
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0, "rejected": 0}
+
+    def backend(prompt, model):
+        with lock:
+            if state["active"] >= capacity:
+                state["rejected"] += 1
+                raise HTTPError(429)
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        try:
+            time.sleep(0.01)
+            return {"text": prompt, "tokens": 1}
+        finally:
+            with lock:
+                state["active"] -= 1
+
+    return backend, state
+
+
+def test_batch_responses_adapt_to_provider_capacity():
+    """Test that batch calls converge on the provider's capacity."""
+    backend, state = provider_backend(capacity=3)
+    throttle = Throttle(
+        max_concurrency=12, retries=10, base_delay=0.005, max_delay=0.05, seed=1
+    )
+    results = get_model_responses(
+        [str(i) for i in range(120)],
+        backend=backend,
+        max_concurrency=12,
+        limits={},
+        throttles={None: throttle},
+    )
+    assert not [r for r in results if "error" in r]
+    assert state["peak"] <= 3
+    # The limit settles near the provider's capacity instead of collapsing
+    assert 1 <= throttle.limiter.limit <= 6
+    assert state["rejected"] < 60
+
+
+def test_model_response_retries_rate_limits(monkeypatch):
+    """Test that a rate-limited model call is retried."""
+    failures = [RuntimeError("Error code: 429 - rate limited")]
+
+    def complete(prompt, model=None, **kwargs):
+        if failures:
+            raise failures.pop()
+        return SimpleNamespace(text=lambda: "42", tokens=1, completion_ms=500)
+
+    monkeypatch.setattr(llm, "complete", complete, raising=False)
+    throttle = Throttle(base_delay=0.001)
+    assert get_model_response("q", "m1", throttle=throttle)["text"] == "42"
+    assert throttle.stats()["congested"] == 1
+    failures.append(RuntimeError("Error code: 401 - invalid key"))
+    assert "401" in get_model_response("q", "m1", throttle=throttle)["error"]
+
+
+def test_throttle_against_fake_ollama_429s():
+    """Test retries against a fake Ollama server answering 429s."""
+    from llm_lab.bench.loadgen import ollama_target
+    from llm_lab.fake.server import serve_in_background
+
+    server, url = serve_in_background(
+        ttft_ms=1, latency="fixed", error_rate=0.3, error_status=429, seed=3
+    )
+    try:
+        target = ollama_target(url)
+        throttle = Throttle(max_concurrency=4, base_delay=0.001, retries=8, seed=0)
+        for i in range(20):
+            assert throttle.call(partial(target, 0, i))["tokens"] > 0
+    finally:
+        server.shutdown()
+    assert throttle.stats()["congested"] > 0
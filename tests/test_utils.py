@@ -0,0 +1,224 @@
+"""Tests for LLM Lab utility functions."""
+
+import time
+from types import SimpleNamespace
+
+import llm
+import pytest
+
+from llm_lab.fake import FakeModel
+from llm_lab.utils import (
+    ResponseCache,
+    ResponseStream,
+    get_model_response,
+    get_model_responses,
+    percentile,
+    provider_for_model,
+    stream_model_response,
+)
+
+
+def sleepy_backend(delay=0.1):
+    """Return a fake model backend that sleeps before answering."""
+
+    def backend(prompt, model):
+        if prompt == "fail":
+            raise RuntimeError("model unavailable")
+        time.sleep(delay)
+        return {"text": f"{model}: {prompt}", "tokens": len(prompt.split())}
+
+    return backend
+
+
+def test_batch_responses_run_concurrently():
+    """Test that a 3x3 sweep takes about one call, not nine."""
+    prompts = ["a", "b c", "d e f"]
+    models = ["m1", "m2", "m3"]
+
+    start = time.perf_counter()
+    results = get_model_responses(prompts, models, backend=sleepy_backend(), limits={})
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5, f"Batch took {elapsed:.2f}s"
+    assert [(r["prompt"], r["model"]) for r in results] == [
+        (p, m) for p in prompts for m in models
+    ]
+    assert all(r["latency"] >= 0.1 for r in results)
+    assert results[-1]["tokens"] == 3
+
+
+def test_batch_responses_capture_errors():
+    """Test that a failing call becomes an error row in place."""
+    results = get_model_responses(["ok", "fail"], backend=sleepy_backend(0), limits={})
+    assert "error" not in results[0]
+    assert results[1]["error"] == "model unavailable"
+
+
+def test_batch_responses_respect_provider_limits():
+    """Test that a provider limit of one serializes its calls."""
+    start = time.perf_counter()
+    get_model_responses(
+        ["a", "b", "c"],
+        ["llama2"],
+        backend=sleepy_backend(0.05),
+        limits={"ollama": 1},
+    )
+    assert time.perf_counter() - start >= 0.15
+    assert provider_for_model("llama2") == "ollama"
+    assert provider_for_model("claude-3-haiku") == "claude"
+
+
+def test_batch_responses_do_not_starve_other_providers():
+    """Test that a saturated provider does not hold up another one's calls."""
+    start = time.perf_counter()
+    finished = {}
+
+    def backend(prompt, model):
+        time.sleep(0.1 if model == "llama2" else 0.01)
+        finished[prompt, model] = time.perf_counter() - start
+        return {"text": prompt}
+
+    get_model_responses(
+        ["a", "b", "c", "d"],
+        ["llama2", "gemini-1.5-flash-latest"],
+        max_concurrency=2,
+        backend=backend,
+        limits={"ollama": 1},
+        throttles={},
+    )
+    llama = sorted(t for (_, model), t in finished.items() if model == "llama2")
+    gemini = [t for (_, model), t in finished.items() if model != "llama2"]
+    # Every gemini call is done before the serialized llama2 calls are half done
+    assert max(gemini) < llama[1]
+
+
+def test_batch_responses_release_permits_during_backoff():
+    """Test that a call backing off lets the provider's next call run."""
+    from llm_lab.throttle import Throttle
+
+    start = time.perf_counter()
+    started = {}
+
+    def backend(prompt, model):
+        started.setdefault(prompt, time.perf_counter() - start)
+        if prompt == "a" and len(started) == 1:
+            raise RuntimeError("Error code: 429 - rate limited")
+        return {"text": prompt}
+
+    results = get_model_responses(
+        ["a", "b"],
+        ["llama2"],
+        backend=backend,
+        limits={"ollama": 1},
+        throttles={"ollama": Throttle(sleep=lambda seconds: time.sleep(0.2))},
+    )
+    assert [r["text"] for r in results] == ["a", "b"]
+    # "b" ran while "a" was sleeping off its 429, not after the retry
+    assert started["b"] < started["a"] + 0.2
+
+
+def test_response_cache_hits_skip_model(tmp_path, monkeypatch):
+    """Test that repeated calls are served from the cache."""
+    calls = []
+
+    def complete(prompt, model=None, **kwargs):
+        calls.append(prompt)
+        return SimpleNamespace(text=lambda: "42", tokens=1, completion_ms=500)
+
+    monkeypatch.setattr(llm, "complete", complete, raising=False)
+    cache = ResponseCache(tmp_path / "cache.db")
+
+    first = get_model_response("answer?", "m1", cache=cache)
+    second = get_model_response("answer?", "m1", cache=cache)
+    get_model_response("answer?", "m1", cache=cache, bypass_cache=True)
+    get_model_response("answer?", "m1", system="be brief", cache=cache)
+
+    assert first == {"text": "42", "tokens": 1, "latency": 0.5}
+    assert second == {**first, "cached": True}
+    assert len(calls) == 3
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_response_cache_ttl_and_lru(tmp_path):
+    """Test expiry and least-recently-used eviction."""
+    cache = ResponseCache(tmp_path / "cache.db", max_entries=2)
+    cache.set("a", {"text": "a"})
+    cache.set("b", {"text": "b"})
+    assert cache.get("a") == {"text": "a"}
+    cache.set("c", {"text": "c"})
+    assert cache.get("b") is None
+    assert cache.stats()["entries"] == 2
+
+    cache.ttl = 0
+    assert cache.get("a") is None
+
+
+def test_percentile():
+    """Test linear-interpolated percentiles."""
+    assert percentile([3, 1, 2, 4], 50) == 2.5
+    assert percentile([1, 2, 3], 100) == 3
+    assert percentile([], 90) == 0.0
+
+
+def test_stream_model_response_metrics():
+    """Test streaming chunks and time-to-first-token metrics offline."""
+    model = FakeModel("one two three four five", ttft=0.05, tokens_per_sec=100)
+    stream = stream_model_response("count", model)
+
+    chunks = list(stream)
+    metrics = stream.metrics()
+
+    assert chunks == ["one", " two", " three", " four", " five"]
+    assert metrics["text"] == "one two three four five"
+    assert metrics["tokens"] == 5
+    assert 0.05 <= metrics["ttft"] < metrics["latency"]
+    assert 0.01 <= metrics["itl_p50"] <= metrics["itl_p99"] < 0.05
+    assert 40 < metrics["tokens_per_sec"] <= 100
+
+
+def test_stream_resumes_after_partial_consumption():
+    """Test that a half-read stream is finished, not restarted, by metrics()."""
+    pulled = []
+
+    def response():
+        for chunk in ["a", "b", "c", "d"]:
+            pulled.append(chunk)
+            time.sleep(0.01)
+            yield chunk
+
+    stream = ResponseStream(response())
+    iterator = iter(stream)
+    assert [next(iterator), next(iterator)] == ["a", "b"]
+    start = stream.start
+    metrics = stream.metrics()
+
+    assert metrics["text"] == "abcd"
+    assert pulled == ["a", "b", "c", "d"]
+    assert stream.start == start
+    assert 0 < metrics["ttft"] < metrics["latency"]
+    assert list(stream) == ["a", "b", "c", "d"]
+
+
+def test_stream_metrics_after_failure():
+    """Test that a stream failing part-way reports partial metrics and the error."""
+
+    def response():
+        yield "a"
+        time.sleep(0.01)
+        yield "b"
+        raise ConnectionError("connection reset")
+
+    stream = ResponseStream(response())
+    with pytest.raises(ConnectionError):
+        list(stream)
+    metrics = stream.metrics()
+
+    assert metrics["text"] == "ab"
+    assert metrics["tokens"] == 2
+    assert metrics["error"] == "connection reset"
+    assert 0 < metrics["ttft"] < metrics["latency"]
+    # Replaying a failed stream raises the original error again
+    with pytest.raises(ConnectionError):
+        list(stream)
+    assert "error" not in ResponseStream(iter(["x"])).metrics()